@@ -0,0 +1,95 @@
+# 片段表编辑后端与 QPlainTextEdit 的对比测试
+# 用法: python benchmarks/bench_piece_table.py [文件大小MB]
+# 每种后端在单独的子进程中运行，以便分别统计内存峰值（仅 Linux/macOS 可用 resource 模块）
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EDITS = 1000
+LINE = b'The quick brown fox jumps over the lazy dog 0123456789\n'
+
+
+def peak_memory_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 / 1024 if sys.platform == 'darwin' else usage / 1024
+
+
+def make_file(size_mb):
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(fd, 'wb') as file:
+        block = LINE * (1024 * 1024 // len(LINE))
+        for _ in range(size_mb):
+            file.write(block)
+    return path
+
+
+def bench_qt(path):
+    from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+    from PyQt5.QtGui import QTextCursor
+    from yunji.loader import read_text_file
+    app = QApplication.instance() or QApplication([])
+    start = time.perf_counter()
+    text = read_text_file(path)[0]
+    edit = QPlainTextEdit()
+    edit.setPlainText(text)
+    del text
+    app.processEvents()
+    loaded = time.perf_counter() - start
+    document = edit.document()
+    end = document.characterCount() - 1
+    start = time.perf_counter()
+    cursor = QTextCursor(document)
+    for _ in range(EDITS):
+        cursor.setPosition(random.randrange(end))
+        cursor.insertText('x')
+    edited = time.perf_counter() - start
+    return loaded, edited
+
+
+def bench_piece_table(path):
+    from yunji.largefile import MappedFile
+    from yunji.piece_table import PieceTable
+    start = time.perf_counter()
+    mapped_file = MappedFile(path, 'utf-8')
+    opened = time.perf_counter() - start
+    mapped_file.build_index(lambda: False, lambda done, total: None)
+    table = PieceTable(mapped_file)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(EDITS):
+        table.insert(random.randrange(table.size), b'x')
+        table.line_bytes(table.line_offset(random.randrange(table.line_count())), 16 * 1024)
+    edited = time.perf_counter() - start
+    print(f'  映射耗时: {opened * 1000:.1f} ms（编辑在行索引建立完成后开始）')
+    mapped_file.close()
+    return loaded, edited
+
+
+def run(backend, path):
+    random.seed(0)
+    loaded, edited = (bench_qt if backend == 'qt' else bench_piece_table)(path)
+    print(f'  加载: {loaded:.2f} s  {EDITS} 次随机插入: {edited * 1000:.1f} ms  内存峰值: {peak_memory_mb():.0f} MB')
+
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        return
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    path = make_file(size_mb)
+    try:
+        for backend, title in (('qt', 'QPlainTextEdit'), ('piece', '片段表')):
+            print(f'{title} ({size_mb} MB):', flush=True)
+            subprocess.run([sys.executable, __file__, backend, path], check=True)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# 大文档性能策略阈值的测量：不同文件大小、行长度下各功能的开销
+# 用法: python benchmarks/bench_policy.py [最大文件大小MB]
+# 每种组合在单独的子进程中运行，避免前一次的文档影响后一次的测量
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = 'def value(self, key): return self.items[key] + 0x1F  # lookup '
+KEYSTROKES = 200
+
+
+def make_text(size_mb, line_length):
+    line = (WORDS * (line_length // len(WORDS) + 1))[:line_length] + '\n'
+    return line * (size_mb * 1024 * 1024 // len(line))
+
+
+def elapsed(app, action):
+    start = time.perf_counter()
+    action()
+    app.processEvents()
+    return (time.perf_counter() - start) * 1000
+
+
+def keystroke_cost(app, editor):
+    # 一次按键的同步开销：编辑、移动光标、刷新状态栏并立即重绘；不计入空闲时的后台计算
+    from PyQt5.QtGui import QTextCursor
+    text_edit = editor.text_edit
+    widgets = (text_edit.viewport(), text_edit.lineNumberArea, text_edit.minimap)
+    start = time.perf_counter()
+    for _ in range(KEYSTROKES):
+        text_edit.insertPlainText('x')
+        text_edit.moveCursor(QTextCursor.Down)
+        editor.updates.flush()
+        for widget in widgets:
+            if widget.isVisible():
+                widget.repaint()
+    return (time.perf_counter() - start) * 1000 / KEYSTROKES
+
+
+def run(size_mb, line_length):
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QTextCursor
+    from yunji.editor import YunjiEditor
+    from yunji.syntax import PythonGrammar
+    app = QApplication.instance() or QApplication([])
+    editor = YunjiEditor()
+    editor.resize(1000, 700)
+    editor.show()
+    text_edit = editor.text_edit
+    text = make_text(size_mb, line_length)
+    results = []
+    for wrap in (True, False):
+        editor.toggle_auto_wrap(wrap)
+        load = elapsed(app, lambda: text_edit.setPlainText(text))
+        resize = elapsed(app, lambda: editor.resize(900 if editor.width() == 1000 else 1000, 700))
+        jump = elapsed(app, lambda: text_edit.moveCursor(QTextCursor.End))
+        results.append(f'{"换行" if wrap else "不换行"}: 加载 {load:.0f} ms, 改变宽度 {resize:.0f} ms, 跳到末尾 {jump:.0f} ms')
+    editor.toggle_auto_wrap(True)
+    text_edit.moveCursor(QTextCursor.Start)
+    features = []
+    for name, enable in (('当前行高亮', lambda on: setattr(text_edit, 'current_line_visible', on)),
+                         ('语法高亮', lambda on: editor.choose_syntax(PythonGrammar() if on else None)),
+                         ('缩略图', editor.toggle_minimap),
+                         ('行号', lambda on: (editor.show_line_numbers_action.setChecked(on), editor.toggle_line_numbers()))):
+        costs = []
+        for on in (False, True):
+            enable(on)
+            app.processEvents()
+            costs.append(keystroke_cost(app, editor))
+        features.append(f'{name} {costs[1] - costs[0]:+.2f}')
+    results.append(f'每次按键 {costs[0]:.2f} ms，各功能的额外开销 (ms): ' + ', '.join(features))
+    text_edit.document().setModified(False)
+    editor.close()
+    for line in results:
+        print('  ' + line)
+
+
+def main():
+    if len(sys.argv) > 2:
+        run(int(sys.argv[1]), int(sys.argv[2]))
+        return
+    max_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    sizes = [size for size in (1, 4, 16, 64, 256) if size <= max_mb]
+    for line_length in (80, 2000, 10000, 50000):
+        for size_mb in sizes:
+            print(f'{size_mb} MB, 每行 {line_length} 个字符:', flush=True)
+            subprocess.run([sys.executable, __file__, str(size_mb), str(line_length)], check=True)
+
+
+if __name__ == '__main__':
+    main()
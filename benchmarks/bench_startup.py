@@ -0,0 +1,97 @@
+# 冷启动的测量：导入编辑器模块的时间和从进程开始到编辑区第一次绘制的时间，超过预算时返回非零退出码
+# 用法: python benchmarks/bench_startup.py [次数] [预算倍数]
+# 每次在单独的子进程中使用 offscreen 平台启动，不显示窗口；第一次运行只用于生成字节码缓存，不计入结果
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STARTED = time.perf_counter()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 基准（毫秒）：开发机上 7 次的中位数。预算为基准乘以预算倍数，按中位数比较；
+# 在较慢的机器上可以在命令行中给出更大的倍数，不要放宽默认值
+BASELINE_IMPORT = 155
+BASELINE_FIRST_PAINT = 240
+BUDGET_FACTOR = 1.5
+# 第一次绘制之前不应导入的模块，它们只在对应功能第一次使用时才导入
+DEFERRED_MODULES = ('chardet', 'webbrowser', 'multiprocessing', 'concurrent.futures', 'tempfile',
+                    'PyQt5.QtNetwork')
+
+
+def run():
+    # 在子进程中运行：输出一行 JSON，时间均从脚本开始执行算起
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QObject, QEvent
+    start = time.perf_counter()
+    from yunji.editor import YunjiEditor
+    imported = time.perf_counter()
+
+    class PaintWatcher(QObject):
+        def __init__(self):
+            super(PaintWatcher, self).__init__()
+            self.painted = None
+
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint and self.painted is None:
+                self.painted = time.perf_counter()
+            return False
+
+    app = QApplication([])
+    created = time.perf_counter()
+    editor = YunjiEditor()
+    watcher = PaintWatcher()
+    editor.text_edit.viewport().installEventFilter(watcher)
+    constructed = time.perf_counter()
+    deadline = time.perf_counter() + 10
+    while watcher.painted is None and time.perf_counter() < deadline:
+        app.processEvents()
+    painted = watcher.painted or time.perf_counter()
+    print(json.dumps({
+        'qt_import': (start - STARTED) * 1000,
+        'import': (imported - STARTED) * 1000,
+        'construct': (constructed - created) * 1000,
+        'first_paint': (painted - STARTED) * 1000,
+        'deferred_loaded': [name for name in DEFERRED_MODULES if name in sys.modules],
+    }))
+
+
+def measure():
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    output = subprocess.run([sys.executable, __file__, '--child'], env=env, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:] == ['--child']:
+        run()
+        return
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    factor = float(sys.argv[2]) if len(sys.argv) > 2 else BUDGET_FACTOR
+    import_budget = BASELINE_IMPORT * factor
+    first_paint_budget = BASELINE_FIRST_PAINT * factor
+    measure()
+    results = [measure() for _ in range(runs)]
+    median = {key: statistics.median(result[key] for result in results)
+              for key in ('qt_import', 'import', 'construct', 'first_paint')}
+    print(f'{runs} 次的中位数: 导入 PyQt5 {median["qt_import"]:.0f} ms, 导入编辑器 {median["import"]:.0f} ms, '
+          f'创建窗口 {median["construct"]:.0f} ms, 第一次绘制 {median["first_paint"]:.0f} ms')
+    failures = []
+    if median['import'] > import_budget:
+        failures.append(f'导入时间 {median["import"]:.0f} ms 超过预算 {import_budget:.0f} ms')
+    if median['first_paint'] > first_paint_budget:
+        failures.append(f'第一次绘制 {median["first_paint"]:.0f} ms 超过预算 {first_paint_budget:.0f} ms')
+    loaded = sorted(set(name for result in results for name in result['deferred_loaded']))
+    if loaded:
+        failures.append('启动时导入了应延迟导入的模块: ' + ', '.join(loaded))
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ reg_content = f"""Windows Registry Editor Version 5.00
 "Icon"="{current_directory}\\yunji\\editor.ico ,0"
 
 [HKEY_CLASSES_ROOT\\*\\shell\\Open with Yunji\\command]
-@="\\"{pythonw_path}\\" -m yunji.editor \\"%1\\""
+@="\\"{pythonw_path}\\" -m yunji.instance \\"%1\\""
 """
 
 # 将内容写入 reg 文件
@@ -22,7 +22,7 @@ setup(
     ],
     entry_points={
         'console_scripts': [
-            'yunji=yunji.editor:cli_editor',
+            'yunji=yunji.instance:main',
         ],
     },
     package_data={
@@ -0,0 +1,14 @@
+# conftest.py
+
+import pytest
+from yunji import journal, session
+
+
+@pytest.fixture(autouse=True)
+def isolated_user_data(tmp_path, monkeypatch):
+    # 会话数据库和恢复日志默认位于 ~/.yunji，测试中改用临时目录，不读写用户的真实数据
+    session.close_session_store()
+    monkeypatch.setattr(session, 'SESSION_DB', str(tmp_path / 'yunji' / 'session.sqlite3'))
+    monkeypatch.setattr(journal, 'JOURNAL_DIR', str(tmp_path / 'yunji' / 'journal'))
+    yield
+    session.close_session_store()
@@ -2,7 +2,9 @@
 
 import unittest
 import os
-from PyQt5.QtWidgets import QApplication
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from PyQt5.QtGui import QTextCursor
 from yunji.editor import YunjiEditor
 
 class TestYunjiEditor(unittest.TestCase):
@@ -49,6 +51,53 @@ class TestYunjiEditor(unittest.TestCase):
         self.assertEqual(self.editor.file_path, test_file)
         os.remove(test_file)  # 清理测试文件
 
+    def test_line_endings_preserved_and_converted(self):
+        test_file = 'testfile_crlf.txt'
+        with open(test_file, 'wb') as file:
+            file.write(b"one\r\ntwo\r\n")
+        self.editor.open_file(test_file)
+        self.assertEqual(self.editor.status_label_os_info.text(), "CRLF")
+        self.editor.text_edit.appendPlainText("three")
+        self.editor.save_file()
+        with open(test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"one\r\ntwo\r\n\r\nthree")
+        self.editor.convert_line_endings('LF')
+        self.assertFalse(self.editor.is_saved)
+        self.editor.save_file()
+        with open(test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"one\ntwo\n\nthree")
+        os.remove(test_file)
+
+    def test_mixed_line_endings_ask_before_normalising(self):
+        test_file = 'testfile_mixed.txt'
+        with open(test_file, 'wb') as file:
+            file.write(b"one\r\ntwo\nthree\r\n")
+        self.addCleanup(os.remove, test_file)
+        self.editor.open_file(test_file)
+        self.assertEqual(self.editor.status_label_os_info.text(), "CRLF (混合)")
+        self.editor.text_edit.moveCursor(QTextCursor.End)
+        self.editor.text_edit.insertPlainText("four")
+        with mock.patch('yunji.editor.QMessageBox.warning', return_value=QMessageBox.Cancel) as warning:
+            self.editor.save_file()
+        warning.assert_called_once()
+        with open(test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"one\r\ntwo\nthree\r\n")
+        with mock.patch('yunji.editor.QMessageBox.warning', return_value=QMessageBox.Save):
+            self.editor.save_file()
+        with open(test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"one\r\ntwo\r\nthree\r\nfour")
+        self.assertEqual(self.editor.status_label_os_info.text(), "CRLF")
+        # 在 格式 > 换行符 中明确选择后保存时不再询问
+        with open(test_file, 'wb') as file:
+            file.write(b"one\r\ntwo\n")
+        self.editor.open_file(test_file)
+        self.editor.convert_line_endings('LF')
+        with mock.patch('yunji.editor.QMessageBox.warning') as warning:
+            self.editor.save_file()
+        warning.assert_not_called()
+        with open(test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"one\ntwo\n")
+
     def test_line_number_visibility(self):
         self.editor.text_edit.line_numbers_visible = True
         self.editor.text_edit.updateLineNumberAreaWidth(0)
@@ -0,0 +1,81 @@
+# test_encoding.py
+
+import os
+import unittest
+from unittest import mock
+from yunji import encoding
+from yunji.encoding import detect_encoding, detect_file_encoding, clear_detection_cache
+from yunji.loader import FileLoader, READ_CHUNK_SIZE, read_text_file
+
+class TestEncodingDetection(unittest.TestCase):
+    def setUp(self):
+        clear_detection_cache()
+        self.test_file = 'testfile_encoding.txt'
+
+    def tearDown(self):
+        if os.path.exists(self.test_file):
+            os.remove(self.test_file)
+
+    def test_utf8_sample(self):
+        self.assertEqual(detect_encoding("你好，云记".encode('utf-8'), complete=True), ('utf-8', 1.0))
+
+    def test_utf8_bom(self):
+        self.assertEqual(detect_encoding("abc".encode('utf-8-sig'))[0], 'utf-8-sig')
+
+    def test_window_starting_mid_character(self):
+        data = "云记".encode('utf-8')
+        encoding_name, _ = detect_encoding(b"abc", [data[1:] + data])
+        self.assertEqual(encoding_name, 'utf-8')
+
+    def test_gbk_detected_and_decoded(self):
+        text = "中文编码检测测试，云记编辑器。\n" * 200
+        with open(self.test_file, 'wb') as file:
+            file.write(text.encode('gbk'))
+        content, encoding_name, confidence, _, _, bytes_read = read_text_file(self.test_file)
+        self.assertEqual(bytes_read, len(text.encode('gbk')))
+        self.assertNotEqual(encoding_name, 'utf-8')
+        self.assertEqual(content, text)
+        self.assertGreaterEqual(confidence, 0.0)
+
+    def test_sampled_windows(self):
+        with open(self.test_file, 'wb') as file:
+            file.write(b"a" * 1024 * 1024)
+        with open(self.test_file, 'rb') as file:
+            head = file.read(encoding.SAMPLE_HEAD_SIZE)
+            windows = encoding.read_samples(file, os.path.getsize(self.test_file), head)
+            self.assertEqual(file.tell(), len(head))
+        self.assertEqual(len(windows), encoding.SAMPLE_WINDOWS)
+        self.assertTrue(all(len(window) == encoding.SAMPLE_WINDOW_SIZE for window in windows))
+
+    def test_invalid_bytes_outside_samples_are_reported(self):
+        # 后台加载只抽样检测编码，抽样窗口之间的非法字节在解码时才会被发现
+        data = bytearray(b"a" * 1024 * 1024)
+        data[READ_CHUNK_SIZE + 1000] = 0xFF
+        with open(self.test_file, 'wb') as file:
+            file.write(data)
+        loader = FileLoader(self.test_file)
+        chunks = []
+        loader.chunk_loaded.connect(lambda text: (chunks.append(text), loader.acknowledge()))
+        loader.run()
+        self.assertEqual(loader.encoding, 'utf-8')
+        self.assertIn('\ufffd', ''.join(chunks))
+        self.assertTrue(loader.lossy)
+
+    def test_detection_cached_by_path_size_mtime(self):
+        with open(self.test_file, 'wb') as file:
+            file.write(b"hello")
+        read_text_file(self.test_file)
+        with mock.patch('yunji.encoding.detect_encoding') as detect:
+            read_text_file(self.test_file)
+            detect.assert_not_called()
+        with open(self.test_file, 'wb') as file:
+            file.write(b"hello world")
+        with open(self.test_file, 'rb') as file:
+            stat_result = os.fstat(file.fileno())
+            head = file.read()
+            with mock.patch('yunji.encoding.detect_encoding', return_value=('utf-8', 1.0)) as detect:
+                detect_file_encoding(self.test_file, file, stat_result, head)
+                detect.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
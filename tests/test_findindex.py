@@ -0,0 +1,247 @@
+# test_findindex.py
+
+import random
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+from PyQt5.QtGui import QTextDocument, QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.findindex import MatchIndex, build_text_pattern, find_spans
+
+def qt_matches(document, find_str, case_sensitive, whole_words):
+    flags = QTextDocument.FindFlags()
+    if case_sensitive:
+        flags |= QTextDocument.FindCaseSensitively
+    if whole_words:
+        flags |= QTextDocument.FindWholeWords
+    cursor = QTextCursor(document)
+    matches = []
+    while True:
+        cursor = document.find(find_str, cursor, flags)
+        if cursor.isNull():
+            return matches
+        matches.append((cursor.selectionStart(), cursor.selectionEnd()))
+
+class TestMatchIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def random_edits(self, pieces, keys, check_qt):
+        rng = random.Random(7)
+        for _ in range(60):
+            text_edit = QPlainTextEdit()
+            document = text_edit.document()
+            document.setPlainText(''.join(rng.choice(pieces) for _ in range(150)))
+            key = (rng.choice(keys), rng.random() < 0.5, rng.random() < 0.5)
+            index = MatchIndex(document)
+            index.rebuild(*key)
+            for _ in range(30):
+                end = document.characterCount() - 1
+                position = rng.randint(0, end)
+                removed = rng.randint(0, min(6, end - position))
+                cursor = QTextCursor(document)
+                cursor.setPosition(position)
+                cursor.setPosition(position + removed, QTextCursor.KeepAnchor)
+                if (cursor.selectionStart(), cursor.selectionEnd()) != (position, position + removed):
+                    continue  # 落在代理对中间
+                cursor.insertText(''.join(rng.choice(pieces) for _ in range(rng.randint(0, 4))))
+                fresh = MatchIndex(document)
+                fresh.rebuild(*key)
+                self.assertEqual(index.spans(), fresh.spans())
+                if check_qt:
+                    self.assertEqual(index.spans(), qt_matches(document, *key))
+
+    def test_patched_index_matches_qt_find(self):
+        self.random_edits(['a', 'b', 'A', ' ', '\n', '_', '1', 'é', 'ab', 'Ä', 'ä'], ['ab', 'a', 'aba', 'A b', 'ä'], True)
+
+    def test_patched_index_with_surrogate_pairs(self):
+        self.random_edits(['a', 'b', ' ', '\n', '😀', 'a😀'], ['a😀', 'b', '😀'], False)
+
+    def test_overlapping_query_realigns_after_edit(self):
+        # 查询自身可以重叠时，修改会改变其后匹配项的对齐方式
+        text_edit = QPlainTextEdit()
+        document = text_edit.document()
+        document.setPlainText('a   aAA\nb\naaaAAa')
+        index = MatchIndex(document)
+        index.rebuild('aa', False, False)
+        cursor = QTextCursor(document)
+        cursor.setPosition(10)
+        cursor.insertText('\nA')
+        self.assertEqual(index.spans(), qt_matches(document, 'aa', False, False))
+        self.assertIn((15, 17), index.spans())
+        self.random_edits(['a', 'A', 'aa', 'b', ' ', '\n'], ['aa', 'aba', 'aAa', 'a a'], True)
+
+    def test_typing_shifts_later_matches_lazily(self):
+        text_edit = QPlainTextEdit()
+        document = text_edit.document()
+        document.setPlainText('x ' + 'foo ' * 1000)
+        index = MatchIndex(document)
+        index.rebuild('foo', True, False)
+        cursor = QTextCursor(document)
+        cursor.setPosition(1)
+        for char in 'typed':
+            cursor.insertText(char)
+        # 只有修改位置之前的匹配项被更新，之后的仍然记录在 shift 中
+        self.assertEqual((index.shift_from, index.shift), (0, 5))
+        self.assertEqual(index.span(999), (7 + 999 * 4, 10 + 999 * 4))
+        self.assertEqual(index.number_of(7, 10), 1)
+        self.assertEqual(index.number_of(8, 11), 0)
+
+    def test_chunked_scan_matches_single_pass(self):
+        text_edit = QPlainTextEdit()
+        document = text_edit.document()
+        document.setPlainText('ab abab 😀ab\nxab_ab ' * 30)
+        text = document.toPlainText()
+        # 很小的分段让匹配项和全词边界跨越分段
+        with mock.patch('yunji.findindex.SCAN_CHUNK_SIZE', 5):
+            for key in [('ab', True, False), ('AB', False, True), ('abab', False, False), ('😀a', True, False)]:
+                index = MatchIndex(document)
+                index.start(*key)
+                while not index.advance(0):
+                    pass
+                self.assertEqual(index.spans(), find_spans(build_text_pattern(*key), text))
+
+    def test_narrowing_extended_query(self):
+        rng = random.Random(7)
+        text_edit = QPlainTextEdit()
+        document = text_edit.document()
+        narrowed = 0
+        for _ in range(40):
+            document.setPlainText(''.join(rng.choice('abAB \n') for _ in range(300)))
+            index = MatchIndex(document)
+            case_sensitive = rng.random() < 0.5
+            query = ''
+            for char in rng.choices('abAB', k=4):
+                query += char
+                narrow = index.can_narrow(query, case_sensitive, False)
+                index.rebuild(query, case_sensitive, False)
+                fresh = MatchIndex(document)
+                fresh.rebuild(query, case_sensitive, False)
+                self.assertEqual(index.spans(), fresh.spans())
+                narrowed += narrow
+        self.assertGreater(narrowed, 0)
+        index = MatchIndex(document)
+        index.rebuild('ab', True, False)
+        self.assertTrue(index.can_narrow('abb', True, False))
+        self.assertFalse(index.can_narrow('abb', True, True))
+        self.assertFalse(index.can_narrow('xab', True, False))
+        index.rebuild('aa', True, False)
+        self.assertFalse(index.can_narrow('aab', True, False))
+
+class TestEditorResultLabel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def wait_for_count(self):
+        deadline = time.monotonic() + 10
+        while ((self.editor.find_timer.isActive() or self.editor.find_index.pending())
+               and time.monotonic() < deadline):
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.app.processEvents()
+
+    def test_label_follows_edits(self):
+        self.editor.text_edit.setPlainText('one two one')
+        self.editor.find_text()
+        self.editor.find_dialog.find_input.setText('one')
+        self.editor.find_next_text()
+        self.assertEqual(self.editor.find_dialog.result_label.text(), '1/2')
+        cursor = self.editor.text_edit.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(' one')
+        self.editor.updates.flush()  # 查找结果在下一帧刷新
+        self.assertEqual(self.editor.find_dialog.result_label.text(), '1/3')
+        self.editor.text_edit.setTextCursor(cursor)
+        cursor.setPosition(0)
+        cursor.insertText('x')  # "xone" 仍然包含 one
+        self.editor.updates.flush()
+        self.assertEqual(self.editor.find_dialog.result_label.text(), '0/3')
+        self.editor.find_dialog.whole_checkbox.setChecked(True)
+        self.editor.update_result_label()
+        self.assertEqual(self.editor.find_dialog.result_label.text(), '0/2')
+        self.editor.find_dialog.close()
+
+    def test_type_ahead_selects_nearest_match_and_counts_in_slices(self):
+        text_edit = self.editor.text_edit
+        text_edit.setPlainText('alpha beta\n' * 100000 + 'gamma alpha')
+        cursor = text_edit.textCursor()
+        cursor.setPosition(15)
+        text_edit.setTextCursor(cursor)
+        self.editor.find_text()
+        dialog = self.editor.find_dialog
+        for query in ['a', 'al', 'alp']:
+            dialog.find_input.setText(query)
+        self.assertEqual(dialog.result_label.text(), '0/0')  # 输入停顿之前不查找
+        with mock.patch('yunji.editor.COUNT_SLICE_TIME', 0):
+            self.editor.find_timer.timeout.emit()
+        self.assertEqual(text_edit.textCursor().selectionStart(), 22)
+        self.assertTrue(dialog.result_label.text().endswith('+'))
+        self.wait_for_count()
+        self.assertEqual(dialog.result_label.text(), '3/100001')
+        # 在旧查询后追加内容时只检查旧的匹配位置
+        dialog.find_input.setText('alpha')
+        self.assertTrue(self.editor.find_index.can_narrow('alpha', False, False))
+        self.wait_for_count()
+        self.assertEqual(dialog.result_label.text(), '3/100001')
+        dialog.close()
+
+    def test_type_ahead_does_not_scan_whole_document(self):
+        # 附近没有匹配项时不在界面线程中扫描整个文档，等分段统计找到后再选中
+        text_edit = self.editor.text_edit
+        text_edit.setPlainText('alpha beta\n' * 100000 + 'gamma')
+        self.editor.find_text()
+        dialog = self.editor.find_dialog
+        dialog.find_input.setText('gamma')
+        with mock.patch('yunji.editor.COUNT_SLICE_TIME', 0), mock.patch('yunji.editor.TYPE_AHEAD_WINDOW', 1000), \
+                mock.patch.object(QTextDocument, 'find', side_effect=AssertionError('full scan')):
+            self.editor.find_timer.timeout.emit()
+            self.assertFalse(text_edit.textCursor().hasSelection())
+            self.assertIsNotNone(self.editor.type_ahead_from)
+            self.wait_for_count()
+        self.assertEqual(text_edit.textCursor().selectedText(), 'gamma')
+        self.assertEqual(dialog.result_label.text(), '1/1')
+        # 统计完成后不再保留文档文本的快照
+        self.assertIsNone(self.editor.find_index.text)
+        dialog.close()
+
+    def test_highlight_all_covers_only_visible_matches(self):
+        text_edit = self.editor.text_edit
+        text_edit.setPlainText('foo bar foo\n' * 20000)
+        self.editor.resize(600, 400)
+        self.editor.show()
+        self.editor.find_text()
+        self.editor.find_dialog.find_input.setText('foo')
+        self.editor.find_dialog.highlight_checkbox.setChecked(True)
+        self.wait_for_count()
+        selections = text_edit.match_selections
+        start, stop = text_edit.visible_range()
+        self.assertTrue(0 < len(selections) < 200)
+        self.assertTrue(all(start <= item.cursor.selectionStart() < stop for item in selections))
+        # 与当前行高亮合并在一起
+        self.assertEqual(len(text_edit.extraSelections()), len(selections) + 1)
+        scrollbar = text_edit.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+        self.app.processEvents()
+        self.assertEqual(text_edit.match_selections[-1].cursor.selectedText(), 'foo')
+        self.assertGreater(text_edit.match_selections[0].cursor.selectionStart(), 200000)
+        # 编辑后可见范围内新出现的匹配项也被高亮
+        count = len(text_edit.match_selections)
+        cursor = text_edit.cursorForPosition(text_edit.viewport().rect().center())
+        cursor.insertText('foo ')
+        self.editor.updates.flush()
+        self.assertEqual(len(text_edit.match_selections), count + 1)
+        self.editor.find_dialog.close()
+        self.assertEqual(text_edit.match_selections, [])
+
+if __name__ == '__main__':
+    unittest.main()
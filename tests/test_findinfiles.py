@@ -0,0 +1,108 @@
+# test_findinfiles.py
+
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from yunji.editor import YunjiEditor
+from yunji.findinfiles import FindInFilesWorker, iter_files, search_file, split_globs
+
+class TestFindInFiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.write('a.txt', 'alpha\nfoo bar Foo\n'.encode('utf-8'))
+        self.write('b.log', '第一行\n查找 foo\r\n'.encode('gbk'))
+        self.write('c.bin', b'foo\0binary')
+        self.write(os.path.join('.git', 'HEAD'), b'foo')
+        self.write(os.path.join('sub', 'd.conf'), b'x foo\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+
+    def names(self, includes='', excludes='.git'):
+        files = iter_files(self.root, split_globs(includes), split_globs(excludes))
+        return [os.path.relpath(path, self.root) for path, _ in files]
+
+    def test_include_and_exclude_globs(self):
+        self.assertEqual(self.names(), ['a.txt', 'b.log', 'c.bin', os.path.join('sub', 'd.conf')])
+        self.assertEqual(self.names('*.log;*.conf'), ['b.log', os.path.join('sub', 'd.conf')])
+        self.assertEqual(self.names('', '.git;sub;*.bin'), ['a.txt', 'b.log'])
+
+    def test_search_file_rules(self):
+        path = os.path.join(self.root, 'a.txt')
+        self.assertEqual(search_file(path, ('foo', False, False, False)),
+                         [(1, 0, 3, 'foo bar Foo'), (1, 8, 3, 'foo bar Foo')])
+        self.assertEqual(search_file(path, ('foo', True, False, False)), [(1, 0, 3, 'foo bar Foo')])
+        self.assertEqual(search_file(path, ('fo+', False, False, True)),
+                         [(1, 0, 3, 'foo bar Foo'), (1, 8, 3, 'foo bar Foo')])
+        self.assertEqual(search_file(path, ('missing', False, False, False)), [])
+        # 非 UTF-8 编码的文件按检测到的编码解码，列以字符计
+        self.assertEqual(search_file(os.path.join(self.root, 'b.log'), ('foo', False, False, False)),
+                         [(1, 3, 3, '查找 foo')])
+        self.assertEqual(search_file(os.path.join(self.root, 'c.bin'), ('foo', False, False, False)), [])
+
+    def test_prefilter_finds_match_across_chunk_boundary(self):
+        # 不区分大小写的预筛分块进行，跨越块边界的匹配也要找到
+        self.write('e.txt', b'x' * 30 + b'NeEdLe' + b'y' * 30)
+        path = os.path.join(self.root, 'e.txt')
+        with mock.patch('yunji.findinfiles.PREFILTER_CHUNK_SIZE', 32):
+            self.assertEqual(search_file(path, ('needle', False, False, False)),
+                             [(0, 30, 6, 'x' * 30 + 'NeEdLe' + 'y' * 30)])
+            self.assertEqual(search_file(path, ('needles', False, False, False)), [])
+
+    def test_cancel_does_not_wait_for_running_batches(self):
+        # 回溯很慢的表达式使每个批次运行很久，取消后线程应立即结束，并结束工作进程
+        self.write('slow.txt', ('a' * 40 + '!\n').encode('ascii'))
+        existing = multiprocessing.active_children()
+        worker = FindInFilesWorker(self.root, ('(a+)+$', True, False, True), ['slow.txt'], [], workers=1)
+        worker.start()
+        time.sleep(1)
+        started = time.monotonic()
+        worker.cancel()
+        self.assertTrue(worker.wait(5000))
+        self.assertLess(time.monotonic() - started, 5)
+        deadline = time.monotonic() + 5
+        while set(multiprocessing.active_children()) - set(existing) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(set(multiprocessing.active_children()) - set(existing), set())
+
+    def test_worker_streams_results_and_editor_jumps(self):
+        worker = FindInFilesWorker(self.root, ('foo', True, True, False), [], split_globs('.git'), workers=2)
+        results = {}
+        progress = []
+        worker.file_matched.connect(lambda path, matches: results.setdefault(os.path.relpath(path, self.root), matches))
+        worker.progress.connect(lambda *args: progress.append(args))
+        worker.start()
+        deadline = time.monotonic() + 30
+        while not worker.isFinished() and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.app.processEvents()
+        self.assertEqual(sorted(results), ['a.txt', 'b.log', os.path.join('sub', 'd.conf')])
+        self.assertEqual(progress[-1][:2], (4, 4))
+
+        editor = YunjiEditor()
+        try:
+            editor.open_file_at(os.path.join(self.root, 'b.log'), 1, 3, 3)
+            cursor = editor.text_edit.textCursor()
+            self.assertEqual(cursor.blockNumber(), 1)
+            self.assertEqual(cursor.selectedText(), 'foo')
+        finally:
+            editor.close()
+
+if __name__ == '__main__':
+    unittest.main()
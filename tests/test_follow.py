@@ -0,0 +1,103 @@
+# test_follow.py
+
+import os
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from yunji.editor import YunjiEditor
+from yunji.follow import FileFollower
+
+class TestFileFollower(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.test_file = 'testfile_follow.log'
+        with open(self.test_file, 'wb') as file:
+            file.write(b'first\n')
+        self.follower = FileFollower(self.test_file, 'utf-8', 6)
+        self.received = []
+        self.follower.appended.connect(self.received.append)
+        self.follower.start()
+
+    def tearDown(self):
+        self.follower.stop()
+        os.remove(self.test_file)
+
+    def append(self, data):
+        with open(self.test_file, 'ab') as file:
+            file.write(data)
+
+    def test_reads_only_new_bytes_across_split_characters(self):
+        encoded = '第二行\r\n'.encode('utf-8')
+        self.append(encoded[:4])
+        self.follower.poll()
+        self.append(encoded[4:])
+        self.follower.poll()
+        self.assertEqual(''.join(self.received), '第二行\n')
+        self.follower.poll()
+        self.assertEqual(''.join(self.received), '第二行\n')
+
+    def test_truncation_restarts_from_beginning(self):
+        truncated = []
+        self.follower.truncated.connect(lambda: truncated.append(True))
+        with open(self.test_file, 'wb') as file:
+            file.write(b'new\n')
+        self.follower.poll()
+        self.assertEqual(truncated, [True])
+        self.assertEqual(self.received, ['new\n'])
+
+    def test_rotation_drains_old_file_then_follows_new(self):
+        self.append(b'tail of old\n')
+        with open(self.test_file + '.new', 'wb') as file:
+            file.write(b'rotated\n')
+        os.replace(self.test_file + '.new', self.test_file)
+        self.follower.poll()
+        self.assertEqual(''.join(self.received), 'tail of old\nrotated\n')
+
+class TestEditorFollowMode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.test_file = 'testfile_follow_editor.log'
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write('line 1\n')
+        self.editor = YunjiEditor()
+        self.editor.open_file(self.test_file)
+
+    def tearDown(self):
+        self.editor.close()
+        os.remove(self.test_file)
+
+    def test_follow_appends_without_marking_modified(self):
+        self.editor.start_following()
+        self.assertTrue(self.editor.text_edit.isReadOnly())
+        with open(self.test_file, 'a', encoding='utf-8') as file:
+            file.write('line 2\n')
+        self.editor.follower.poll()
+        self.assertEqual(self.editor.text_edit.toPlainText(), 'line 1\nline 2\n')
+        self.assertFalse(self.editor.text_edit.document().isModified())
+        self.assertEqual(self.editor.status_label_doc.text(), "文档状态: 跟踪中")
+        self.editor.stop_following()
+        self.assertFalse(self.editor.text_edit.isReadOnly())
+        self.assertFalse(self.editor.follow_action.isChecked())
+
+    def test_follow_starts_after_bytes_actually_read(self):
+        # 获取文件大小之后文件又被追加，跟踪应从实际读入的位置继续，不重复追加
+        with open(self.test_file, 'a', encoding='utf-8') as file:
+            file.write('line 2\n')
+        with mock.patch('os.path.getsize', return_value=len('line 1\n')):
+            self.editor.open_file(self.test_file)
+        self.assertEqual(self.editor.file_offset, len('line 1\nline 2\n'))
+        self.editor.start_following()
+        with open(self.test_file, 'a', encoding='utf-8') as file:
+            file.write('line 3\n')
+        self.editor.follower.poll()
+        self.assertEqual(self.editor.text_edit.toPlainText(), 'line 1\nline 2\nline 3\n')
+        self.editor.stop_following()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# test_gutter.py
+
+import unittest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor, QImage, QPainter, QTextCursor
+from PyQt5.QtCore import Qt
+from yunji.editor import YunjiEditor
+from yunji.gutter import GutterRenderer, MARKER_COLORS, block_marks
+
+class TestGutterRenderer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_font_and_numbers_are_reused(self):
+        gutter = GutterRenderer()
+        gutter.set_point_size(12)
+        font = gutter.font
+        text = gutter.number_text(42)
+        gutter.set_point_size(12)
+        self.assertIs(gutter.font, font)
+        self.assertIs(gutter.number_text(42), text)
+        self.assertEqual(gutter.width(99), gutter.width(10))
+        self.assertEqual(gutter.width(100) - gutter.width(99), gutter.digit_width)
+        gutter.set_point_size(20)
+        self.assertGreater(gutter.digit_width, 0)
+        self.assertIsNot(gutter.font, font)
+        self.assertIsNot(gutter.number_text(42), text)
+
+    def test_paint_numbers_and_markers(self):
+        gutter = GutterRenderer()
+        gutter.set_point_size(12)
+        width = gutter.width(1000)
+        image = QImage(width, gutter.line_height * 3, QImage.Format_RGB32)
+        painter = QPainter(image)
+        lines = [(0, 7, ()), (gutter.line_height, 1000, {'bookmark'}), (gutter.line_height * 2, 12, {'added'})]
+        gutter.paint(painter, image.rect(), width, QColor(Qt.black), lines)
+        painter.end()
+        middle = gutter.line_height // 2
+        self.assertEqual(image.pixelColor(0, middle), QColor(Qt.gray))
+        self.assertEqual(image.pixelColor(0, gutter.line_height * 2 + middle), MARKER_COLORS['added'])
+        self.assertNotEqual(image.pixelColor(3, gutter.line_height + middle), QColor(Qt.gray))
+        # 数字右对齐，一位数的行号左侧没有内容
+        row = [image.pixelColor(x, middle) for x in range(width)]
+        dark = [x for x, color in enumerate(row) if color.value() < 64]
+        self.assertTrue(dark)
+        self.assertGreaterEqual(min(dark), width - gutter.digit_width)
+
+class TestBookmarks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.text_edit = self.editor.text_edit
+        self.text_edit.setPlainText('\n'.join(f'line {number}' for number in range(10)))
+
+    def tearDown(self):
+        self.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def move_to_line(self, line):
+        cursor = QTextCursor(self.text_edit.document().findBlockByNumber(line))
+        self.text_edit.setTextCursor(cursor)
+
+    def test_bookmarks_follow_edits_and_wrap(self):
+        for line in (2, 6):
+            self.move_to_line(line)
+            self.editor.toggle_bookmark()
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.insertText('new\n')
+        self.assertEqual(block_marks(self.text_edit.document().findBlockByNumber(3)), {'bookmark'})
+        self.move_to_line(0)
+        self.editor.goto_bookmark()
+        self.assertEqual(self.text_edit.textCursor().blockNumber(), 3)
+        self.editor.goto_bookmark()
+        self.assertEqual(self.text_edit.textCursor().blockNumber(), 7)
+        self.editor.goto_bookmark()
+        self.assertEqual(self.text_edit.textCursor().blockNumber(), 3)
+        self.editor.goto_bookmark(backward=True)
+        self.assertEqual(self.text_edit.textCursor().blockNumber(), 7)
+        self.editor.toggle_bookmark()
+        self.assertEqual(block_marks(self.text_edit.textCursor().block()), set())
+        self.editor.goto_bookmark()
+        self.editor.goto_bookmark()
+        self.assertEqual(self.text_edit.textCursor().blockNumber(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
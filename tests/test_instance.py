@@ -0,0 +1,92 @@
+# test_instance.py
+
+import os
+import stat
+import unittest
+from PyQt5.QtCore import QStandardPaths
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtNetwork import QLocalSocket
+from yunji.editor import YunjiEditor
+from yunji.instance import InstanceServer, send_to_running_instance, server_name
+
+class TestInstanceServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.name = f'yunji-test-{os.getpid()}'
+        self.server = InstanceServer(name=self.name)
+        self.received = []
+        self.server.files_received.connect(self.received.append)
+
+    def tearDown(self):
+        self.server.close()
+
+    def receive(self):
+        # 不进入事件循环，直接等待连接和数据
+        self.assertTrue(self.server.server.waitForNewConnection(1000))
+        for socket in self.server.server.findChildren(QLocalSocket):
+            while not self.received and socket.waitForReadyRead(1000):
+                pass
+
+    def test_files_are_forwarded_as_absolute_paths(self):
+        self.assertTrue(self.server.listen())
+        self.assertTrue(send_to_running_instance(['a.txt'], self.name))
+        self.receive()
+        self.assertEqual(self.received, [[os.path.abspath('a.txt')]])
+
+    def test_no_running_instance(self):
+        self.assertFalse(send_to_running_instance(['a.txt'], self.name))
+
+    @unittest.skipIf(os.name == 'nt', '命名管道没有套接字文件')
+    def test_socket_is_private_to_user(self):
+        # 默认的套接字位于当前用户的运行时目录中，套接字文件本身也只有当前用户能访问
+        runtime_dir = QStandardPaths.writableLocation(QStandardPaths.RuntimeLocation)
+        self.assertEqual(os.path.dirname(server_name()), runtime_dir)
+        server = InstanceServer(name=os.path.join(runtime_dir, f'yunji-test-{os.getpid()}.sock'))
+        self.addCleanup(server.close)
+        self.assertTrue(server.listen())
+        self.assertEqual(stat.S_IMODE(os.stat(server.server.fullServerName()).st_mode) & 0o077, 0)
+        self.assertTrue(send_to_running_instance(['a.txt'], server.name))
+
+    def test_second_server_does_not_take_over(self):
+        self.assertTrue(self.server.listen())
+        other = InstanceServer(name=self.name)
+        self.assertFalse(other.listen())
+
+class TestOpenFiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.editor.show()
+        self.files = ['testfile_instance_1.txt', 'testfile_instance_2.txt']
+        for path in self.files:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(path)
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+        for path in self.files:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_files_open_in_tabs(self):
+        self.editor.open_files([os.path.abspath(path) for path in self.files])
+        # 空的标签页直接使用，之后的文件打开新标签页
+        self.assertEqual(len(self.editor.tabs), 2)
+        self.assertEqual(self.editor.current_tab, 1)
+        self.assertEqual(self.editor.text_edit.toPlainText(), self.files[1])
+        self.assertEqual(self.editor.tabs[0].document.toPlainText(), self.files[0])
+        # 已经打开的文件切换到它所在的标签页
+        self.editor.open_files([self.files[0]])
+        self.assertEqual(len(self.editor.tabs), 2)
+        self.assertEqual(self.editor.current_tab, 0)
+        self.assertEqual(self.editor.child_windows, [])
+
+if __name__ == '__main__':
+    unittest.main()
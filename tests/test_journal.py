@@ -0,0 +1,96 @@
+# test_journal.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.journal import find_orphaned_journals, read_journal
+
+class TestRecoveryJournal(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch('yunji.journal.JOURNAL_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.test_file = os.path.join(self.directory, 'document.txt')
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write("第一行\n第二行\n")
+        self.editor = YunjiEditor()
+        self.editor.open_file(self.test_file)
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+        shutil.rmtree(self.directory)
+
+    def edit(self):
+        cursor = QTextCursor(self.editor.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        for char in "新增":
+            cursor.insertText(char)
+        cursor.setPosition(0)
+        cursor.setPosition(3, QTextCursor.KeepAnchor)
+        cursor.insertText("首行")
+
+    def stop_journal(self):
+        # 写入剩余记录并停止后台线程，保留日志文件
+        journal = self.editor.temp_file
+        journal.close(discard=False)
+        self.editor.temp_file = None
+        return journal.journal_path
+
+    def test_journal_is_created_on_first_edit_and_records_deltas(self):
+        self.assertIsNone(self.editor.temp_file)
+        self.edit()
+        self.assertIsNotNone(self.editor.temp_file)
+        header, snapshot, deltas = read_journal(self.stop_journal())
+        self.assertEqual(header['path'], self.test_file)
+        self.assertIsNone(snapshot)
+        # 连续输入合并为一条记录
+        self.assertEqual(deltas, [[8, 0, "新增"], [0, 3, "首行"]])
+
+    def test_restore_replays_unclean_session(self):
+        self.edit()
+        expected = self.editor.text_edit.toPlainText()
+        journal_path = self.stop_journal()
+        restored = YunjiEditor()
+        restored.restore_from_journal(journal_path)
+        self.assertEqual(restored.text_edit.toPlainText(), expected)
+        self.assertTrue(restored.text_edit.document().isModified())
+        self.assertEqual(restored.file_path, self.test_file)
+        restored.text_edit.document().setModified(False)
+        restored.close()
+
+    def test_saving_discards_journal(self):
+        self.edit()
+        journal_path = self.editor.temp_file.journal_path
+        self.editor.save_file()
+        self.assertIsNone(self.editor.temp_file)
+        self.assertFalse(os.path.exists(journal_path))
+
+    def test_compaction_replaces_deltas_with_snapshot(self):
+        self.edit()
+        with mock.patch('yunji.journal.JOURNAL_COMPACT_SIZE', 0):
+            self.editor.temp_file.written = 10 ** 6
+            self.editor.text_edit.appendPlainText("X")
+        header, snapshot, deltas = read_journal(self.stop_journal())
+        self.assertEqual(snapshot, self.editor.text_edit.toPlainText())
+        self.assertEqual(deltas, [])
+
+    def test_orphaned_journals_exclude_live_processes(self):
+        orphan = os.path.join(self.directory, '999999999-1.journal')
+        live = os.path.join(self.directory, f'{os.getpid()}-99.journal')
+        for path in (orphan, live):
+            open(path, 'wb').close()
+        self.assertEqual(find_orphaned_journals(), [orphan])
+
+if __name__ == '__main__':
+    unittest.main()
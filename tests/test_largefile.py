@@ -0,0 +1,98 @@
+# test_largefile.py
+
+import os
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+from yunji.editor import YunjiEditor
+from yunji.largefile import MappedFile, build_byte_pattern
+
+class TestMappedFile(unittest.TestCase):
+    def setUp(self):
+        self.test_file = 'testfile_large.txt'
+        self.lines = [f"第{index}行 line {index}" for index in range(500)]
+        with open(self.test_file, 'wb') as file:
+            file.write("\r\n".join(self.lines).encode('utf-8'))
+        # 使用很小的索引块，覆盖跨块定位的情况
+        patcher = mock.patch.multiple('yunji.largefile', INDEX_BLOCK_SIZE=64, INDEX_SCAN_SIZE=256)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mapped = MappedFile(self.test_file, 'utf-8')
+        self.mapped.build_index()
+
+    def tearDown(self):
+        self.mapped.close()
+        os.remove(self.test_file)
+
+    def test_line_index(self):
+        self.assertEqual(self.mapped.line_count(), len(self.lines))
+        for line in (0, 1, 77, 499):
+            data, _ = self.mapped.line_bytes(self.mapped.line_offset(line))
+            self.assertEqual(self.mapped.decode(data), self.lines[line])
+            self.assertEqual(self.mapped.line_of_offset(self.mapped.line_offset(line)), line)
+
+    def test_index_is_sparse(self):
+        self.assertLessEqual(len(self.mapped.newline_counts), self.mapped.size // 64 + 2)
+
+    def test_find_forward_and_backward(self):
+        pattern = build_byte_pattern("LINE 42", 'utf-8', False, True)
+        span = self.mapped.find(pattern, 0)
+        self.assertEqual(self.mapped.line_of_offset(span[0]), 42)
+        span = self.mapped.find(pattern, self.mapped.size, backward=True)
+        self.assertEqual(self.mapped.line_of_offset(span[0]), 42)
+        self.assertIsNone(self.mapped.find(build_byte_pattern("LINE 42", 'utf-8', True, False), 0))
+
+class TestLargeFileMode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.test_file = 'testfile_large_mode.txt'
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write("\n".join(f"row {index}" for index in range(1000)))
+
+    def tearDown(self):
+        self.editor.close()
+        os.remove(self.test_file)
+
+    def test_open_in_large_file_mode(self):
+        with mock.patch('yunji.editor.LARGE_FILE_THRESHOLD', 0):
+            self.editor.open_file(self.test_file)
+        self.assertTrue(self.editor.large_file_mode)
+        deadline = time.time() + 5
+        while not self.editor.large_view.index_complete() and time.time() < deadline:
+            self.app.processEvents()
+        self.assertEqual(self.editor.large_view.line_count(), 1000)
+        self.editor.large_view.set_cursor(10, 2)
+        self.assertEqual(self.editor.status_label_line.text(), "行: 11 ;  列: 3")
+        self.assertTrue(self.editor.large_view.find("row 999"))
+        self.assertEqual(self.editor.large_view.cursor_line, 999)
+
+        self.editor.open_file(self.test_file)
+        self.assertFalse(self.editor.large_file_mode)
+        self.assertTrue(self.editor.text_edit.toPlainText().startswith("row 0\n"))
+
+    def test_click_places_cursor_by_text_width(self):
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write('short\n' + 'ab\t' * 20000)
+        with mock.patch('yunji.editor.LARGE_FILE_THRESHOLD', 0):
+            self.editor.open_file(self.test_file)
+        view = self.editor.large_view
+        metrics = view.fontMetrics()
+        y = view.line_height() + 1
+        for prefix in ('', 'a', 'ab\t', 'ab\t' * 300 + 'a'):
+            # 点击在下一个字符的中间时光标位于该字符之前；x 从左边距 4 像素处开始计算
+            width = metrics.horizontalAdvance(prefix.replace('\t', '    '))
+            x = 4 + width + (metrics.horizontalAdvance('b') // 2 if prefix.endswith('a') else 1)
+            view.horizontalScrollBar().setValue(0)
+            view.mousePressEvent(QMouseEvent(QMouseEvent.MouseButtonPress, QPoint(x, y), Qt.LeftButton,
+                                             Qt.LeftButton, Qt.NoModifier))
+            self.assertEqual((view.cursor_line, view.cursor_column), (1, len(prefix)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# test_loader.py
+
+import os
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.loader import detect_line_ending, make_decoder
+
+class TestLoaderHelpers(unittest.TestCase):
+    def test_decoder_keeps_split_multibyte_char(self):
+        data = "你好，云记".encode('utf-8')
+        decoder = make_decoder('utf-8')
+        # 在多字节字符中间切分
+        text = decoder.decode(data[:4]) + decoder.decode(data[4:], final=True)
+        self.assertEqual(text, "你好，云记")
+
+    def test_decoder_translates_split_crlf(self):
+        decoder = make_decoder('utf-8')
+        text = decoder.decode(b"a\r") + decoder.decode(b"\nb") + decoder.decode(b"", final=True)
+        self.assertEqual(text, "a\nb")
+
+    def test_decoder_reports_replaced_bytes(self):
+        decoder = make_decoder('utf-8')
+        self.assertEqual(decoder.decode("云".encode('utf-8')[:2]), '')
+        self.assertFalse(decoder.lossy)
+        self.assertEqual(decoder.decode(b"\x91a\xffb", final=True), "云a\ufffdb")
+        self.assertTrue(decoder.lossy)
+
+    def test_line_ending_detected_while_decoding(self):
+        for data, expected in ((b"a\r\nb\r\n", ('CRLF', False)), (b"a\nb", ('LF', False)),
+                               (b"a\rb\r", ('CR', False)), (b"a\r\nb\nc", ('CRLF', True))):
+            decoder = make_decoder('utf-8')
+            decoder.decode(data[:2])
+            decoder.decode(data[2:], final=True)
+            self.assertEqual(detect_line_ending(decoder), expected)
+
+class TestAsyncOpen(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.test_file = 'testfile_async.txt'
+
+    def tearDown(self):
+        self.editor.close()
+        if os.path.exists(self.test_file):
+            os.remove(self.test_file)
+
+    def wait_for_load(self, timeout=10):
+        deadline = time.time() + timeout
+        while self.editor.loading and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+
+    def test_lossy_document_asks_before_saving(self):
+        with open(self.test_file, 'wb') as file:
+            file.write(b"line\n\xff\nend")
+        with mock.patch('yunji.loader.detect_file_encoding', return_value=('utf-8', 0.99)):
+            self.editor.open_file(self.test_file)
+        self.assertTrue(self.editor.lossy_decoding)
+        self.assertIn('有无法解码的字节', self.editor.status_label_encoding.text())
+        self.editor.text_edit.moveCursor(QTextCursor.Start)
+        self.editor.text_edit.insertPlainText('x')
+        with mock.patch.object(QMessageBox, 'warning', return_value=QMessageBox.Cancel) as warning:
+            self.editor.save_file()
+        warning.assert_called_once()
+        with open(self.test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"line\n\xff\nend")
+        with mock.patch.object(QMessageBox, 'warning', return_value=QMessageBox.Save):
+            self.editor.save_file()
+        with open(self.test_file, 'rb') as file:
+            self.assertEqual(file.read(), "xline\n\ufffd\nend".encode('utf-8'))
+        self.assertFalse(self.editor.lossy_decoding)
+
+    def test_async_open(self):
+        test_text = "第 1 行\n" + "line\n" * 5000
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write(test_text)
+        with mock.patch('yunji.editor.ASYNC_LOAD_THRESHOLD', 0):
+            self.editor.open_file(self.test_file)
+            self.assertTrue(self.editor.loading)
+            self.wait_for_load()
+        self.assertFalse(self.editor.loading)
+        self.assertEqual(self.editor.text_edit.toPlainText(), test_text)
+        self.assertEqual(self.editor.file_path, self.test_file)
+        self.assertTrue(self.editor.is_saved)
+        self.assertFalse(self.editor.text_edit.isReadOnly())
+
+    def test_cancel_loading(self):
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write("line\n" * 5000)
+        with mock.patch('yunji.editor.ASYNC_LOAD_THRESHOLD', 0):
+            self.editor.open_file(self.test_file)
+            self.editor.cancel_loading()
+        self.assertFalse(self.editor.loading)
+        self.assertIsNone(self.editor.file_path)
+        self.assertEqual(self.editor.text_edit.toPlainText(), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# test_minimap.py
+
+import unittest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor, QMouseEvent, QTextCursor
+from PyQt5.QtCore import Qt, QPoint, QEvent
+from yunji.editor import YunjiEditor
+from yunji.minimap import render_tile, TILE_BLOCKS, LINE_PIXELS
+
+class TestRenderTile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_words_become_runs(self):
+        image = render_tile(['  ab  c', '\tx'], QColor(Qt.black))
+        row = [image.pixelColor(x, 0).alpha() for x in range(8)]
+        self.assertEqual([x for x, alpha in enumerate(row) if alpha], [2, 3, 6])
+        self.assertEqual(image.pixelColor(4, LINE_PIXELS).alpha(), 255)
+        self.assertEqual(image.pixelColor(3, LINE_PIXELS).alpha(), 0)
+
+class TestMinimap(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.editor.resize(800, 600)
+        self.text_edit = self.editor.text_edit
+        self.minimap = self.text_edit.minimap
+        self.text_edit.setPlainText(''.join(f'line {number}\n' for number in range(TILE_BLOCKS * 10)))
+
+    def tearDown(self):
+        self.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def render(self, keys):
+        # 等待后台线程生成图块，只投递已排队的事件，不处理其他窗口的计时器
+        self.minimap.request_tiles(keys)
+        while self.minimap.requested:
+            self.minimap.renderer.wait()
+            QApplication.sendPostedEvents()
+
+    def test_edits_expire_only_touched_tiles(self):
+        self.render(range(4))
+        self.assertEqual(sorted(self.minimap.tiles), [0, 1, 2, 3])
+        cursor = QTextCursor(self.text_edit.document().findBlockByNumber(TILE_BLOCKS + 5))
+        cursor.insertText('more')
+        self.assertEqual(self.minimap.stale, {1})
+        old = self.minimap.tiles[2]
+        cursor.insertText('\n')
+        self.assertEqual(self.minimap.stale, {1, 2, 3})
+        # 过期的图块在重新生成之前仍显示旧图像
+        self.assertIs(self.minimap.tiles[2], old)
+        self.render([1, 2])
+        self.assertEqual(self.minimap.stale, {3})
+        self.assertIsNot(self.minimap.tiles[2], old)
+
+    def test_click_scrolls_editor(self):
+        self.minimap.resize(100, 400)
+        y = TILE_BLOCKS * 2 * LINE_PIXELS
+        for kind in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            QApplication.sendEvent(self.minimap, QMouseEvent(kind, QPoint(10, y), Qt.LeftButton, Qt.LeftButton, Qt.NoModifier))
+        first = self.text_edit.firstVisibleBlock().blockNumber()
+        self.assertGreater(first, 0)
+        self.assertLessEqual(first, TILE_BLOCKS * 2)
+        self.assertIsNone(self.minimap.drag_offset)
+
+    def test_toggle_minimap(self):
+        self.editor.toggle_minimap(False)
+        self.assertEqual(self.text_edit.viewportMargins().right(), 0)
+        self.editor.toggle_minimap(True)
+        self.assertEqual(self.text_edit.viewportMargins().right(), self.minimap.width())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# test_piece_table.py
+
+import os
+import random
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from yunji.editor import YunjiEditor
+from yunji.largefile import MappedFile, build_byte_pattern
+from yunji.piece_table import PieceTable, find_all, replace_all
+from yunji.saver import discard_temp_file
+
+class TestPieceTable(unittest.TestCase):
+    def setUp(self):
+        self.test_file = 'testfile_piece_table.txt'
+        self.original = "".join(f"第{index}行 line {index}\n" for index in range(300)).encode('utf-8')
+        with open(self.test_file, 'wb') as file:
+            file.write(self.original)
+        patcher = mock.patch.multiple('yunji.largefile', INDEX_BLOCK_SIZE=64, INDEX_SCAN_SIZE=256)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mapped = MappedFile(self.test_file, 'utf-8')
+        self.mapped.build_index()
+        self.table = PieceTable(self.mapped)
+
+    def tearDown(self):
+        self.mapped.close()
+        os.remove(self.test_file)
+
+    def content(self):
+        return b''.join(self.table.iter_chunks())
+
+    def test_random_edits_match_reference(self):
+        rng = random.Random(5)
+        expected = bytearray(self.original)
+        for _ in range(300):
+            offset = rng.randrange(len(expected) + 1)
+            if rng.random() < 0.6:
+                data = rng.choice([b'x', b'ab\n', b'\n', '中'.encode('utf-8')])
+                self.table.insert(offset, data)
+                expected[offset:offset] = data
+            else:
+                length = rng.randrange(1, 20)
+                self.table.delete(offset, length)
+                del expected[offset:offset + length]
+        self.assertEqual(self.content(), bytes(expected))
+        lines = bytes(expected).split(b'\n')
+        self.assertEqual(self.table.line_count(), len(lines))
+        for line in (0, 1, len(lines) // 2, len(lines) - 1):
+            start = self.table.line_offset(line)
+            self.assertEqual(self.table.line_bytes(start, 1024)[0], lines[line])
+            self.assertEqual(self.table.line_of_offset(start), line)
+
+    def test_original_is_untouched_and_undo_restores_it(self):
+        self.table.insert(0, b'head\n')
+        self.table.delete(100, 50)
+        self.assertTrue(self.table.is_modified())
+        self.assertEqual(self.mapped.mm[:], self.original)
+        while self.table.undo() is not None:
+            pass
+        self.assertEqual(self.content(), self.original)
+        self.assertFalse(self.table.is_modified())
+        self.assertIsNotNone(self.table.redo())
+
+    def test_replace_all_is_one_undo_step(self):
+        pattern = build_byte_pattern("line", 'utf-8', True, True)
+        self.assertEqual(replace_all(self.table, pattern, b'LN'), 300)
+        self.assertNotIn(b'line', self.content())
+        self.table.undo()
+        self.assertEqual(self.content(), self.original)
+
+    def test_find_all_across_windows(self):
+        # 窗口很小时结果也与一次扫描整个文档相同，包括跨越窗口边界和全字匹配的判断
+        self.table.replace(0, 4, b'xline ')
+        content = self.content()
+        for find_str, whole_words in (("line", False), ("line", True), ("行 line 1", False), ("ine", True)):
+            pattern = build_byte_pattern(find_str, 'utf-8', True, whole_words)
+            expected = [match.span() for match in pattern.finditer(content)]
+            for window in (300, 301, 302, 303):
+                self.assertEqual(find_all(self.table, pattern, window=window), expected)
+        self.assertEqual(find_all(self.table, build_byte_pattern("ine", 'utf-8', True, True), window=300), [])
+
+    def test_replace_all_rebuilds_once(self):
+        self.table.insert(5, b'line\n')
+        expected = self.content().replace(b'line', b'LN\n')
+        with mock.patch.object(PieceTable, '_invalidate', autospec=True,
+                               side_effect=PieceTable._invalidate) as invalidate:
+            self.assertEqual(replace_all(self.table, build_byte_pattern("line", 'utf-8', True, False), b'LN\n'), 301)
+        self.assertEqual(invalidate.call_count, 1)
+        self.assertEqual(self.content(), expected)
+        lines = expected.split(b'\n')
+        self.assertEqual(self.table.line_count(), len(lines))
+        for line in (0, 1, 2, 300, len(lines) - 1):
+            start = self.table.line_offset(line)
+            self.assertEqual(self.table.line_bytes(start, 1024)[0], lines[line])
+            self.assertEqual(self.table.line_of_offset(start), line)
+        self.table.undo()
+        self.assertEqual(self.content().replace(b'line', b'LN\n'), expected)
+
+class TestLargeFileEditing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.test_file = 'testfile_piece_edit.txt'
+        with open(self.test_file, 'wb') as file:
+            file.write(b"".join(b"row %d\r\n" % index for index in range(1000)))
+        self.assertTrue(self.editor.open_large_file(self.test_file, editable=True))
+        self.view = self.editor.large_view
+        self.wait_until(self.view.can_edit)
+
+    def tearDown(self):
+        self.view.close_file()
+        self.editor.close()
+        os.remove(self.test_file)
+
+    def wait_until(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.app.processEvents()
+        self.assertTrue(condition())
+
+    def test_edit_undo_and_save(self):
+        QTest.keyClicks(self.view, "AB")
+        QTest.keyClick(self.view, Qt.Key_Return)
+        self.assertTrue(self.editor.is_document_modified())
+        self.assertEqual(self.editor.status_label_doc.text(), "文档状态: 已修改")
+        self.assertEqual(self.view.table.read(0, 9), b"AB\r\nrow 0")
+        self.editor.undo()
+        self.assertEqual(self.view.table.read(0, 5), b"row 0")
+        self.editor.redo()
+        self.editor.save_file()
+        self.wait_until(lambda: self.view.can_edit() and not self.view.saving)
+        with open(self.test_file, 'rb') as file:
+            self.assertTrue(file.read().startswith(b"AB\r\nrow 0\r\nrow 1"))
+        self.assertFalse(self.editor.is_document_modified())
+        self.assertEqual(self.editor.status_label_doc.text(), "文档状态: 已保存")
+
+    def test_failed_replace_keeps_edits(self):
+        QTest.keyClicks(self.view, "AB")
+
+        def locked(temp_path, target):
+            # 与 replace_file 失败时一样删除临时文件
+            discard_temp_file(temp_path)
+            raise PermissionError('locked')
+
+        with mock.patch('yunji.largefile.replace_file', side_effect=locked), \
+                mock.patch.object(self.editor, 'show_error_dialog') as error_dialog:
+            self.editor.save_file()
+            self.wait_until(lambda: not self.view.saving)
+        error_dialog.assert_called_once()
+        with open(self.test_file, 'rb') as file:
+            self.assertTrue(file.read().startswith(b"row 0\r\n"))
+        # 修改仍在片段表中，原文件重新映射后可以继续编辑和保存
+        self.assertTrue(self.view.can_edit())
+        self.assertTrue(self.editor.is_document_modified())
+        self.assertEqual(self.view.table.read(0, 7), b"ABrow 0")
+        self.assertEqual(self.view.current_line_text(), "ABrow 0")
+        self.editor.save_file()
+        self.wait_until(lambda: self.view.can_edit() and not self.view.saving)
+        with open(self.test_file, 'rb') as file:
+            self.assertTrue(file.read().startswith(b"ABrow 0\r\nrow 1"))
+
+    def test_replace_all_in_large_mode(self):
+        self.assertEqual(self.view.replace_all("row", "line", True, True), 1000)
+        self.assertEqual(self.view.current_line_text(), "line 0")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_policy.py
+
+import os
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from yunji.editor import YunjiEditor
+from yunji.policy import LineStats, longest_line, reduced_features
+from yunji.scheduler import FRAME_INTERVAL
+
+class TestPolicyHelpers(unittest.TestCase):
+    def test_longest_line_across_chunks(self):
+        text = 'ab\n' + 'c' * 10 + '\n\n' + 'd' * 7
+        self.assertEqual(longest_line(text), 10)
+        for size in (1, 2, 4, 5):
+            stats = LineStats()
+            for start in range(0, len(text), size):
+                stats.feed(text[start:start + size])
+            self.assertEqual(stats.longest, 10)
+        self.assertEqual(longest_line('x' * 12), 12)
+        self.assertEqual(longest_line(''), 0)
+
+    def test_thresholds(self):
+        self.assertEqual(reduced_features(1024, 80), set())
+        self.assertEqual(reduced_features(1024, 20000), {'syntax', 'current_line', 'line_numbers', 'minimap'})
+        self.assertEqual(reduced_features(64 * 1024 * 1024, 80), {'syntax', 'minimap', 'live_status'})
+
+class TestEditorPolicy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.small_file = 'testfile_policy_small.py'
+        self.long_file = 'testfile_policy_long.py'
+        with open(self.small_file, 'w', encoding='utf-8') as file:
+            file.write('def f():\n    pass\n')
+        with open(self.long_file, 'w', encoding='utf-8') as file:
+            file.write('x = 1\n' + 'y' * 20000 + '\n')
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+        for path in (self.small_file, self.long_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_long_lines_reduce_features_until_reenabled(self):
+        self.editor.open_file(self.small_file)
+        self.assertIsNotNone(self.editor.text_edit.syntax.grammar)
+        self.assertTrue(self.editor.policy_button.isHidden())
+        self.editor.open_file(self.long_file)
+        self.assertEqual(self.editor.reduced_features, {'syntax', 'current_line', 'minimap'})
+        self.assertIsNone(self.editor.text_edit.syntax.grammar)
+        self.assertFalse(self.editor.text_edit.current_line_visible)
+        self.assertFalse(self.editor.show_minimap_action.isChecked())
+        self.assertFalse(self.editor.policy_button.isHidden())
+        self.assertIn('语法高亮', self.editor.policy_button.toolTip())
+        # 逐项重新开启
+        actions = [action.text() for action in self.editor.policy_menu.actions() if action.text()]
+        self.assertEqual(actions, ['开启语法高亮', '开启高亮当前行', '开启缩略图', '全部开启'])
+        self.editor.policy_menu.actions()[0].trigger()
+        self.assertIsNotNone(self.editor.text_edit.syntax.grammar)
+        self.assertEqual(self.editor.reduced_features, {'current_line', 'minimap'})
+        # 打开普通文件时恢复被策略关闭的功能
+        self.editor.open_file(self.small_file)
+        self.assertEqual(self.editor.reduced_features, set())
+        self.assertTrue(self.editor.text_edit.current_line_visible)
+        self.assertTrue(self.editor.show_minimap_action.isChecked())
+        self.assertTrue(self.editor.policy_button.isHidden())
+
+    def test_user_choice_is_not_overridden(self):
+        self.editor.toggle_minimap(False)
+        self.editor.show_minimap_action.setChecked(False)
+        thresholds = {'live_status': ('实时刷新状态栏', 10, None), 'minimap': ('缩略图', 10, None)}
+        with mock.patch.dict('yunji.policy.POLICY_FEATURES', thresholds):
+            self.editor.open_file(self.small_file)
+        # 用户已经关闭的缩略图不算作被策略关闭，重新开启时也不会打开
+        self.assertEqual(self.editor.reduced_features, {'live_status'})
+        self.assertNotEqual(self.editor.updates.timer.interval(), FRAME_INTERVAL)
+        self.editor.enable_all_features()
+        self.assertEqual(self.editor.updates.timer.interval(), FRAME_INTERVAL)
+        self.assertFalse(self.editor.show_minimap_action.isChecked())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# test_regexsearch.py
+
+import re
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+from yunji.editor import YunjiEditor
+from yunji import regexsearch
+from yunji.regexsearch import RegexSearch
+from yunji.replacer import apply_replacements
+
+def wait_until(app, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    app.processEvents()
+
+class TestRegexSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def run_search(self, pattern, text, replace_str=None):
+        search = RegexSearch((pattern.pattern, True, False), pattern, text, replace_str)
+        result = {'matches': []}
+        search.found.connect(lambda matches, done, total: result['matches'].extend(matches))
+        search.search_finished.connect(lambda count: result.setdefault('count', count))
+        search.search_failed.connect(lambda message: result.setdefault('error', message))
+        search.start()
+        wait_until(self.app, lambda: 'count' in result or 'error' in result)
+        search.wait()
+        return result
+
+    def test_matches_per_line_with_group_expansion(self):
+        text = 'id=1 id=22\n😀 id=333\nnone'
+        result = self.run_search(re.compile(r'id=(\d+)'), text)
+        self.assertEqual(result['count'], 3)
+        # 位置以 UTF-16 为单位，😀 占两个单位
+        self.assertEqual(result['matches'], [(0, 4), (5, 10), (14, 20)])
+        # 替换时相距较近的匹配项合并为一段
+        result = self.run_search(re.compile(r'id=(\d+)'), text, r'<\1>')
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['matches'], [(0, 20, '<1> <22>\n😀 <333>')])
+
+    def test_replacements_far_apart_are_separate_regions(self):
+        text = 'id=1 id=22\n' + 'x' * 50 + '\n😀 id=333'
+        with mock.patch('yunji.regexsearch.REPLACE_MERGE_GAP', 20):
+            result = self.run_search(re.compile(r'id=(\d+)'), text, r'<\1>')
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['matches'], [(0, 10, '<1> <22>'), (65, 71, '<333>')])
+        text_edit = QPlainTextEdit()
+        text_edit.setPlainText(text)
+        apply_replacements(text_edit.document(), result['matches'])
+        self.assertEqual(text_edit.toPlainText(), '<1> <22>\n' + 'x' * 50 + '\n😀 <333>')
+
+    def test_long_line_is_not_mistaken_for_runaway(self):
+        # 一次扫描很长的一行超过了固定的时间预算，但子进程事先报告了行长，不应判为超时
+        with mock.patch('yunji.regexsearch.REGEX_TIME_BUDGET', 0.05):
+            result = self.run_search(re.compile(r'a(?!b)'), 'ab' * 5000000 + 'a')
+        self.assertEqual(result.get('error'), None)
+        self.assertEqual(result['matches'], [(10000000, 10000001)])
+
+    def test_runaway_pattern_is_stopped(self):
+        with mock.patch('yunji.regexsearch.REGEX_TIME_BUDGET', 0.5):
+            started = time.monotonic()
+            result = self.run_search(re.compile(r'(a+)+$'), 'a' * 40 + 'b')
+        self.assertIn('超时', result['error'])
+        self.assertLess(time.monotonic() - started, 5)
+        # 终止失控的子进程后，下一次搜索重新启动子进程
+        result = self.run_search(re.compile(r'a+b'), 'a' * 40 + 'b')
+        self.assertEqual(result['matches'], [(0, 41)])
+
+    def test_searches_share_one_spawned_process(self):
+        self.run_search(re.compile('x'), 'x')
+        process = regexsearch._process
+        self.assertEqual(process._start_method, 'spawn')
+        result = self.run_search(re.compile('y'), 'xy')
+        self.assertEqual(result['matches'], [(1, 2)])
+        self.assertIs(regexsearch._process, process)
+
+    def test_cancel_stops_search_without_killing_process(self):
+        self.run_search(re.compile('x'), 'x')
+        process = regexsearch._process
+        search = RegexSearch(('a', True, False), re.compile('a'), 'a\n' * 2000000)
+        finished = []
+        search.search_finished.connect(finished.append)
+        search.start()
+        time.sleep(0.2)
+        search.cancel()
+        search.wait()
+        self.app.processEvents()
+        self.assertEqual(finished, [])
+        self.assertIs(regexsearch._process, process)
+        result = self.run_search(re.compile('b'), 'ab')
+        self.assertEqual(result['matches'], [(1, 2)])
+
+class TestEditorRegexMode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.editor.text_edit.setPlainText('key=1\nkey=22\nother')
+        self.editor.replace_text()
+        self.dialog = self.editor.find_dialog
+        self.dialog.regex_checkbox.setChecked(True)
+        self.dialog.find_input.setText(r'key=(\d+)')
+        patcher = mock.patch('yunji.editor.QMessageBox.information')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def test_result_label_streams_and_find_next_selects_match(self):
+        wait_until(self.app, lambda: self.editor.regex_complete)
+        self.assertEqual(self.dialog.result_label.text(), '0/2')
+        self.editor.find_next_text()
+        self.editor.find_next_text()
+        self.assertEqual(self.editor.text_edit.textCursor().selectedText(), 'key=22')
+        self.assertEqual(self.dialog.result_label.text(), '2/2')
+
+    def test_replace_with_capture_groups(self):
+        self.dialog.replace_input.setText(r'\1=key')
+        self.editor.replace_all_text()
+        wait_until(self.app, lambda: self.editor.replacer is None)
+        self.assertEqual(self.editor.text_edit.toPlainText(), '1=key\n22=key\nother')
+
+    def test_edit_or_query_change_cancels_search(self):
+        search = self.editor.regex_search
+        self.assertIsNotNone(search)
+        self.editor.text_edit.textCursor().insertText('x')
+        self.assertTrue(search.is_cancelled())
+        self.assertIsNone(self.editor.regex_key)
+        wait_until(self.app, lambda: self.editor.regex_complete)
+        self.assertEqual(self.dialog.result_label.text(), '0/2')
+        self.dialog.find_input.setText('(')
+        self.assertEqual(self.dialog.result_label.text(), '错误')
+
+if __name__ == '__main__':
+    unittest.main()
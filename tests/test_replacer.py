@@ -0,0 +1,127 @@
+# test_replacer.py
+
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.findindex import build_text_pattern
+from yunji.replacer import plan_replacements, apply_replacements, map_position
+
+class TestPlanReplacements(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def apply(self, text, find_str, replace_str, case_sensitive=False, whole_words=False):
+        pattern = build_text_pattern(find_str, case_sensitive, whole_words)
+        edits, count = plan_replacements(pattern, text, replace_str)
+        text_edit = QPlainTextEdit()
+        text_edit.setPlainText(text)
+        apply_replacements(text_edit.document(), edits)
+        return text_edit.toPlainText(), count, edits
+
+    def test_same_rules_as_find(self):
+        text = 'Cat cat_1 concat CAT\ncat'
+        self.assertEqual(self.apply(text, 'cat', 'dog')[:2], ('dog dog_1 condog dog\ndog', 5))
+        self.assertEqual(self.apply(text, 'cat', 'dog', case_sensitive=True)[:2], ('Cat dog_1 condog CAT\ndog', 3))
+        # 全字匹配时下划线不算单词字符，与 QTextDocument.FindWholeWords 相同
+        self.assertEqual(self.apply(text, 'cat', 'dog', whole_words=True)[:2], ('dog dog_1 concat dog\ndog', 4))
+
+    def test_replacement_is_literal_and_positions_are_utf16(self):
+        text = '😀 a.b 😀 a.b ' + 'x' * 10000 + ' a.b'
+        result, count, edits = self.apply(text, 'a.b', r'\1\n')
+        self.assertEqual(result, text.replace('a.b', r'\1\n'))
+        self.assertEqual(count, 3)
+        # 相距较近的匹配项合并为一段
+        self.assertEqual(len(edits), 2)
+
+    def test_map_position(self):
+        edits = [(2, 5, 'x'), (10, 12, 'long text')]
+        self.assertEqual(map_position(1, edits), 1)
+        self.assertEqual(map_position(4, edits), 3)
+        self.assertEqual(map_position(7, edits), 5)
+        self.assertEqual(map_position(20, edits), 25)
+
+class TestEditorReplaceAll(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        patcher = mock.patch('yunji.editor.QMessageBox.information')
+        self.information = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def start_replace(self, text, find_str, replace_str):
+        self.editor.text_edit.setPlainText(text)
+        self.editor.replace_text()
+        self.editor.find_dialog.find_input.setText(find_str)
+        self.editor.find_dialog.replace_input.setText(replace_str)
+
+    def test_replace_all_is_one_undo_step_and_keeps_cursor(self):
+        text = 'item,1\n' * 500 + 'tail'
+        self.start_replace(text, 'item', 'entry')
+        cursor = self.editor.text_edit.textCursor()
+        cursor.setPosition(len(text) - 2)
+        self.editor.text_edit.setTextCursor(cursor)
+        self.editor.replace_all_text()
+        self.assertEqual(self.editor.text_edit.toPlainText(), text.replace('item', 'entry'))
+        self.assertEqual(self.editor.text_edit.textCursor().position(), len(text) - 2 + 500)
+        self.information.assert_called_once()
+        self.editor.text_edit.undo()
+        self.assertEqual(self.editor.text_edit.toPlainText(), text)
+
+    def test_replace_all_keeps_scroll_position_when_wrapping(self):
+        # 自动换行时滚动条的值是显示行号而不是段落号
+        text = ('item ' * 200 + '\n') * 100
+        self.start_replace(text, 'item', 'entry')
+        text_edit = self.editor.text_edit
+        text_edit.setLineWrapMode(QPlainTextEdit.WidgetWidth)
+        self.editor.resize(600, 400)
+        self.editor.show()
+        self.app.processEvents()
+        block = text_edit.document().findBlockByNumber(50)
+        self.assertGreater(block.firstLineNumber(), 50)
+        text_edit.verticalScrollBar().setValue(block.firstLineNumber())
+        self.app.processEvents()
+        # 不合并匹配项，使位置换算是精确的
+        with mock.patch('yunji.replacer.REPLACE_MERGE_GAP', 0):
+            self.editor.replace_all_text()
+        self.app.processEvents()
+        self.assertEqual(text_edit.firstVisibleBlock().blockNumber(), 50)
+
+    def test_background_replace_all(self):
+        text = 'a b a\n' * 2000
+        with mock.patch('yunji.editor.REPLACE_ASYNC_THRESHOLD', 100):
+            self.start_replace(text, 'a', 'c')
+            self.editor.replace_all_text()
+        replacer = self.editor.replacer
+        self.assertTrue(self.editor.text_edit.isReadOnly())
+        self.assertFalse(self.editor.find_dialog.progress_bar.isHidden())
+        replacer.wait()
+        self.app.processEvents()
+        self.assertIsNone(self.editor.replacer)
+        self.assertFalse(self.editor.text_edit.isReadOnly())
+        self.assertEqual(self.editor.text_edit.toPlainText(), text.replace('a', 'c'))
+        self.assertEqual(self.editor.find_dialog.result_label.text(), '0/0')
+
+    def test_edit_during_background_replace_discards_result(self):
+        text = 'a b a\n' * 2000
+        with mock.patch('yunji.editor.REPLACE_ASYNC_THRESHOLD', 100):
+            self.start_replace(text, 'a', 'c')
+            self.editor.replace_all_text()
+        self.editor.replacer.wait()
+        cursor = QTextCursor(self.editor.text_edit.document())
+        cursor.insertText('new ')
+        self.app.processEvents()
+        self.assertEqual(self.editor.text_edit.toPlainText(), 'new ' + text)
+        self.information.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
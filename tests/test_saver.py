@@ -0,0 +1,97 @@
+# test_saver.py
+
+import os
+import time
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor, QTextDocument
+from yunji.editor import YunjiEditor
+from yunji.saver import iter_document_chunks, write_atomic
+
+class TestSaveHelpers(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.test_file = 'testfile_saver.txt'
+
+    def tearDown(self):
+        if os.path.exists(self.test_file):
+            os.remove(self.test_file)
+
+    def test_chunks_follow_block_boundaries(self):
+        text = "\n".join(f"第{index}行 😀" for index in range(300))
+        document = QTextDocument()
+        document.setPlainText(text)
+        chunks = list(iter_document_chunks(document, 50))
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual("".join(chunks), text)
+
+    def test_failed_write_keeps_original(self):
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write("original")
+        with self.assertRaises(UnicodeEncodeError):
+            write_atomic(self.test_file, ["ascii ", "云记"], 'ascii')
+        with open(self.test_file, encoding='utf-8') as file:
+            self.assertEqual(file.read(), "original")
+        self.assertEqual([name for name in os.listdir('.') if name.startswith('.' + self.test_file)], [])
+
+    def test_line_endings_are_converted_per_chunk(self):
+        write_atomic(self.test_file, ["a\nb", "\nc\n"], 'utf-8', '\r\n')
+        with open(self.test_file, 'rb') as file:
+            self.assertEqual(file.read(), b"a\r\nb\r\nc\r\n")
+
+class TestAsyncSave(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.test_file = 'testfile_async_save.txt'
+        self.editor.file_path = self.test_file
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)  # 避免关闭时弹出保存确认
+        self.editor.close()
+        if os.path.exists(self.test_file):
+            os.remove(self.test_file)
+
+    def wait_for_save(self, timeout=10):
+        deadline = time.time() + timeout
+        while self.editor.saver and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+    def test_async_save(self):
+        test_text = "\n".join(f"line {index}" for index in range(2000))
+        self.editor.text_edit.setPlainText(test_text)
+        with mock.patch('yunji.editor.ASYNC_SAVE_THRESHOLD', 0), \
+                mock.patch('yunji.saver.SAVE_CHUNK_CHARS', 100):
+            self.editor.save_file()
+            self.assertIsNotNone(self.editor.saver)
+            self.assertEqual(self.editor.status_label_doc.text(), "文档状态: 保存中…")
+            self.wait_for_save()
+        self.assertTrue(self.editor.is_saved)
+        self.assertFalse(self.editor.text_edit.document().isModified())
+        with open(self.test_file, encoding='utf-8') as file:
+            self.assertEqual(file.read(), test_text)
+
+    def test_edit_in_written_part_keeps_document_modified(self):
+        self.editor.text_edit.setPlainText("\n".join(f"line {index}" for index in range(2000)))
+        with mock.patch('yunji.editor.ASYNC_SAVE_THRESHOLD', 0), \
+                mock.patch('yunji.saver.SAVE_CHUNK_CHARS', 100):
+            self.editor.save_file()
+            while self.editor.saver.position == 0:
+                self.app.processEvents()
+            cursor = QTextCursor(self.editor.text_edit.document())
+            cursor.insertText("edited ")
+            self.wait_for_save()
+        self.assertFalse(self.editor.is_saved)
+        with open(self.test_file, encoding='utf-8') as file:
+            self.assertTrue(file.read().startswith("line 0\n"))
+
+if __name__ == '__main__':
+    unittest.main()
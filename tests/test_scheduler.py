@@ -0,0 +1,66 @@
+# test_scheduler.py
+
+import time
+import unittest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.scheduler import UpdateScheduler
+
+class TestUpdateScheduler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def test_marks_are_coalesced_until_next_frame(self):
+        scheduler = UpdateScheduler()
+        calls = []
+        scheduler.register('first', lambda: calls.append('first'))
+        scheduler.register('second', lambda: calls.append('second'))
+        for _ in range(5):
+            scheduler.mark('second')
+            scheduler.mark('first')
+        self.assertEqual(calls, [])
+        deadline = time.monotonic() + 5
+        while not calls and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.005)
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertEqual(scheduler.skipped, 8)
+        scheduler.mark('first')
+        scheduler.flush()
+        self.assertEqual(calls, ['first', 'second', 'first'])
+        self.assertFalse(scheduler.timer.isActive())
+
+class TestEditorUpdates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def test_cursor_moves_and_edits_update_status_once(self):
+        text_edit = self.editor.text_edit
+        text_edit.setPlainText('line\n' * 100)
+        self.editor.updates.flush()
+        labels = []
+        self.editor.status_label_line.setText = lambda text: labels.append(text)
+        cursor = text_edit.textCursor()
+        for _ in range(50):
+            cursor.movePosition(QTextCursor.Down)
+            text_edit.setTextCursor(cursor)
+        text_edit.insertPlainText('abc')
+        self.assertEqual(labels, [])
+        self.assertEqual(self.editor.status_label_doc.text(), '文档状态: 已修改')
+        self.editor.updates.flush()
+        self.assertEqual(labels, ['行: 51 ;  列: 4'])
+        self.assertGreaterEqual(self.editor.updates.skipped, 100)
+        self.assertIn(str(self.editor.updates.skipped), self.editor.status_label_line.toolTip())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# test_session.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from yunji import session
+from yunji.editor import YunjiEditor
+from yunji.encoding import clear_detection_cache, detect_path_encoding
+from yunji.session import SessionStore
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SessionStore(os.path.join(self.directory, 'session.sqlite3'))
+        self.test_file = os.path.join(self.directory, 'a.txt')
+        with open(self.test_file, 'w', encoding='gbk') as file:
+            file.write("中文内容" * 100)
+        clear_detection_cache()
+
+    def tearDown(self):
+        self.store.close()
+        clear_detection_cache()
+        shutil.rmtree(self.directory)
+
+    def test_file_state_round_trip(self):
+        self.assertIsNone(self.store.file_state(self.test_file))
+        self.store.save_file_state(self.test_file, cursor=12, scroll=3, font_size=18, line_numbers=True, wrap=False)
+        self.assertEqual(self.store.file_state(self.test_file),
+                         {'cursor': 12, 'scroll': 3, 'font_size': 18, 'line_numbers': 1, 'wrap': 0})
+
+    def test_remembered_encoding_skips_detection_until_file_changes(self):
+        self.store.remember_encoding(self.test_file, 'gb18030', 0.9)
+        self.store.prime_detection(self.test_file)
+        with mock.patch('yunji.encoding.detect_encoding') as detect:
+            self.assertEqual(detect_path_encoding(self.test_file), ('gb18030', 0.9))
+            detect.assert_not_called()
+        with open(self.test_file, 'a', encoding='gbk') as file:
+            file.write("追加")
+        clear_detection_cache()
+        self.store.prime_detection(self.test_file)
+        self.assertNotEqual(detect_path_encoding(self.test_file), ('gb18030', 0.9))
+
+    def test_session_skips_missing_files(self):
+        self.store.save_session([(self.test_file, True), (os.path.join(self.directory, 'gone.txt'), False)])
+        self.assertEqual(self.store.load_session(), [(self.test_file, True)])
+
+class TestEditorSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch('yunji.session.SESSION_DB', os.path.join(self.directory, 'session.sqlite3'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session.close_session_store()
+        self.addCleanup(session.close_session_store)
+        self.files = []
+        for index in range(3):
+            path = os.path.join(self.directory, f'file{index}.txt')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("\n".join(f"line {line}" for line in range(200)))
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_state_is_restored_when_file_is_reopened(self):
+        editor = YunjiEditor()
+        editor.open_file(self.files[0])
+        cursor = editor.text_edit.textCursor()
+        cursor.setPosition(50)
+        editor.text_edit.setTextCursor(cursor)
+        editor.show_line_numbers_action.setChecked(True)
+        editor.auto_wrap_action.setChecked(False)
+        editor.close()
+        reopened = YunjiEditor()
+        reopened.open_file(self.files[0])
+        self.assertEqual(reopened.text_edit.textCursor().position(), 50)
+        self.assertTrue(reopened.show_line_numbers_action.isChecked())
+        self.assertFalse(reopened.auto_wrap_action.isChecked())
+        reopened.close()
+
+    def test_restore_session_loads_only_the_active_document(self):
+        session.session_store().save_session([(self.files[0], False), (self.files[1], True), (self.files[2], False)])
+        editor = YunjiEditor()
+        editor.restore_session()
+        self.assertEqual(editor.file_path, self.files[1])
+        # 其余文档在各自的标签页中，切换过去时才读取
+        self.assertEqual(len(editor.tabs), 3)
+        self.assertEqual(editor.current_tab, 1)
+        for index, path in ((0, self.files[0]), (2, self.files[2])):
+            self.assertEqual(editor.tabs[index].state['pending_file'], path)
+            self.assertIsNone(editor.tabs[index].document)
+        editor.tab_bar.setCurrentIndex(0)
+        self.assertEqual(editor.file_path, self.files[0])
+        self.assertIsNone(editor.pending_file)
+        self.assertTrue(editor.text_edit.toPlainText().startswith("line 0"))
+        editor.close()
+
+if __name__ == '__main__':
+    unittest.main()
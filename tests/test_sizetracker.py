@@ -0,0 +1,110 @@
+# test_sizetracker.py
+
+import os
+import random
+import threading
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.sizetracker import DocumentSizeTracker, MAX_PATCH_BLOCKS
+
+class TestDocumentSizeTracker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def expected_size(self, document, encoding, newline):
+        text = document.toPlainText()
+        return len(text.replace('\n', newline).encode(encoding)) if text else 0
+
+    def test_random_edits_match_full_encoding(self):
+        for encoding, line_ending, newline in (('utf-8', 'LF', '\n'), ('gbk', 'CRLF', '\r\n'), ('utf-16', 'CRLF', '\r\n')):
+            edit = QPlainTextEdit()
+            document = edit.document()
+            tracker = DocumentSizeTracker(document)
+            tracker.set_format(encoding, line_ending)
+            edit.setPlainText("第一行\nsecond\n\n末尾")
+            self.assertIsNone(tracker.size())
+            self.assertTrue(tracker.advance())
+            self.assertEqual(tracker.size(), self.expected_size(document, encoding, newline))
+            rng = random.Random(3)
+            cursor = QTextCursor(document)
+            for _ in range(300):
+                end = document.characterCount() - 1
+                start = rng.randrange(end + 1)
+                cursor.setPosition(start)
+                cursor.setPosition(min(end, start + rng.randrange(8)), QTextCursor.KeepAnchor)
+                cursor.insertText(rng.choice(["x", "中\n", "\n\n", "", "ab\ncd"]))
+                self.assertEqual(tracker.size(), self.expected_size(document, encoding, newline))
+
+    def test_edits_while_building_keep_last_size(self):
+        edit = QPlainTextEdit()
+        document = edit.document()
+        tracker = DocumentSizeTracker(document)
+        edit.setPlainText('\n'.join(f'第 {number} 行' for number in range(5000)))
+        while not tracker.advance():
+            pass
+        last_size = tracker.size()
+        self.assertEqual(last_size, self.expected_size(document, 'utf-8', '\n'))
+        # 跨越很多段落的修改从修改处截断大小表，建立完成之前显示上一次得到的大小
+        cursor = QTextCursor(document)
+        cursor.setPosition(document.findBlockByNumber(100).position())
+        cursor.setPosition(document.findBlockByNumber(4900).position(), QTextCursor.KeepAnchor)
+        cursor.insertText('x\n' * (MAX_PATCH_BLOCKS + 10))
+        self.assertEqual(len(tracker.sizes), 100)
+        self.assertEqual(tracker.size(), last_size)
+        # 分段建立时继续编辑：已计算部分之内逐段更新，之后的部分留给 advance
+        rng = random.Random(5)
+        while not tracker.advance(0):
+            end = document.characterCount() - 1
+            start = rng.randrange(end + 1)
+            cursor.setPosition(start)
+            cursor.setPosition(min(end, start + rng.randrange(8)), QTextCursor.KeepAnchor)
+            cursor.insertText(rng.choice(["x", "中\n", "\n\n", "", "ab\ncd"]))
+            self.assertEqual(tracker.size(), last_size)
+        self.assertEqual(tracker.size(), self.expected_size(document, 'utf-8', '\n'))
+
+class TestEditorSizeLabel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.test_file = 'testfile_size.txt'
+        with open(self.test_file, 'w', encoding='utf-8') as file:
+            file.write("云记\n")
+        self.editor = YunjiEditor()
+        self.editor.open_file(self.test_file)
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+        os.remove(self.test_file)
+
+    def test_typing_does_not_stat_and_shows_unsaved_size(self):
+        self.assertEqual(self.editor.status_label_file_size.text(), "文件大小: 7.00 B")
+        calls = []
+        real_stat = os.stat
+
+        def tracking_stat(*args, **kwargs):
+            # 只关心界面线程；恢复日志在后台线程中创建目录
+            if threading.current_thread() is threading.main_thread():
+                calls.append(args)
+            return real_stat(*args, **kwargs)
+
+        with mock.patch('os.stat', side_effect=tracking_stat):
+            cursor = self.editor.text_edit.textCursor()
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText("编辑器")
+            self.editor.updates.flush()  # 未保存大小在下一帧刷新
+            # 大小表在空闲时建立，完成后再刷新一次
+            while self.editor.size_timer.isActive():
+                self.app.processEvents()
+            self.editor.updates.flush()
+        self.assertEqual(calls, [])
+        self.assertEqual(self.editor.status_label_file_size.text(), "文件大小: 7.00 B (未保存: 16.00 B)")
+
+if __name__ == '__main__':
+    unittest.main()
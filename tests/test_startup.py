@@ -0,0 +1,53 @@
+# test_startup.py
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+from PyQt5.QtWidgets import QApplication
+from yunji.editor import YunjiEditor
+from yunji.syntax import grammar_for_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ['chardet', 'webbrowser', 'multiprocessing', 'concurrent.futures', 'tempfile', 'PyQt5.QtNetwork']
+
+class TestDeferredImports(unittest.TestCase):
+    def test_editor_import_skips_heavy_modules(self):
+        # 在新的进程中检查，当前进程可能已经由其他测试导入了这些模块
+        code = ('import json, sys, yunji.editor; '
+                f'print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))')
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
+
+class TestLazyMenus(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+
+    def tearDown(self):
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def test_choice_menus_are_built_on_first_show(self):
+        self.assertEqual(self.editor.syntax_actions, {})
+        self.assertEqual(self.editor.line_ending_actions, {})
+        self.editor.choose_syntax(grammar_for_path('a.py'))
+        self.editor.set_line_ending('CRLF')
+        # 打开菜单时才创建菜单项，并勾选当前的状态
+        self.editor.syntax_menu.aboutToShow.emit()
+        self.editor.line_ending_menu.aboutToShow.emit()
+        checked = [action.text() for action in self.editor.syntax_menu.actions() if action.isChecked()]
+        self.assertEqual(checked, ['Python'])
+        checked = [action.text() for action in self.editor.line_ending_menu.actions() if action.isChecked()]
+        self.assertEqual(checked, ['CRLF'])
+        # 再次打开时不重复创建
+        self.editor.syntax_menu.aboutToShow.emit()
+        self.assertEqual(len(self.editor.syntax_menu.actions()), len(self.editor.syntax_actions))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# test_syntax.py
+
+import unittest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor
+from yunji.editor import YunjiEditor
+from yunji.syntax import PythonGrammar, JsonGrammar, YamlGrammar, grammar_for_path
+
+class TestGrammars(unittest.TestCase):
+    def test_python_triple_quotes_carry_state(self):
+        grammar = PythonGrammar()
+        spans, state = grammar.highlight_line('def f(x):', 0)
+        self.assertEqual(spans, [(0, 3, 'keyword'), (4, 1, 'definition')])
+        self.assertEqual(state, 0)
+        self.assertEqual(grammar.highlight_line('    """doc', 0), ([(4, 6, 'string')], 2))
+        self.assertEqual(grammar.highlight_line('still doc', 2), ([(0, 9, 'string')], 2))
+        self.assertEqual(grammar.highlight_line('a\\"""b""" + 1', 2), ([(0, 9, 'string'), (12, 1, 'number')], 0))
+        self.assertEqual(grammar.highlight_line("x = '\"\"\"'  # note", 0), ([(4, 5, 'string'), (11, 6, 'comment')], 0))
+
+    def test_json_and_yaml(self):
+        spans, state = JsonGrammar().highlight_line('{"a": [1.5, true, "b"]}', 0)
+        self.assertEqual([style for _, _, style in spans], ['key', 'number', 'constant', 'string'])
+        grammar = YamlGrammar()
+        spans, state = grammar.highlight_line('  text: |', 0)
+        self.assertEqual(spans, [(2, 4, 'key')])
+        self.assertEqual(state, 3)
+        self.assertEqual(grammar.highlight_line('    key: value', state), ([(0, 14, 'string')], 3))
+        self.assertEqual(grammar.highlight_line('  next: 1', state), ([(2, 4, 'key'), (8, 1, 'number')], 0))
+
+    def test_grammar_for_path(self):
+        self.assertIsInstance(grammar_for_path('a/b.PY'), PythonGrammar)
+        self.assertIsInstance(grammar_for_path('c.yml'), YamlGrammar)
+        self.assertIsNone(grammar_for_path('d.txt'))
+        self.assertIsNone(grammar_for_path(None))
+
+class TestSyntaxHighlighter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.editor.resize(800, 600)
+        self.text_edit = self.editor.text_edit
+        self.syntax = self.text_edit.syntax
+        self.document = self.text_edit.document()
+
+    def tearDown(self):
+        self.document.setModified(False)
+        self.editor.close()
+
+    def block(self, number):
+        return self.document.findBlockByNumber(number)
+
+    def fill(self):
+        # 直接执行空闲时的分段计算，不处理其他窗口的事件
+        while self.syntax.fill_timer.isActive():
+            self.syntax._fill_slice()
+
+    def test_visible_blocks_first_then_idle_fill(self):
+        self.text_edit.setPlainText('def f(x):\n    """doc\n    more"""\n    return x\n' * 5000)
+        self.editor.choose_syntax(PythonGrammar())
+        self.syntax.highlight_visible()
+        self.assertEqual(self.block(1).userState(), (2 << 1) | 1)
+        self.assertEqual([(r.start, r.length) for r in self.block(1).layout().formats()], [(4, 6)])
+        # 可见区域之外的段落既没有状态也没有格式
+        self.assertEqual(self.block(15000).userState(), -1)
+        self.fill()
+        self.assertEqual(self.syntax.filled_to, self.document.blockCount())
+        # 空闲时只计算状态，格式留到滚动到可见区域时再应用
+        self.assertEqual(self.block(15001).userState(), 2 << 1)
+        self.assertEqual(self.block(15001).layout().formats(), [])
+
+    def test_edit_rehighlights_only_changed_states(self):
+        self.text_edit.setPlainText('x = 1\n' * 50 + 'y = 2\n')
+        self.editor.choose_syntax(PythonGrammar())
+        self.fill()
+        cursor = QTextCursor(self.block(10))
+        cursor.insertText('"""')
+        self.assertEqual(self.block(10).userState() >> 1, 2)
+        self.assertEqual(self.block(50).userState() >> 1, 2)
+        cursor.insertText('"""')
+        self.assertEqual(self.block(50).userState() >> 1, 0)
+        # 不改变行尾状态的编辑只影响所在段落
+        self.block(30).setUserState(-1)
+        cursor = QTextCursor(self.block(5))
+        cursor.insertText('z')
+        self.assertEqual(self.block(30).userState(), -1)
+
+    def test_plain_text_and_size_limit(self):
+        self.text_edit.setPlainText('def f():\n    pass\n')
+        self.editor.choose_syntax(PythonGrammar())
+        self.syntax.highlight_visible()
+        self.assertTrue(self.block(0).layout().formats())
+        self.editor.choose_syntax(None)
+        self.assertEqual(self.block(0).layout().formats(), [])
+        self.assertEqual(self.block(0).userState(), -1)
+        self.editor.choose_syntax(PythonGrammar())
+        self.syntax.size_limit = 100
+        QTextCursor(self.document).insertText('#' * 200)
+        self.assertTrue(self.syntax.suspended)
+        self.assertEqual(self.block(0).layout().formats(), [])
+        self.syntax.highlight_visible()
+        self.assertEqual(self.block(1).userState(), -1)
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(200, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.assertFalse(self.syntax.suspended)
+        self.syntax.highlight_visible()
+        self.assertTrue(self.block(0).layout().formats())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# test_workspace.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from PyQt5 import sip
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtCore import QEvent
+from yunji import session
+from yunji.editor import YunjiEditor
+from yunji.workspace import DocumentTab, choose_evictions, document_memory
+
+class TestEvictions(unittest.TestCase):
+    def make_tab(self, path, chars, last_shown, modified=False):
+        tab = DocumentTab({'file_path': path, 'temp_file': None})
+        tab.document = QTextDocument()
+        tab.document.setPlainText('x' * chars)
+        tab.document.setModified(modified)
+        tab.last_shown = last_shown
+        return tab
+
+    def test_oldest_idle_documents_go_first(self):
+        current = self.make_tab('current', 1000, 0)
+        old = self.make_tab('old', 1000, 10)
+        older = self.make_tab('older', 1000, 5)
+        modified = self.make_tab('modified', 1000, 0, modified=True)
+        recent = self.make_tab('recent', 1000, 95)
+        tabs = [current, old, older, modified, recent]
+        total = sum(tab.memory() for tab in tabs)
+        self.assertEqual(choose_evictions(tabs, current, limit=total, idle_time=60, now=100), [])
+        self.assertEqual(choose_evictions(tabs, current, limit=total - 1, idle_time=60, now=100), [older])
+        self.assertEqual(choose_evictions(tabs, current, limit=0, idle_time=60, now=100), [older, old])
+        self.assertEqual(document_memory(None), 0)
+
+class TestWorkspace(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch('yunji.session.SESSION_DB', os.path.join(self.directory, 'session.sqlite3'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session.close_session_store()
+        self.addCleanup(session.close_session_store)
+        self.files = []
+        for index in range(2):
+            path = os.path.join(self.directory, f'file{index}.txt')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write("\n".join(f"file{index} line {line}" for line in range(100)))
+            self.files.append(path)
+        self.editor = YunjiEditor()
+
+    def tearDown(self):
+        for tab in self.editor.tabs:
+            if tab.document is not None:
+                tab.document.setModified(False)
+        self.editor.text_edit.document().setModified(False)
+        self.editor.close()
+        shutil.rmtree(self.directory)
+
+    def test_tabs_keep_their_own_documents(self):
+        self.editor.open_file(self.files[0])
+        cursor = self.editor.text_edit.textCursor()
+        cursor.setPosition(30)
+        self.editor.text_edit.setTextCursor(cursor)
+        self.editor.text_edit.insertPlainText('edit')
+        self.assertTrue(self.editor.new_tab())
+        self.editor.open_file(self.files[1])
+        self.assertEqual(self.editor.tab_bar.count(), 2)
+        self.assertEqual(self.editor.tab_bar.tabText(0), '*file0.txt')
+        self.assertEqual(self.editor.tab_bar.tabText(1), 'file1.txt')
+        self.assertFalse(self.editor.is_document_modified())
+        self.editor.tab_bar.setCurrentIndex(0)
+        self.assertEqual(self.editor.file_path, self.files[0])
+        self.assertTrue(self.editor.is_document_modified())
+        self.assertEqual(self.editor.text_edit.textCursor().position(), 34)
+        self.assertEqual(self.editor.status_label_doc.text(), '文档状态: 已修改')
+        # 撤销历史属于各自的文档
+        self.editor.undo()
+        self.assertFalse(self.editor.is_document_modified())
+        self.assertTrue(self.editor.text_edit.toPlainText().startswith('file0 line 0'))
+        self.assertIn('内存: 约', self.editor.tab_tooltip(1))
+
+    def test_idle_documents_are_evicted_and_reloaded(self):
+        self.editor.open_file(self.files[0])
+        cursor = self.editor.text_edit.textCursor()
+        cursor.setPosition(40)
+        self.editor.text_edit.setTextCursor(cursor)
+        self.editor.new_tab()
+        self.editor.open_file(self.files[1])
+        background = self.editor.tabs[0]
+        background.last_shown -= 3600
+        with mock.patch('yunji.editor.choose_evictions', lambda tabs, current: choose_evictions(tabs, current, limit=0)):
+            self.editor.evict_idle_documents()
+        self.assertIsNone(background.document)
+        self.assertEqual(background.state['pending_file'], self.files[0])
+        self.assertIn('已释放', self.editor.tab_tooltip(0))
+        self.editor.tab_bar.setCurrentIndex(0)
+        self.assertEqual(self.editor.file_path, self.files[0])
+        self.assertEqual(self.editor.text_edit.textCursor().position(), 40)
+        self.assertIn('内存: 约', self.editor.tab_tooltip(0))
+
+    def test_closing_tabs_releases_documents(self):
+        self.editor.open_file(self.files[0])
+        self.editor.new_tab()
+        self.editor.open_file(self.files[1])
+        self.editor.text_edit.insertPlainText('edit')
+        first = self.editor.tabs[0].document
+        self.editor.close_tab(0)
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        self.assertTrue(sip.isdeleted(first))
+        self.assertEqual(len(self.editor.tabs), 1)
+        self.assertEqual(self.editor.current_tab, 0)
+        # 关闭有修改的最后一个标签页时询问是否保存，之后换成空文档
+        with mock.patch.object(QMessageBox, 'question', return_value=QMessageBox.Discard) as question:
+            self.editor.close_tab(0)
+        question.assert_called_once()
+        self.assertEqual(len(self.editor.tabs), 1)
+        self.assertIsNone(self.editor.file_path)
+        self.assertEqual(self.editor.text_edit.toPlainText(), '')
+        self.assertEqual(self.editor.tab_bar.tabText(0), '未命名')
+
+if __name__ == '__main__':
+    unittest.main()
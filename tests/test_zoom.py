@@ -0,0 +1,81 @@
+# test_zoom.py
+
+import unittest
+from unittest import mock
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor, QWheelEvent
+from PyQt5.QtCore import Qt, QPoint, QPointF
+from yunji.editor import YunjiEditor
+from yunji.zoom import MAX_FONT_SIZE
+
+class TestZoom(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.editor = YunjiEditor()
+        self.editor.resize(800, 600)
+        self.text_edit = self.editor.text_edit
+        self.text_edit.setPlainText(''.join(f'line {number}\n' for number in range(2000)))
+
+    def tearDown(self):
+        self.text_edit.document().setModified(False)
+        self.editor.close()
+
+    def wheel(self, angle, times=1):
+        for _ in range(times):
+            event = QWheelEvent(QPointF(10, 10), QPointF(10, 10), QPoint(), QPoint(0, angle),
+                                Qt.NoButton, Qt.ControlModifier, Qt.NoScrollPhase, False)
+            with mock.patch.object(QApplication, 'keyboardModifiers', return_value=Qt.ControlModifier):
+                self.text_edit.wheelEvent(event)
+
+    def test_font_is_set_once_after_gesture(self):
+        size = self.text_edit.font().pointSize()
+        with mock.patch.object(self.text_edit, 'setFont', wraps=self.text_edit.setFont) as set_font:
+            self.wheel(120, 4)
+            # 缩放过程中只更新状态栏和预览，不修改字体
+            self.assertEqual(set_font.call_count, 0)
+            self.assertEqual(self.text_edit.font().pointSize(), size)
+            self.assertEqual(self.editor.status_label_zoom.text(), f'{int((size + 4) / size * 100)}%')
+            self.assertTrue(self.text_edit.zoom_timer.isActive())
+            self.assertFalse(self.text_edit.zoom_preview.isHidden())
+            self.text_edit.zoom_timer.timeout.emit()
+        self.assertEqual(set_font.call_count, 1)
+        self.assertEqual(self.text_edit.font().pointSize(), size + 4)
+        self.assertTrue(self.text_edit.zoom_preview.isHidden())
+        self.assertFalse(self.text_edit.zoom_timer.isActive())
+
+    def test_font_set_elsewhere_is_the_zoom_base(self):
+        # 字体对话框等直接设置字体后，缩放从新的字号开始，普通滚动也不会恢复旧字号
+        font = self.text_edit.font()
+        font.setPointSize(20)
+        self.text_edit.setFont(font)
+        self.assertEqual(self.text_edit.new_font_size, 20)
+        self.text_edit.apply_zoom()
+        self.assertEqual(self.text_edit.font().pointSize(), 20)
+        self.wheel(120)
+        self.text_edit.apply_zoom()
+        self.assertEqual(self.text_edit.font().pointSize(), 21)
+        self.assertEqual(self.editor.status_label_zoom.text(), f'{int(21 / self.text_edit.initial_font_size * 100)}%')
+
+    def test_size_is_clamped(self):
+        self.wheel(120, 100)
+        self.text_edit.apply_zoom()
+        self.assertEqual(self.text_edit.font().pointSize(), MAX_FONT_SIZE)
+        # 已经达到上限时继续滚动不会开始新的缩放
+        self.wheel(120)
+        self.assertFalse(self.text_edit.zoom_timer.isActive())
+
+    def test_cursor_block_stays_in_place(self):
+        self.text_edit.setTextCursor(QTextCursor(self.text_edit.document().findBlockByNumber(1000)))
+        self.text_edit.centerCursor()
+        block = self.text_edit.textCursor().block()
+        top = self.text_edit.blockBoundingGeometry(block).translated(self.text_edit.contentOffset()).top()
+        self.wheel(120, 6)
+        self.text_edit.apply_zoom()
+        after = self.text_edit.blockBoundingGeometry(block).translated(self.text_edit.contentOffset()).top()
+        self.assertLessEqual(abs(after - top), self.text_edit.fontMetrics().lineSpacing())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,49 +1,101 @@
 # editor
 import re
-import webbrowser
+import bisect
 import sys
 import os
-import chardet
-import platform
+import stat
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTextEdit, QPlainTextEdit, QMenu,
-                             QAction, QFileDialog, QMessageBox, QLabel, QColorDialog,
+                             QAction, QActionGroup, QFileDialog, QMessageBox, QLabel, QColorDialog,
                               QVBoxLayout, QWidget, QFontDialog, QHBoxLayout, QPushButton,
-                               QComboBox, QDialog, QLineEdit, QCheckBox, QStatusBar)
+                               QComboBox, QDialog, QLineEdit, QCheckBox, QStatusBar, QProgressBar,
+                               QPlainTextDocumentLayout)
 from PyQt5.QtGui import QIcon, QFont, QTextCharFormat, QTextDocument, QTextCursor, QPalette, QColor, QTextFormat, QPainter, QPixmap
 from PyQt5.QtCore import Qt, QSize,QEvent,QTimer, QRect
+from yunji.loader import FileLoader, ASYNC_LOAD_THRESHOLD, LINE_ENDINGS, default_line_ending, read_text_file
+from yunji.encoding import format_encoding, detect_path_encoding
+from yunji.saver import DocumentSaver, ASYNC_SAVE_THRESHOLD, iter_document_chunks, write_atomic, discard_temp_file
+from yunji.largefile import LargeFileView, LARGE_FILE_THRESHOLD, supports_large_file_mode
+from yunji.follow import FileFollower
+from yunji.session import session_store
+from yunji.sizetracker import DocumentSizeTracker
+from yunji.findindex import (MatchIndex, TYPE_AHEAD_DELAY, TYPE_AHEAD_WINDOW, COUNT_SLICE_TIME, build_text_pattern,
+                             utf16_length, utf16_index)
+from yunji.replacer import ReplaceWorker, REPLACE_ASYNC_THRESHOLD, plan_replacements, apply_replacements, map_position
+from yunji.regexsearch import RegexSearch, REGEX_RESTART_DELAY
+from yunji.findinfiles import FindInFilesDialog
+from yunji.gutter import GutterRenderer, block_marks, set_block_mark
+from yunji.scheduler import UpdateScheduler, FRAME_INTERVAL
+from yunji.policy import POLICY_FEATURES, REDUCED_UPDATE_INTERVAL, reduced_features, feature_label, longest_line
+from yunji.syntax import SyntaxHighlighter, GRAMMARS, grammar_for_path
+from yunji.minimap import Minimap, MINIMAP_WIDTH
+from yunji.workspace import DocumentTab, DocumentTabBar, DOCUMENT_ATTRIBUTES, EVICT_CHECK_INTERVAL, choose_evictions
+from yunji.zoom import ZoomPreview, ZOOM_SETTLE_DELAY, MIN_FONT_SIZE, MAX_FONT_SIZE
+from yunji.journal import RecoveryJournal, find_orphaned_journals, read_journal, read_base_text, base_changed
+
+# 高亮全部匹配项时单屏最多绘制的数量（很长的自动换行行中可能有大量匹配）
+MAX_VISIBLE_HIGHLIGHTS = 5000
 
 
 class TextEditor(QPlainTextEdit):
     def __init__(self, parent = None):
         super(TextEditor, self).__init__(parent)
         self.lineNumberArea = LineNumberArea(self)
+        self.gutter = GutterRenderer()
+        self.bookmarks = []  # 书签所在段落的光标，用于跳转；是否仍是书签以段落上的标记为准
         self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
         self.updateRequest.connect(self.updateLineNumberArea)
-        self.cursorPositionChanged.connect(self.highlightCurrentLine)
+        self.updateRequest.connect(self.on_update_request)
+        # 光标移动和编辑引起的界面刷新先标记，每帧最多执行一次；窗口的其他状态栏更新也注册在这里
+        self.updates = UpdateScheduler(self)
+        self.updates.register('current_line', self.highlightCurrentLine)
+        self.updates.register('cursor_position', self.update_cursor_position)
+        self.cursorPositionChanged.connect(self.on_cursor_position_changed)
+        self.line_selection = QTextEdit.ExtraSelection()  # 当前行高亮，反复使用同一个对象
+        self.line_selection.format.setBackground(QColor(Qt.gray).lighter(150))
+        self.line_selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+        self.current_line_visible = True  # 大文档的性能策略可能关闭当前行高亮
+        self.syntax = SyntaxHighlighter(self)
+        self.minimap = Minimap(self)
+        self.minimap_visible = True
+        # 高亮全部匹配项：match_provider(start, stop) 返回起点在该范围内的 (起点, 终点)，只为可见区域生成高亮
+        self.match_provider = None
+        self.match_selections = []
+        self.highlight_range = None  # 当前高亮对应的可见范围，未变化时滚动不重新生成
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(QColor(255, 224, 138))
         self.line_numbers_visible = False  # 用于控制行号区域的可见性
         self.lineNumberColor = QColor(Qt.cyan)  # 默认行号颜色
-        self.cursorPositionChanged.connect(self.update_cursor_position)
         self.updateLineNumberAreaWidth(0)
         self.parent = parent  # 设置对父对象的引用
          # 连接文档修改信号到槽函数
         self.document().contentsChanged.connect(self.document_modified)
-        # 初始化字体大小
+        # Ctrl+滚轮缩放时先缩放视口截图，停止滚动后只设置一次字体
+        self.zoom_preview = ZoomPreview(self.viewport())
+        self.zoom_anchor = None  # (锚点块号, 缩放前该块顶部在视口中的 y)
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(ZOOM_SETTLE_DELAY)
+        self.zoom_timer.timeout.connect(self.apply_zoom)
+        # 初始化字体大小；new_font_size 在 changeEvent 中随字体同步
         font = QFont("Consolas", 14)
+        self.initial_font_size = font.pointSize()
         self.setFont(font)
-        self.current_font_size = font.pointSize()
-        self.initial_font_size = self.current_font_size
-        self.new_font_size = self.current_font_size
 
     def lineNumberAreaWidth(self):
         if not self.line_numbers_visible:
             return 0
-        digits = len(str(self.blockCount()))
-        space = 3 + self.fontMetrics().width('9') * digits
-        return space
+        self.gutter.set_point_size(self.font().pointSize())
+        return self.gutter.width(self.blockCount())
 
     def updateLineNumberAreaWidth(self, _):
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        width = self.lineNumberAreaWidth()
+        right = MINIMAP_WIDTH if self.minimap_visible else 0
+        margins = self.viewportMargins()
+        if margins.left() != width or margins.right() != right:
+            self.setViewportMargins(width, 0, right, 0)
+            self.place_minimap()
         self.lineNumberArea.setVisible(self.line_numbers_visible)
+        self.minimap.setVisible(self.minimap_visible)
 
     def updateLineNumberArea(self, rect, dy):
         if dy:
@@ -58,42 +110,119 @@ class TextEditor(QPlainTextEdit):
         super(TextEditor, self).resizeEvent(event)
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
+        self.place_minimap()
+
+    def place_minimap(self):
+        # 缩略图位于视口右侧的边距中，滚动条的左边
+        viewport = self.viewport().geometry()
+        self.minimap.setGeometry(QRect(viewport.right() + 1, viewport.top(), MINIMAP_WIDTH, viewport.height()))
 
     def highlightCurrentLine(self):
         extraSelections = []
 
-        if not self.isReadOnly():
-            selection = QTextEdit.ExtraSelection()
-            lineColor = QColor(Qt.gray).lighter(150)
-            selection.format.setBackground(lineColor)
-            selection.format.setProperty(QTextFormat.FullWidthSelection, True)
-            selection.cursor = self.textCursor()
-            selection.cursor.clearSelection()
-            extraSelections.append(selection)
+        if self.current_line_visible and not self.isReadOnly():
+            cursor = self.textCursor()
+            cursor.clearSelection()
+            self.line_selection.cursor = cursor
+            extraSelections.append(self.line_selection)
 
+        extraSelections.extend(self.match_selections)
         self.setExtraSelections(extraSelections)
 
+    def visible_range(self):
+        # 视口内文本的位置范围：从第一个可见块的起点到视口右下角之后所在块的终点
+        start = self.firstVisibleBlock().position()
+        viewport = self.viewport().rect()
+        block = self.cursorForPosition(viewport.bottomRight()).block()
+        return start, block.position() + block.length()
+
+    def on_update_request(self, rect, dy):
+        # 滚动或整个视口重绘（改变大小、换行方式、字体）时，可见范围可能变化
+        if dy or rect.contains(self.viewport().rect()):
+            self.syntax.highlight_visible()
+            if self.match_provider:
+                self.update_match_highlights()
+
+    def update_match_highlights(self, force=False):
+        # 只为可见范围内的匹配项生成高亮，开销与匹配总数无关；force 表示匹配结果本身已变化
+        if not self.match_provider:
+            if self.match_selections:
+                self.match_selections = []
+                self.highlight_range = None
+                self.highlightCurrentLine()
+            return
+        visible = self.visible_range()
+        if not force and visible == self.highlight_range:
+            return
+        self.highlight_range = visible
+        selections = []
+        document = self.document()
+        for start, end in self.match_provider(*visible)[:MAX_VISIBLE_HIGHLIGHTS]:
+            selection = QTextEdit.ExtraSelection()
+            selection.format = self.match_format
+            selection.cursor = QTextCursor(document)
+            selection.cursor.setPosition(start)
+            selection.cursor.setPosition(end, QTextCursor.KeepAnchor)
+            selections.append(selection)
+        self.match_selections = selections
+        self.highlightCurrentLine()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.FontChange and self.font().pointSize() > 0:
+            # 字体也可能由字体对话框、恢复会话等直接设置，之后的缩放从实际字号开始
+            self.current_font_size = self.new_font_size = self.font().pointSize()
+            self.update_status_label_zoom()
+        super().changeEvent(event)
+
     def wheelEvent(self, event):
-        self.current_font_size = self.font().pointSize()
         modifiers = QApplication.keyboardModifiers()
         if modifiers & Qt.ControlModifier :
             angle = event.angleDelta().y()
             if angle > 0:
-                self.current_font_size += 1
+                self.current_font_size = self.new_font_size + 1
             else:
-                self.current_font_size -= 1
-            self.new_font_size = min(max(self.current_font_size,6),60)
-            font = self.font()
-            font.setPointSize(self.new_font_size)
-            self.setFont(font)
-            
-            # 更新状态栏中的放大倍数
-            self.update_status_label_zoom()
+                self.current_font_size = self.new_font_size - 1
+            font_size = min(max(self.current_font_size, MIN_FONT_SIZE), MAX_FONT_SIZE)
+            if font_size != self.new_font_size:
+                self.new_font_size = font_size
+                self.preview_zoom()
+                # 更新状态栏中的放大倍数
+                self.update_status_label_zoom()
 
             event.accept()
         else:
+            # 普通滚动前先完成未结束的缩放，避免在截图下面滚动
+            self.apply_zoom()
             super().wheelEvent(event)
 
+    def preview_zoom(self):
+        if self.zoom_anchor is None:
+            # 以光标所在的块为锚点，光标不在视口内时以第一个可见块为锚点
+            block = self.textCursor().block()
+            if not self.viewport().rect().intersects(self.cursorRect()):
+                block = self.firstVisibleBlock()
+            top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+            self.zoom_anchor = (block.blockNumber(), top)
+            self.zoom_preview.start(top)
+        self.zoom_preview.set_scale(self.new_font_size / self.font().pointSize())
+        self.zoom_timer.start()
+
+    def apply_zoom(self):
+        # 缩放停止后设置一次字体；文档按需排版，把锚点块放回原来的位置后只排版新的可见块
+        self.zoom_timer.stop()
+        anchor = self.zoom_anchor
+        self.zoom_anchor = None
+        if self.new_font_size != self.font().pointSize():
+            font = self.font()
+            font.setPointSize(self.new_font_size)
+            self.setFont(font)
+        if anchor is not None:
+            number, top = anchor
+            block = self.document().findBlockByNumber(number)
+            lines_above = round(top / self.fontMetrics().lineSpacing())
+            self.verticalScrollBar().setValue(max(block.firstLineNumber() - lines_above, 0))
+            self.zoom_preview.stop()
+
     def update_status_label_zoom(self):
         if self.parent:
             zoom_percentage = int((self.new_font_size / self.initial_font_size) * 100)
@@ -104,43 +233,75 @@ class TextEditor(QPlainTextEdit):
             return
         
         painter = QPainter(self.lineNumberArea)
-        
-        # 设置行号区域的背景颜色
-        backgroundColor = QColor(Qt.gray)  # 例如，浅灰色
-        painter.fillRect(event.rect(), backgroundColor)
+        self.gutter.set_point_size(self.font().pointSize())
 
         block = self.firstVisibleBlock()
         blockNumber = block.blockNumber()
         self.topnumber = blockNumber
-        top = int(self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
-        bottom = top + int(self.blockBoundingRect(block).height())
-
-        # 设置行号的字体
-        font = QFont("Consolas")
-        font.setPointSize(self.font().pointSize())
-        painter.setFont(font)
-
-        # 设置行号的字体颜色
-        painter.setPen(self.lineNumberColor)
-
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(blockNumber + 1)
-                painter.drawText(0, top, self.lineNumberArea.width(), self.fontMetrics().height(),
-                                 Qt.AlignRight, number)
-
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        bottom = event.rect().bottom()
+
+        # 只收集可见段落的位置、行号和标记，绘制由 gutter 用缓存的数字完成
+        lines = []
+        while block.isValid() and top <= bottom:
+            if block.isVisible():
+                lines.append((int(top), blockNumber + 1, block_marks(block)))
+            top += self.blockBoundingRect(block).height()
             block = block.next()
-            top = bottom
-            bottom = top + int(self.blockBoundingRect(block).height())
             blockNumber += 1
-        return 
+        self.gutter.paint(painter, event.rect(), self.lineNumberArea.width(), self.lineNumberColor, lines)
+
+    def toggle_bookmark(self):
+        block = self.textCursor().block()
+        on = 'bookmark' not in block_marks(block)
+        set_block_mark(block, 'bookmark', on)
+        self.bookmarks = [cursor for cursor in self.bookmarks if cursor.block() != block]
+        if on:
+            self.bookmarks.append(QTextCursor(block))
+        self.lineNumberArea.update()
+
+    def goto_bookmark(self, backward=False):
+        # 跳到光标之后（或之前）的书签，到达末尾后从另一端继续；没有书签时返回 False
+        self.bookmarks = [cursor for cursor in self.bookmarks if 'bookmark' in block_marks(cursor.block())]
+        positions = sorted({cursor.block().position() for cursor in self.bookmarks})
+        if not positions:
+            return False
+        current = self.textCursor().block().position()
+        if backward:
+            index = bisect.bisect_left(positions, current) - 1
+        else:
+            index = bisect.bisect_right(positions, current) % len(positions)
+        cursor = self.textCursor()
+        cursor.setPosition(positions[index])
+        self.setTextCursor(cursor)
+        return True
     
+    def on_cursor_position_changed(self):
+        self.updates.mark('current_line')
+        self.updates.mark('cursor_position')
+
     def update_cursor_position(self):
         cursor = self.textCursor()
         line = cursor.blockNumber() + 1
         col = cursor.columnNumber() + 1
         if self.parent:
             self.parent.status_label_line.setText(f"行: {line} ;  列: {col}")
+            self.parent.status_label_line.setToolTip(f"已合并 {self.updates.skipped} 次重复的界面更新")
+
+    def set_document(self, document, grammar=None, bookmarks=()):
+        # 切换标签页：换上另一个文档，语法高亮、缩略图跟随新文档，查找高亮清除
+        self.document().contentsChanged.disconnect(self.document_modified)
+        document.setDefaultFont(self.font())
+        self.setDocument(document)
+        document.contentsChanged.connect(self.document_modified)
+        self.bookmarks = list(bookmarks)
+        self.syntax.set_document(document, grammar)
+        self.minimap.set_document(document)
+        self.match_provider = None
+        self.match_selections = []
+        self.highlight_range = None
+        self.updateLineNumberAreaWidth(0)
+        self.highlightCurrentLine()
 
     def document_modified(self):
         if self.document().isModified() and self.parent:
@@ -151,11 +312,8 @@ class TextEditor(QPlainTextEdit):
 
     def keyPressEvent(self, event):
         super(TextEditor, self).keyPressEvent(event)
-        if event.key() == Qt.Key_Insert and self.parent:
-            try:
-                self.parent.update_insert_overwrite_mode()
-            except AttributeError:
-                pass
+        if event.key() == Qt.Key_Insert:
+            self.updates.mark('insert_mode')
 
     def contextMenuEvent(self, event):
         try:
@@ -175,6 +333,7 @@ class TextEditor(QPlainTextEdit):
                 url_pattern = r"(https?://[^\s]+)"
                 urls = re.findall(url_pattern, selected_text)
                 if urls:
+                    import webbrowser  # 只在打开链接时导入
                     for url in urls:
                         print(f"检测到的链接: {url}")
                         webbrowser.open(url)
@@ -215,11 +374,21 @@ class FindReplaceDialog(QDialog):
 
         self.case_checkbox = QCheckBox("区分大小写")
         self.whole_checkbox = QCheckBox("全字匹配")
+        self.regex_checkbox = QCheckBox("正则表达式")
+        self.highlight_checkbox = QCheckBox("高亮全部匹配")
 
         self.find_button = QPushButton("查找")
         self.replace_button = QPushButton("替换")
         self.replace_all_button = QPushButton("全部替换")
 
+        # 后台全部替换的进度和取消按钮，只在文档较大时显示
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(15)
+        self.cancel_button = QPushButton("取消")
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
         # 添加方向选择下拉框
         self.direction_combobox = QComboBox()
         self.direction_combobox.addItems(["向下查找", "向上查找"])
@@ -237,6 +406,8 @@ class FindReplaceDialog(QDialog):
         layout.addLayout(find_layout)
         layout.addWidget(self.case_checkbox)
         layout.addWidget(self.whole_checkbox)
+        layout.addWidget(self.regex_checkbox)
+        layout.addWidget(self.highlight_checkbox)
 
         button_layout.addWidget(self.find_button)
 
@@ -247,6 +418,10 @@ class FindReplaceDialog(QDialog):
             button_layout.addWidget(self.replace_all_button)
 
         layout.addLayout(button_layout)
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addLayout(progress_layout)
 
         self.setLayout(layout)
         self.installEventFilter(self)  # 安装事件过滤器
@@ -277,17 +452,78 @@ class FindReplaceDialog(QDialog):
             self.whole_checkbox.isChecked()
         )
 
+    def is_regex(self):
+        return self.regex_checkbox.isChecked()
+
+# 当前进程中打开的所有编辑器窗口，用于保存会话
+open_editors = []
+
 class YunjiEditor(QMainWindow):
     def __init__(self, filename=None):
         super().__init__()
         self.init_ui()
         self.file_path = None  # 初始化文件路径为None，表示未保存过
-        self.temp_file = None
+        self.temp_file = None  # 崩溃恢复日志（RecoveryJournal），第一次修改时创建
         self.child_windows = []  # 存储子窗口实例的列表
         self.is_saved = True  # 用于跟踪文件是否已保存
         self.encoding = 'utf-8'
-        self.find_cache = {"key": None, "matches": []}
+        self.encoding_confidence = 1.0
+        self.lossy_decoding = False  # 打开时是否有字节无法按 encoding 解码（被替换或忽略）
+        self.line_ending = default_line_ending()  # 保存时使用的换行符类型，见 LINE_ENDINGS
+        self.mixed_line_endings = False  # 文件中是否混用了多种换行符
+        self.loader = None  # 后台加载文件的线程
+        self.loading = False
+        self.saver = None  # 后台保存任务
+        self.replacer = None  # 后台生成全部替换结果的线程
+        self.replace_edits = []  # 正则全部替换时已收到的修改
+        self.regex_search = None  # 后台正则匹配线程
+        self.regex_key = None  # regex_matches 对应的 (查找内容, 区分大小写, 全字匹配)
+        self.regex_matches = []  # 已找到的正则匹配 (起点, 终点)，按位置排序
+        self.regex_starts = []
+        self.regex_complete = False
+        self.regex_error = None
+        self.pending_find = None  # 等待正则匹配结果的查找或替换：(是否替换, 是否向上)
+        # 编辑后稍等片刻再重新进行正则匹配，连续输入时不反复启动
+        self.regex_timer = QTimer(self)
+        self.regex_timer.setSingleShot(True)
+        self.regex_timer.setInterval(REGEX_RESTART_DELAY)
+        self.regex_timer.timeout.connect(self.update_result_label)
+        # 查找框输入停顿后再查找；匹配总数在界面空闲时分段统计
+        self.find_timer = QTimer(self)
+        self.find_timer.setSingleShot(True)
+        self.find_timer.setInterval(TYPE_AHEAD_DELAY)
+        self.find_timer.timeout.connect(self.type_ahead_search)
+        self.type_ahead_from = None  # 边输入边查找时附近没有匹配项，等统计到达该位置之后再选中
+        self.count_timer = QTimer(self)
+        self.count_timer.setInterval(0)
+        self.count_timer.timeout.connect(self._continue_count)
+        self.large_file_mode = False  # 是否处于只读的大文件模式
+        self.file_offset = 0  # 文档对应的文件字节数，跟踪模式从这里继续读取
+        self.follower = None  # 跟踪文件追加内容的对象
+        self.pending_file = None  # 恢复会话时尚未加载的文件，窗口第一次被激活时才读取
+        self.pending_jump = None  # 打开文件后需要跳转到的 (行, 列, 长度)
+        self.disk_stat = None  # 打开或保存时读取的文件状态
+        self.reduced_features = set()  # 性能策略为当前文档关闭的功能，见 POLICY_FEATURES
+        self.size_tracker = DocumentSizeTracker(self.text_edit.document())  # 未保存内容编码后的大小
+        self.size_timer = QTimer(self)  # 在空闲时分段建立 size_tracker 的大小表
+        self.size_timer.setInterval(0)
+        self.size_timer.timeout.connect(self._continue_size)
+        open_editors.append(self)
+        self.find_index = MatchIndex(self.text_edit.document())  # 查找结果的位置，随编辑增量更新
         self.text_edit.textChanged.connect(self.on_text_changed)
+        self.text_edit.document().contentsChange.connect(self.record_edit)
+        # 标签页：第一个标签页使用编辑器控件原有的文档；文档改由窗口持有，切换标签页时不会被编辑器控件删除
+        self.text_edit.document().setParent(self)
+        self.tabs = [DocumentTab(self.new_document_state())]
+        self.tabs[0].document = self.text_edit.document()
+        self.current_tab = 0
+        self.tab_bar.addTab('未命名')
+        self.text_edit.modificationChanged.connect(lambda _: self.update_tab_title())
+        # 定期释放长时间未显示的文档
+        self.evict_timer = QTimer(self)
+        self.evict_timer.setInterval(EVICT_CHECK_INTERVAL)
+        self.evict_timer.timeout.connect(self.evict_idle_documents)
+        self.evict_timer.start()
         if filename:
             self.open_file(filename)
 
@@ -312,6 +548,17 @@ class YunjiEditor(QMainWindow):
         self.filename_label.setFont(QFont("Consolas", 12))
         layout.addWidget(self.filename_label, alignment=Qt.AlignLeft)
 
+        # 标签页栏，只有一个文档时隐藏
+        self.tab_bar = DocumentTabBar(self.tab_tooltip)
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setAutoHide(True)
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.currentChanged.connect(self.switch_tab)
+        self.tab_bar.tabCloseRequested.connect(self.close_tab)
+        layout.addWidget(self.tab_bar)
+        self.central_layout = layout
+
         # 创建状态栏
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
@@ -342,17 +589,8 @@ class YunjiEditor(QMainWindow):
         self.status_label_file_size = QLabel("文件大小: 0 B")
         self.status_label_file_size.setContentsMargins(10, 0, 10, 0)
 
-        # 根据操作系统信息设置换行符类型
-        os_info = platform.system()
-        if os_info == "Windows":
-            line_ending_info = "(CRLF)"
-        elif os_info in ["Linux", "Darwin"]:  # Darwin 是 macOS 的系统标识
-            line_ending_info = "(LF)"
-        else:
-            line_ending_info = "未知"
-
-        # 添加操作系统信息标签
-        self.status_label_os_info = QLabel(f"{os_info} {line_ending_info}")
+        # 当前文档的换行符类型，打开文件时根据文件内容更新
+        self.status_label_os_info = QLabel(default_line_ending())
         self.status_label_os_info.setContentsMargins(10, 0, 10, 0)
 
         # 将标签添加到状态栏
@@ -368,8 +606,34 @@ class YunjiEditor(QMainWindow):
         self.status_bar.addPermanentWidget(self.status_label_os_info, 1)
         self.status_bar.addPermanentWidget(self.status_label_doc, 1)
 
+        # 性能策略关闭了部分功能时显示，点击后可以逐项重新开启
+        self.policy_menu = QMenu(self)
+        self.policy_button = QPushButton("精简模式")
+        self.policy_button.setFlat(True)
+        self.policy_button.setFixedHeight(18)
+        self.policy_button.setMenu(self.policy_menu)
+        self.policy_button.hide()
+        self.status_bar.addPermanentWidget(self.policy_button)
+
+        # 后台加载文件时显示的进度条和取消按钮
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setRange(0, 100)
+        self.load_progress_bar.setFixedWidth(150)
+        self.load_progress_bar.setFixedHeight(15)
+        self.load_cancel_button = QPushButton("取消")
+        self.load_cancel_button.setFixedHeight(18)
+        self.load_cancel_button.clicked.connect(self.cancel_loading)
+        self.status_bar.addPermanentWidget(self.load_progress_bar)
+        self.status_bar.addPermanentWidget(self.load_cancel_button)
+        self.load_progress_bar.hide()
+        self.load_cancel_button.hide()
+
         #创建文本框-------------------------------------
         self.text_edit = TextEditor(parent=self)
+        self.updates = self.text_edit.updates
+        self.updates.register('insert_mode', self.update_insert_overwrite_mode)
+        self.updates.register('size', self.update_size_label)
+        self.updates.register('find', self.update_result_label)
         # self.text_edit.setPlainText("Hello\n" * 500)  # 添加大量文本用于测试
 
         # 设置 QTextEdit 的光标颜色和粗细
@@ -379,6 +643,8 @@ class YunjiEditor(QMainWindow):
         self.text_edit.setStyleSheet("QTextEdit { selection-background-color: #A4DDD3; }")  # 设置选中背景颜色
 
         layout.addWidget(self.text_edit)
+
+        self.large_view = self.create_large_view()
         layout.setContentsMargins(5, 0, 5, 0)
         self.update_insert_overwrite_mode()
 
@@ -409,18 +675,36 @@ class YunjiEditor(QMainWindow):
         save_as_action.setShortcut('Ctrl+Shift+S')
         save_as_action.triggered.connect(self.save_file_as)
 
+        open_large_action = QAction('以大文件模式打开', self)
+        open_large_action.setIcon(transparent_icon)
+        open_large_action.triggered.connect(lambda: self.open_large_file_dialog())
+
+        open_large_edit_action = QAction('以大文件编辑模式打开', self)
+        open_large_edit_action.setIcon(transparent_icon)
+        open_large_edit_action.triggered.connect(lambda: self.open_large_file_dialog(editable=True))
+
         add_action = QAction(QIcon(add_path), '新建窗口', self)  # 新建窗口选项
         add_action.setShortcut('Ctrl+N')
         add_action.triggered.connect(self.new_window)
 
+        new_tab_action = QAction('新建标签页', self)
+        new_tab_action.setIcon(transparent_icon)
+        new_tab_action.setShortcut('Ctrl+T')
+        new_tab_action.triggered.connect(self.new_tab)
+
+        close_tab_action = QAction('关闭标签页', self)
+        close_tab_action.setIcon(transparent_icon)
+        close_tab_action.setShortcut('Ctrl+W')
+        close_tab_action.triggered.connect(lambda: self.close_tab(self.current_tab))
+
         # 编辑菜单动作
         undo_action = QAction('撤销', self)
         undo_action.setShortcut('Ctrl+Z')
-        undo_action.triggered.connect(self.text_edit.undo)
+        undo_action.triggered.connect(self.undo)
 
         redo_action = QAction('重做', self)
         redo_action.setShortcut('Ctrl+Y')
-        redo_action.triggered.connect(self.text_edit.redo)
+        redo_action.triggered.connect(self.redo)
 
         cut_action = QAction('剪切', self)
         cut_action.setShortcut('Ctrl+X')
@@ -442,6 +726,22 @@ class YunjiEditor(QMainWindow):
         replace_action.setShortcut('Ctrl+H')
         replace_action.triggered.connect(self.replace_text)
 
+        find_in_files_action = QAction('在文件中查找', self)
+        find_in_files_action.setShortcut('Ctrl+Shift+F')
+        find_in_files_action.triggered.connect(self.find_in_files)
+
+        toggle_bookmark_action = QAction('切换书签', self)
+        toggle_bookmark_action.setShortcut('Ctrl+F2')
+        toggle_bookmark_action.triggered.connect(self.toggle_bookmark)
+
+        next_bookmark_action = QAction('下一个书签', self)
+        next_bookmark_action.setShortcut('F2')
+        next_bookmark_action.triggered.connect(lambda: self.goto_bookmark(False))
+
+        previous_bookmark_action = QAction('上一个书签', self)
+        previous_bookmark_action.setShortcut('Shift+F2')
+        previous_bookmark_action.triggered.connect(lambda: self.goto_bookmark(True))
+
         # 格式菜单动作
         font_bold_action = QAction('加粗', self)
         font_bold_action.setShortcut('Ctrl+B')
@@ -464,11 +764,22 @@ class YunjiEditor(QMainWindow):
         # 创建显示行号的动作
         self.show_line_numbers_action = QAction('显示行号', self, checkable=True, checked=False)
         self.show_line_numbers_action.triggered.connect(self.toggle_line_numbers)
+        self.show_minimap_action = QAction('显示缩略图', self, checkable=True, checked=True)
+        self.show_minimap_action.triggered.connect(self.toggle_minimap)
 
         # 创建自动换行的动作和复选框
-        auto_wrap_action = QAction('自动换行', self, checkable=True)
-        auto_wrap_action.setChecked(True)  # 默认选中自动换行
-        auto_wrap_action.triggered.connect(self.toggle_auto_wrap)
+        self.auto_wrap_action = QAction('自动换行', self, checkable=True)
+        self.auto_wrap_action.setChecked(True)  # 默认选中自动换行
+        self.auto_wrap_action.triggered.connect(self.toggle_auto_wrap)
+
+        # 语法高亮：默认按扩展名选择，也可以手动指定；菜单项在第一次打开菜单时才创建
+        self.syntax_menu = QMenu('语法高亮', self)
+        self.syntax_menu.aboutToShow.connect(self.update_syntax_menu)
+        self.syntax_actions = {}
+
+        # 跟踪文件末尾新增内容（类似 tail -f）
+        self.follow_action = QAction('跟踪文件变化', self, checkable=True, checked=False)
+        self.follow_action.triggered.connect(self.toggle_follow_mode)
 
         # 创建菜单栏--------------------------------------------------------------------
         menubar = self.menuBar()
@@ -476,7 +787,11 @@ class YunjiEditor(QMainWindow):
         # 文件菜单
         file_menu = menubar.addMenu('文件')
         file_menu.addAction(add_action)
+        file_menu.addAction(new_tab_action)
+        file_menu.addAction(close_tab_action)
         file_menu.addAction(open_action)
+        file_menu.addAction(open_large_action)
+        file_menu.addAction(open_large_edit_action)
         file_menu.addAction(save_action)
         file_menu.addAction(save_as_action)
 
@@ -489,18 +804,30 @@ class YunjiEditor(QMainWindow):
         edit_menu.addAction(paste_action)
         edit_menu.addAction(find_action)
         edit_menu.addAction(replace_action)
+        edit_menu.addAction(find_in_files_action)
+        edit_menu.addAction(toggle_bookmark_action)
+        edit_menu.addAction(next_bookmark_action)
+        edit_menu.addAction(previous_bookmark_action)
 
         # 格式菜单
         format_menu = menubar.addMenu('格式')
         format_menu.addAction(font_bold_action)
         format_menu.addAction(font_italic_action)
 
+        # 换行符转换：只改变保存时写入的换行符，不修改文档内容；菜单项在第一次打开菜单时才创建
+        self.line_ending_menu = format_menu.addMenu('换行符')
+        self.line_ending_menu.aboutToShow.connect(self.update_line_ending_menu)
+        self.line_ending_actions = {}
+
         #视图菜单
         view_menu = menubar.addMenu('视图')
         view_menu.addAction(text_color_action)
         view_menu.addAction(line_number_color_action)
         view_menu.addAction(self.show_line_numbers_action)
-        view_menu.addAction(auto_wrap_action)
+        view_menu.addAction(self.show_minimap_action)
+        view_menu.addAction(self.auto_wrap_action)
+        view_menu.addMenu(self.syntax_menu)
+        view_menu.addAction(self.follow_action)
 #endregion
         # 创建一个按钮放置在菜单栏右侧
         widget = QWidget(self)
@@ -563,6 +890,16 @@ class YunjiEditor(QMainWindow):
         """)
         self.show()
 
+    def create_large_view(self):
+        # 大文件模式下使用的只读视图，默认隐藏；处于大文件模式的后台标签页各自保留自己的视图
+        large_view = LargeFileView(parent=self)
+        large_view.hide()
+        large_view.edited.connect(self.handle_document_modified)
+        large_view.saved.connect(self._on_large_save_finished)
+        large_view.save_failed.connect(self._on_save_failed)
+        self.central_layout.addWidget(large_view)
+        return large_view
+
     def wheelEvent(self, event):
         self.text_edit.wheelEvent(event)
 
@@ -577,18 +914,48 @@ class YunjiEditor(QMainWindow):
     def open_file(self, file_path):
         if not file_path:
             return
+        self.cancel_loading()
+        self.stop_following()
+        self.remember_file_state()
+        self.pending_file = None
+        try:
+            # 使用会话数据库中记录的编码，文件未变化时跳过编码检测
+            session_store().prime_detection(file_path)
+        except Exception as exc:
+            print(f"读取文件状态失败: {exc}")
         try:
-            content, detected_encoding = self._read_file_with_fallback(file_path)
+            size = os.path.getsize(file_path)
+            if size >= LARGE_FILE_THRESHOLD and self.open_large_file(file_path):
+                return
+            self.leave_large_file_mode()
+            if size >= ASYNC_LOAD_THRESHOLD:
+                self._start_async_load(file_path)
+                return
+            content, detected_encoding, confidence, line_ending, lossy, bytes_read = self._read_file_with_fallback(file_path)
+            self.set_line_ending(*line_ending)
+            # 文件可能在获取大小之后又被追加，跟踪模式从实际读入的位置继续
+            self.file_offset = bytes_read
             self.file_path = file_path
+            self.apply_performance_policy(size, longest_line(content), file_path)
+            self.update_syntax(reset=False)
             self.encoding = detected_encoding
-            self.text_edit.setPlainText(content)
+            self.encoding_confidence = confidence
+            self.lossy_decoding = lossy
+            self.loading = True
+            self.size_tracker.invalidate()
+            try:
+                self.text_edit.setPlainText(content)
+            finally:
+                self.loading = False
+            self.reset_journal()
             self.filename_label.setText(os.path.basename(file_path))
             self.status_label_filepath.setText(f'打开文件: {file_path}')
             self.status_label_doc.setText("文档状态: 已打开")
-            self.status_label_encoding.setText(self.encoding)
+            self.update_encoding_label()
             self.update_file_size()
             self.is_saved = True
             self.reset_find_cache()
+            self._after_open()
         except FileNotFoundError:
             QMessageBox.critical(self, "文件错误", f"文件 '{os.path.basename(file_path)}' 不存在.")
             self.clear_text_edit()
@@ -596,44 +963,532 @@ class YunjiEditor(QMainWindow):
             self.show_error_dialog("打开文件", f"无法打开文件 '{os.path.basename(file_path)}': {exc}")
             self.clear_text_edit()
 
+    def open_large_file_dialog(self, editable=False):
+        try:
+            title = '以大文件编辑模式打开' if editable else '以大文件模式打开'
+            file_path, _ = QFileDialog.getOpenFileName(self, title, '', '所有文件 (*);;文本文件 (*.txt)')
+            if file_path:
+                self.cancel_loading()
+                self.stop_following()
+                self.open_large_file(file_path, editable)
+        except Exception as exc:
+            self.show_error_dialog('打开文件', f'无法打开文件对话框: {exc}')
+
+    def open_large_file(self, file_path, editable=False):
+        # 内存映射文件，只渲染可见的行；editable 时在映射之上叠加片段表，编辑只占用与修改量相当的内存
+        # 编码不兼容时返回 False，由调用方按普通方式打开
+        if self.large_view.saving:
+            self.status_bar.showMessage('正在保存，请稍候…', 2000)
+            return True
+        try:
+            encoding, confidence = detect_path_encoding(file_path)
+            if not supports_large_file_mode(encoding) or os.path.getsize(file_path) == 0:
+                return False
+            self.large_view.open(file_path, encoding, editable)
+        except Exception as exc:
+            self.show_error_dialog("打开文件", f"无法以大文件模式打开 '{os.path.basename(file_path)}': {exc}")
+            return False
+        self.large_file_mode = True
+        self.reset_journal()
+        # 大文件模式按字节保存，换行符原样保留
+        self.set_line_ending('CRLF' if self.large_view.newline == b'\r\n' else 'LF', False)
+        self.text_edit.clear()
+        self.text_edit.document().setModified(False)
+        self.text_edit.hide()
+        self.large_view.line_numbers_visible = self.text_edit.line_numbers_visible
+        self.large_view.updateLineNumberAreaWidth(0)
+        self.large_view.show()
+        self.large_view.setFocus()
+        self.file_path = file_path
+        self.encoding = encoding
+        self.encoding_confidence = confidence
+        self.lossy_decoding = False  # 大文件模式按字节保存，未修改的部分原样写回
+        self.filename_label.setText(os.path.basename(file_path))
+        self.status_label_filepath.setText(f'打开文件: {file_path}')
+        self.status_label_doc.setText("文档状态: 可编辑 (大文件模式)" if editable else "文档状态: 只读 (大文件模式)")
+        self.update_encoding_label()
+        self.update_file_size()
+        self.is_saved = True
+        self.reset_find_cache()
+        self._after_open()
+        return True
+
+    def leave_large_file_mode(self):
+        if not self.large_file_mode:
+            return
+        self.large_file_mode = False
+        self.large_view.close_file()
+        self.large_view.hide()
+        self.text_edit.show()
+        self.text_edit.setFocus()
+
+    def _start_async_load(self, file_path):
+        # 大文件在后台线程中读取和解码，分批写入文档，界面保持响应
+        self.loading = True
+        self.size_tracker.invalidate()
+        self.text_edit.setUndoRedoEnabled(False)
+        self.text_edit.clear()
+        # 加载前先按文件大小应用性能策略，最长行的长度在加载完成后才知道
+        self.apply_performance_policy(os.path.getsize(file_path), 0, file_path)
+        self.update_syntax(file_path, reset=False)
+        self.text_edit.setReadOnly(True)
+        self.filename_label.setText(os.path.basename(file_path))
+        self.status_label_filepath.setText(f'正在加载: {file_path}')
+        self.status_label_doc.setText("文档状态: 加载中")
+        self.load_progress_bar.setValue(0)
+        self.load_progress_bar.show()
+        self.load_cancel_button.show()
+
+        self.loader = FileLoader(file_path, self)
+        self.loader.progress.connect(self._on_load_progress)
+        self.loader.chunk_loaded.connect(self._on_load_chunk)
+        self.loader.loaded.connect(self._on_load_finished)
+        self.loader.load_failed.connect(self._on_load_failed)
+        self.loader.finished.connect(self.loader.deleteLater)
+        self.loader.start()
+
+    def _on_load_progress(self, done, total):
+        if total:
+            self.load_progress_bar.setValue(int(done * 100 / total))
+
+    def _on_load_chunk(self, text):
+        loader = self.sender()
+        if loader is not self.loader:
+            return
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        loader.acknowledge()
+
+    def _on_load_finished(self, detected_encoding, confidence):
+        loader = self.sender()
+        if loader is not self.loader:
+            return
+        file_path = loader.file_path
+        self._finish_loading()
+        self.reset_journal()
+        self.set_line_ending(*loader.line_ending)
+        self.file_offset = loader.bytes_read
+        self.file_path = file_path
+        self.apply_performance_policy(loader.bytes_read, loader.line_stats.longest, file_path)
+        self.encoding = detected_encoding
+        self.encoding_confidence = confidence
+        self.lossy_decoding = loader.lossy
+        self.text_edit.moveCursor(QTextCursor.Start)
+        self.text_edit.document().setModified(False)
+        self.status_label_filepath.setText(f'打开文件: {file_path}')
+        self.status_label_doc.setText("文档状态: 已打开")
+        self.update_encoding_label()
+        self.update_file_size()
+        self.is_saved = True
+        self.reset_find_cache()
+        self._after_open()
+
+    def _on_load_failed(self, message):
+        loader = self.sender()
+        if loader is not self.loader:
+            return
+        self._finish_loading()
+        self.show_error_dialog("打开文件", f"无法打开文件 '{os.path.basename(loader.file_path)}': {message}")
+        self.clear_text_edit()
+
+    def cancel_loading(self):
+        if not self.loader:
+            return
+        loader = self.loader
+        loader.cancel()
+        loader.wait()
+        self._finish_loading()
+        self.clear_text_edit()
+        self.status_label_doc.setText("文档状态: 已取消加载")
+
+    def _finish_loading(self):
+        self.loader = None
+        self.loading = False
+        self.text_edit.setReadOnly(False)
+        self.text_edit.setUndoRedoEnabled(True)
+        self.load_progress_bar.hide()
+        self.load_cancel_button.hide()
+
     def clear_text_edit(self):
         self.text_edit.clear()
+        self.reset_journal()
         self.status_label_filepath.setText("当前路径: ")
         self.status_label_line.setText("行: 1 ;  列: 1")
         self.status_label_doc.setText("文档状态: 未修改")
 
     def save_file(self):
+        if self.large_file_mode and not self.large_view.editable:
+            QMessageBox.information(self, '保存文件', '大文件模式为只读，无法保存。')
+            return
         if not self.file_path:
             self.save_file_as()
             return
+        if self.saver or self.large_view.saving:
+            self.status_bar.showMessage('正在保存，请稍候…', 2000)
+            return
+        if self.lossy_decoding and not self.large_file_mode and not self.confirm_lossy_save():
+            return
+        if self.mixed_line_endings and not self.large_file_mode and not self.confirm_line_ending_save():
+            return
         try:
-            with open(self.file_path, 'w', encoding=self.encoding or 'utf-8') as file:
-                file.write(self.text_edit.toPlainText())
-            self.filename_label.setText(os.path.basename(self.file_path))
-            self.status_label_filepath.setText(f'保存文件: {self.file_path}')
-            self.status_label_doc.setText("文档状态: 已保存")
-            self.is_saved = True
-            self.update_file_size()
+            if self.large_file_mode:
+                # 后台按片段顺序流式写入临时文件，完成后替换原文件并重新映射
+                if self.large_view.save(self.file_path):
+                    self.status_label_doc.setText("文档状态: 保存中…")
+                return
+            document = self.text_edit.document()
+            if document.characterCount() >= ASYNC_SAVE_THRESHOLD:
+                self._start_async_save()
+                return
+            # 逐块编码写入临时文件，fsync 后原子替换目标文件
+            write_atomic(self.file_path, iter_document_chunks(document), self.encoding or 'utf-8',
+                         LINE_ENDINGS[self.line_ending])
+            self._after_save()
         except Exception as exc:
             self.show_error_dialog('保存文件', f'保存失败: {exc}')
 
+    def confirm_lossy_save(self):
+        # 打开时无法解码的字节已被替换或忽略，保存会用当前内容覆盖原来的字节
+        reply = QMessageBox.warning(
+            self, '保存文件',
+            f'文件中有无法按 {self.encoding} 解码的字节，打开时已被替换为 \ufffd 或忽略。\n'
+            '保存后这些字节将被改写，无法恢复。是否仍然保存？',
+            QMessageBox.Save | QMessageBox.Cancel, QMessageBox.Cancel)
+        return reply == QMessageBox.Save
+
+    def confirm_line_ending_save(self):
+        # 文档中的换行统一为 \n，保存时只能写入一种换行符；在 格式 > 换行符 中选择后不再询问
+        reply = QMessageBox.warning(
+            self, '保存文件',
+            f'文件中混用了多种换行符，保存时将统一为 {self.line_ending}。\n'
+            '也可以取消保存，在 格式 > 换行符 中选择要使用的换行符。是否仍然保存？',
+            QMessageBox.Save | QMessageBox.Cancel, QMessageBox.Cancel)
+        return reply == QMessageBox.Save
+
+    def _start_async_save(self):
+        # 大文档在界面线程中分片取出文本，由后台线程编码、写入临时文件并原子替换
+        self.saver = DocumentSaver(self.text_edit.document(), self.file_path, self.encoding or 'utf-8',
+                                   LINE_ENDINGS[self.line_ending], self)
+        self.saver.saved.connect(self._on_save_finished)
+        self.saver.save_failed.connect(self._on_save_failed)
+        self.status_label_doc.setText("文档状态: 保存中…")
+        self.saver.start()
+
+    def _on_save_finished(self):
+        saver = self.saver
+        self.saver = None
+        saver.deleteLater()
+        if saver.stale:
+            # 保存期间修改了已写出的部分，这些修改尚未保存；原文件已被替换，恢复日志改用当前内容作为快照
+            if self.temp_file:
+                self.temp_file.compact(self.text_edit.toPlainText())
+            self.status_label_filepath.setText(f'保存文件: {saver.file_path}')
+            self.status_label_doc.setText("文档状态: 已修改")
+            self.is_saved = False
+            self.update_file_size()
+            return
+        self._after_save()
+
+    def _on_large_save_finished(self):
+        self._after_save()
+
+    def _on_save_failed(self, message):
+        saver = self.saver
+        self.saver = None
+        if saver:
+            saver.deleteLater()
+        self.status_label_doc.setText("文档状态: 已修改")
+        self.show_error_dialog('保存文件', f'保存失败: {message}')
+
+    def _after_save(self):
+        self.filename_label.setText(os.path.basename(self.file_path))
+        self.status_label_filepath.setText(f'保存文件: {self.file_path}')
+        self.status_label_doc.setText("文档状态: 已保存")
+        self.text_edit.document().setModified(False)
+        self.is_saved = True
+        # 磁盘上的内容已与文档一致，换行符也已统一
+        self.lossy_decoding = False
+        self.update_encoding_label()
+        if self.mixed_line_endings and not self.large_file_mode:
+            self.set_line_ending(self.line_ending)
+        self.reset_journal()
+        self.update_file_size()
+        self.update_tab_title()
+
     def save_file_as(self):
         try:
             file_path, _ = QFileDialog.getSaveFileName(self, '另存为', '', '文本文件 (*.txt);;所有文件 (*)')
             if file_path:
                 self.file_path = file_path
+                self.update_syntax()
                 self.save_file()
         except Exception as exc:
             self.show_error_dialog('另存为', f'无法另存文件: {exc}')
 
     def new_window(self):
         try:
+            # 已关闭的窗口不再保留
+            self.child_windows = [window for window in self.child_windows if window.isVisible()]
             new_window = YunjiEditor()
             self.child_windows.append(new_window)
             new_window.show()
         except Exception as exc:
             self.show_error_dialog('新建窗口', f'无法打开新的编辑窗口: {exc}')
 
+    def open_files(self, file_paths):
+        # 之后启动的 yunji 转发来的文件：已经打开的切换过去，当前标签页为空时在当前标签页打开，否则打开新标签页
+        if not self.isVisible():
+            self.show()
+        for file_path in file_paths or [None]:
+            index = self.find_tab(file_path)
+            if index is not None:
+                self.tab_bar.setCurrentIndex(index)
+                continue
+            if not self.is_empty_document() and not self.new_tab():
+                break
+            if file_path:
+                self.open_file(file_path)
+        self.raise_()
+        self.activateWindow()
+
+    def is_empty_document(self):
+        return (self.file_path is None and not self.pending_file and not self.loading
+                and not self.large_file_mode and not self.is_document_modified())
+
+    def find_tab(self, file_path):
+        if not file_path:
+            return None
+        file_path = os.path.normcase(os.path.abspath(file_path))
+        for index, tab in enumerate(self.tabs):
+            path = (self.pending_file or self.file_path) if index == self.current_tab else tab.path()
+            if path and os.path.normcase(os.path.abspath(path)) == file_path:
+                return index
+        return None
+
+    def new_document_state(self):
+        # 新标签页的文档状态；size_tracker 和 find_index 在创建文档时生成
+        return {'file_path': None, 'temp_file': None, 'is_saved': True, 'encoding': 'utf-8',
+                'encoding_confidence': 1.0, 'lossy_decoding': False, 'line_ending': default_line_ending(), 'mixed_line_endings': False,
+                'large_file_mode': False, 'file_offset': 0, 'pending_file': None, 'pending_jump': None,
+                'disk_stat': None, 'size_tracker': None, 'find_index': None}
+
+    def create_tab_document(self, tab):
+        document = QTextDocument(self)
+        document.setDocumentLayout(QPlainTextDocumentLayout(document))
+        document.contentsChange.connect(self.record_edit)
+        tab.document = document
+        tab.state['size_tracker'] = DocumentSizeTracker(document)
+        tab.state['find_index'] = MatchIndex(document)
+
+    def tab_busy(self):
+        # 后台加载、保存、全部替换期间文档正在被使用，不能切换标签页
+        if self.loader or self.saver or self.replacer or self.large_view.saving:
+            self.status_bar.showMessage('正在加载或保存，请稍候…', 2000)
+            return True
+        return False
+
+    def add_tab(self, tab, index=None):
+        index = len(self.tabs) if index is None else index
+        self.tabs.insert(index, tab)
+        if index <= self.current_tab:
+            self.current_tab += 1
+        path = tab.path()
+        self.tab_bar.blockSignals(True)
+        self.tab_bar.insertTab(index, os.path.basename(path) if path else '未命名')
+        self.tab_bar.setCurrentIndex(self.current_tab)
+        self.tab_bar.blockSignals(False)
+
+    def new_tab(self):
+        if self.tab_busy():
+            return False
+        self.add_tab(DocumentTab(self.new_document_state()))
+        self.tab_bar.setCurrentIndex(len(self.tabs) - 1)
+        return True
+
+    def switch_tab(self, index):
+        if index == self.current_tab or not 0 <= index < len(self.tabs):
+            return
+        if self.tab_busy():
+            self.tab_bar.blockSignals(True)
+            self.tab_bar.setCurrentIndex(self.current_tab)
+            self.tab_bar.blockSignals(False)
+            return
+        self.store_tab()
+        self.current_tab = index
+        self.show_tab()
+
+    def store_tab(self):
+        # 把当前文档的状态从窗口移到标签页中；光标、滚动等同时记录到会话数据库，文档被释放后据此恢复
+        tab = self.tabs[self.current_tab]
+        self.cancel_regex_search()
+        self.stop_following()
+        self.find_timer.stop()
+        self.count_timer.stop()
+        self.type_ahead_from = None
+        self.text_edit.apply_zoom()
+        self.remember_file_state()
+        tab.state = {name: getattr(self, name) for name in DOCUMENT_ATTRIBUTES}
+        tab.reduced_features = set(self.reduced_features)
+        tab.grammar = self.text_edit.syntax.grammar
+        tab.bookmarks = self.text_edit.bookmarks
+        tab.cursor = self.text_edit.textCursor()
+        tab.scroll = self.text_edit.verticalScrollBar().value()
+        if self.large_file_mode:
+            tab.large_view = self.large_view
+            self.large_view.hide()
+            self.large_view = self.create_large_view()
+        tab.touch()
+
+    def show_tab(self):
+        # 把标签页保存的文档状态换到窗口上；被释放或尚未读取的文档在这里读取
+        tab = self.tabs[self.current_tab]
+        if tab.document is None:
+            self.create_tab_document(tab)
+        for name, value in tab.state.items():
+            setattr(self, name, value)
+        if tab.large_view:
+            self.large_view.deleteLater()
+            self.large_view = tab.large_view
+            tab.large_view = None
+            self.large_view.line_numbers_visible = self.text_edit.line_numbers_visible
+            self.large_view.updateLineNumberAreaWidth(0)
+        self.text_edit.setVisible(not self.large_file_mode)
+        self.large_view.setVisible(self.large_file_mode)
+        self.text_edit.set_document(tab.document, tab.grammar, tab.bookmarks)
+        self.apply_reduced_features(tab.reduced_features)
+        if 'syntax' not in self.reduced_features and self.text_edit.syntax.grammar is not tab.grammar:
+            self.text_edit.syntax.set_grammar(tab.grammar)
+        if tab.cursor is not None:
+            self.text_edit.setTextCursor(tab.cursor)
+        self.text_edit.verticalScrollBar().setValue(tab.scroll)
+        self.set_line_ending(self.line_ending, self.mixed_line_endings)
+        self.follow_action.setChecked(False)
+        self.update_document_labels()
+        self.update_tab_title()
+        tab.touch()
+        if self.pending_file:
+            self.open_file(self.pending_file)
+        tab.evicted = False
+        self.update_result_label()
+
+    def update_document_labels(self):
+        path = self.pending_file or self.file_path
+        self.filename_label.setText(os.path.basename(path) if path else "  ")
+        self.status_label_filepath.setText(f'打开文件: {path}' if path else "当前路径: ")
+        if self.large_file_mode:
+            self.status_label_doc.setText("文档状态: 可编辑 (大文件模式)" if self.large_view.editable else "文档状态: 只读 (大文件模式)")
+        elif self.is_document_modified():
+            self.status_label_doc.setText("文档状态: 已修改")
+        else:
+            self.status_label_doc.setText("文档状态: 已打开" if path else "文档状态: 未修改")
+        self.update_encoding_label()
+        self.update_size_label()
+
+    def update_tab_title(self, index=None):
+        index = self.current_tab if index is None else index
+        tab = self.tabs[index]
+        if index == self.current_tab:
+            path = self.pending_file or self.file_path
+        else:
+            path = tab.path()
+        title = os.path.basename(path) if path else '未命名'
+        self.tab_bar.setTabText(index, ('*' if self.tab_modified(tab) else '') + title)
+
+    def tab_modified(self, tab):
+        if tab is self.tabs[self.current_tab]:
+            return self.is_document_modified()
+        if tab.large_view:
+            return tab.large_view.is_modified()
+        return tab.document is not None and tab.document.isModified()
+
+    def tab_tooltip(self, index):
+        tab = self.tabs[index]
+        if index == self.current_tab:
+            path, large = self.pending_file or self.file_path, self.large_file_mode
+        else:
+            path, large = tab.path(), tab.state.get('large_file_mode')
+        if large:
+            memory = '大文件模式，按需从磁盘读取'
+        elif tab.document is None:
+            memory = '已释放，切换到此标签页时重新读取' if tab.evicted else '尚未读取'
+        else:
+            memory = f'约 {self.convert_size(tab.memory())}'
+        return f'{path or "未命名"}\n内存: {memory}'
+
+    def close_tab(self, index):
+        if not 0 <= index < len(self.tabs):
+            return
+        tab = self.tabs[index]
+        if index != self.current_tab and not self.tab_modified(tab):
+            self.release_tab(tab)
+            self.remove_tab(index)
+            return
+        # 当前文档或有修改的文档：切换过去，按关闭窗口时的方式询问是否保存
+        self.tab_bar.setCurrentIndex(index)
+        if self.current_tab != index:
+            return
+        if self.loader:
+            self.cancel_loading()
+        self.cancel_replace_all()
+        self.stop_following()
+        keep_journal = self.confirm_close_document()
+        if keep_journal is None:
+            return
+        if self.saver:
+            self.saver.finish_now()
+        self.remember_file_state()
+        self.large_view.close_file()
+        self.reset_journal(discard=not keep_journal)
+        self.reset_find_cache()
+        if len(self.tabs) == 1:
+            self.add_tab(DocumentTab(self.new_document_state()))
+        self.remove_tab(index)
+        self.current_tab = min(index, len(self.tabs) - 1)
+        self.tab_bar.blockSignals(True)
+        self.tab_bar.setCurrentIndex(self.current_tab)
+        self.tab_bar.blockSignals(False)
+        self.show_tab()
+        tab.state['temp_file'] = None
+        self.release_tab(tab)
+        self.record_session()
+
+    def remove_tab(self, index):
+        del self.tabs[index]
+        if index < self.current_tab:
+            self.current_tab -= 1
+        self.tab_bar.blockSignals(True)
+        self.tab_bar.removeTab(index)
+        self.tab_bar.blockSignals(False)
+
+    def release_tab(self, tab, keep_journal=False):
+        # 释放后台标签页的文档、恢复日志和大文件视图
+        journal = tab.state.get('temp_file')
+        if journal:
+            journal.close(not keep_journal)
+            journal.deleteLater()
+        if tab.large_view:
+            tab.large_view.close_file()
+            tab.large_view.deleteLater()
+            tab.large_view = None
+        if tab.document is not None and tab.document is not self.text_edit.document():
+            tab.document.deleteLater()
+        tab.document = None
+        tab.cursor = None
+        tab.bookmarks = []
+        tab.grammar = None
+        tab.reduced_features = set()
+        tab.state.update(temp_file=None, size_tracker=None, find_index=None)
+
+    def evict_idle_documents(self):
+        # 内存超过上限时释放长时间未显示、未修改的文档，只保留文件路径
+        for tab in choose_evictions(self.tabs, self.tabs[self.current_tab]):
+            file_path = tab.state['file_path']
+            self.release_tab(tab)
+            tab.state = self.new_document_state()
+            tab.state['pending_file'] = file_path
+            tab.evicted = True
+
     def find_text(self):
         try:
             if hasattr(self, 'find_dialog') and self.find_dialog.isVisible():
@@ -641,12 +1496,16 @@ class YunjiEditor(QMainWindow):
             selected_text = self.text_edit.textCursor().selectedText()
             self.find_dialog = FindReplaceDialog(self, initial_text=selected_text)
             self.find_dialog.find_button.clicked.connect(self.find_next_text)
+            self.connect_find_query(self.find_dialog)
             self.find_dialog.show()
             self.update_result_label(force_recount=True)
         except Exception as exc:
             self.show_error_dialog('查找', f'无法打开查找窗口: {exc}')
 
     def replace_text(self):
+        if self.large_file_mode and not self.large_view.editable:
+            QMessageBox.information(self, '替换', '大文件模式为只读，无法替换。')
+            return
         try:
             if hasattr(self, 'find_dialog') and self.find_dialog.isVisible():
                 self.find_dialog.close()
@@ -655,6 +1514,8 @@ class YunjiEditor(QMainWindow):
             self.find_dialog.find_button.clicked.connect(self.find_next_text)
             self.find_dialog.replace_button.clicked.connect(self.replace_next_text)
             self.find_dialog.replace_all_button.clicked.connect(self.replace_all_text)
+            self.find_dialog.cancel_button.clicked.connect(self.cancel_replace_all)
+            self.connect_find_query(self.find_dialog)
             self.find_dialog.show()
             self.update_result_label(force_recount=True)
         except Exception as exc:
@@ -673,6 +1534,14 @@ class YunjiEditor(QMainWindow):
             if backward:
                 flags |= QTextDocument.FindBackward
 
+            if self.large_file_mode:
+                if not self.large_view.find(find_str, case_sensitive, whole_words, backward):
+                    QMessageBox.information(self, '查找', f'未找到 "{find_str}"')
+                return
+            if self.find_dialog.is_regex():
+                self.find_regex_match(False, backward)
+                return
+
             document = self.text_edit.document()
             cursor = self.text_edit.textCursor()
             match_cursor = document.find(find_str, cursor, flags)
@@ -704,6 +1573,16 @@ class YunjiEditor(QMainWindow):
             if backward:
                 flags |= QTextDocument.FindBackward
 
+            if self.large_file_mode:
+                if not self.large_view.can_edit():
+                    self.status_bar.showMessage('行索引尚未建立完成，暂时无法替换', 2000)
+                elif not self.large_view.replace_next(find_str, replace_str, case_sensitive, whole_words, backward):
+                    QMessageBox.information(self, '替换', f'未找到 "{find_str}"')
+                return
+            if self.find_dialog.is_regex():
+                self.find_regex_match(True, backward)
+                return
+
             document = self.text_edit.document()
             cursor = self.text_edit.textCursor()
             match_cursor = document.find(find_str, cursor, flags)
@@ -722,7 +1601,7 @@ class YunjiEditor(QMainWindow):
             if replace_str:
                 match_cursor.movePosition(QTextCursor.PreviousCharacter, QTextCursor.KeepAnchor, len(replace_str))
             self.text_edit.setTextCursor(match_cursor)
-            self.update_result_label(match_cursor, force_recount=True)
+            self.update_result_label(match_cursor)
         except Exception as exc:
             self.show_error_dialog('替换', f'替换失败: {exc}')
 
@@ -734,31 +1613,128 @@ class YunjiEditor(QMainWindow):
             if not find_str:
                 QMessageBox.information(self, '替换', '请先输入需要查找的文本。')
                 return
-            flags = self._build_find_flags(case_sensitive, whole_words)
-            document = self.text_edit.document()
-            cursor = QTextCursor(document)
-            cursor.beginEditBlock()
+            if self.large_file_mode:
+                if not self.large_view.can_edit():
+                    self.status_bar.showMessage('行索引尚未建立完成，暂时无法替换', 2000)
+                    return
+                replacements = self.large_view.replace_all(find_str, replace_str, case_sensitive, whole_words)
+                if replacements > 0:
+                    QMessageBox.information(self, '替换', f'全部替换完成，共替换了 {replacements} 个匹配项。')
+                else:
+                    QMessageBox.information(self, '查找', f'未找到 "{find_str}"')
+                return
+            if self.replacer:
+                return
+            # 在文本快照上一次查出所有匹配并生成替换结果，再作为一次可撤销的修改写入文档
+            regex = self.find_dialog.is_regex()
             try:
-                search_cursor = QTextCursor(document)
-                search_cursor.movePosition(QTextCursor.Start)
-                replacements = 0
-                while True:
-                    match_cursor = document.find(find_str, search_cursor, flags)
-                    if match_cursor.isNull():
-                        break
-                    match_cursor.insertText(replace_str)
-                    replacements += 1
-                    search_cursor = match_cursor
-            finally:
-                cursor.endEditBlock()
-            self.update_result_label(force_recount=True)
-            if replacements > 0:
-                QMessageBox.information(self, '替换', f'全部替换完成，共替换了 {replacements} 个匹配项。')
+                pattern = build_text_pattern(find_str, case_sensitive, whole_words, regex)
+            except re.error as exc:
+                self.show_error_dialog('替换', f'正则表达式有误: {exc}')
+                return
+            document = self.text_edit.document()
+            text = self.text_edit.toPlainText()
+            if regex:
+                # 正则表达式可能回溯失控，始终在子进程中匹配、展开分组引用并合并相邻的匹配项
+                self.replace_edits = []
+                self.replacer = RegexSearch((find_str, case_sensitive, whole_words), pattern, text,
+                                            replace_str, document.revision(), self)
+                self.replacer.found.connect(self._on_regex_replace_found)
+                self.replacer.search_finished.connect(self._on_regex_replace_finished)
+                self.replacer.search_failed.connect(self._on_replace_failed)
+            elif len(text) < REPLACE_ASYNC_THRESHOLD:
+                edits, replacements = plan_replacements(pattern, text, replace_str)
+                self._finish_replace_all(find_str, edits, replacements)
+                return
             else:
-                QMessageBox.information(self, '查找', f'未找到 "{find_str}"')
+                self.replacer = ReplaceWorker(find_str, pattern, text, replace_str, document.revision(), self)
+                self.replacer.progress.connect(self._on_replace_progress)
+                self.replacer.planned.connect(self._on_replace_planned)
+                self.replacer.plan_failed.connect(self._on_replace_failed)
+            self.replacer.finished.connect(self.replacer.deleteLater)
+            self.text_edit.setReadOnly(True)
+            self.find_dialog.progress_bar.setValue(0)
+            self.find_dialog.progress_bar.show()
+            self.find_dialog.cancel_button.show()
+            self.status_bar.showMessage('正在全部替换，请稍候…')
+            self.replacer.start()
+        except Exception as exc:
+            self.show_error_dialog('替换', f'全部替换失败: {exc}')
+
+    def _finish_replace_all(self, find_str, edits, replacements):
+        if replacements > 0:
+            # 光标和滚动位置按替换前后的长度变化换算，保持在原来的文字上
+            text_cursor = self.text_edit.textCursor()
+            anchor = map_position(text_cursor.anchor(), edits)
+            position = map_position(text_cursor.position(), edits)
+            top = map_position(self.text_edit.firstVisibleBlock().position(), edits)
+            apply_replacements(self.text_edit.document(), edits)
+            text_cursor.setPosition(anchor)
+            text_cursor.setPosition(position, QTextCursor.KeepAnchor)
+            self.text_edit.setTextCursor(text_cursor)
+            # 自动换行时滚动条的值是显示行号，不是段落号
+            top_block = self.text_edit.document().findBlock(top)
+            self.text_edit.verticalScrollBar().setValue(top_block.firstLineNumber())
+        self.update_result_label()
+        if replacements > 0:
+            QMessageBox.information(self, '替换', f'全部替换完成，共替换了 {replacements} 个匹配项。')
+        else:
+            QMessageBox.information(self, '查找', f'未找到 "{find_str}"')
+
+    def _on_replace_progress(self, done, total):
+        if self.sender() is self.replacer and hasattr(self, 'find_dialog') and total:
+            self.find_dialog.progress_bar.setValue(int(done * 100 / total))
+
+    def _on_regex_replace_found(self, edits, done, total):
+        if self.sender() is not self.replacer:
+            return
+        self.replace_edits.extend(edits)
+        self._on_replace_progress(done, total)
+
+    def _on_regex_replace_finished(self, replacements):
+        if self.sender() is not self.replacer:
+            return
+        edits = self.replace_edits
+        self.replace_edits = []
+        self._on_replace_planned(edits, replacements)
+
+    def _on_replace_planned(self, edits, replacements):
+        replacer = self.sender()
+        if replacer is not self.replacer:
+            return
+        self._stop_replace_all()
+        if self.text_edit.document().revision() != replacer.revision:
+            self.status_bar.showMessage('替换过程中文档被修改，已取消全部替换', 3000)
+            return
+        try:
+            self._finish_replace_all(replacer.find_str, edits, replacements)
         except Exception as exc:
             self.show_error_dialog('替换', f'全部替换失败: {exc}')
 
+    def _on_replace_failed(self, message):
+        if self.sender() is not self.replacer:
+            return
+        self._stop_replace_all()
+        self.show_error_dialog('替换', f'全部替换失败: {message}')
+
+    def cancel_replace_all(self):
+        if not self.replacer:
+            return
+        replacer = self.replacer
+        replacer.cancel()
+        replacer.wait()
+        self._stop_replace_all()
+        self.status_bar.showMessage('已取消全部替换', 2000)
+
+    def _stop_replace_all(self):
+        self.replacer = None
+        self.replace_edits = []
+        self.text_edit.setReadOnly(self.follower is not None)
+        self.status_bar.clearMessage()
+        if hasattr(self, 'find_dialog'):
+            self.find_dialog.progress_bar.hide()
+            self.find_dialog.cancel_button.hide()
+
     def update_result_label(self, cursor=None, force_recount=False):
         if not hasattr(self, 'find_dialog'):
             return
@@ -766,19 +1742,312 @@ class YunjiEditor(QMainWindow):
         if not find_str:
             self.find_dialog.result_label.setText("0/0")
             self.reset_find_cache()
+            self.refresh_match_highlights()
+            return
+        if self.large_file_mode:
+            # 大文件模式下不统计匹配总数
+            self.find_dialog.result_label.setText("-/-")
             return
         key = (find_str, case_sensitive, whole_words)
-        if force_recount or self.find_cache.get("key") != key:
-            matches = self._collect_matches(find_str, case_sensitive, whole_words)
-            self.find_cache = {"key": key, "matches": matches}
-        matches = self.find_cache.get("matches", [])
-        total_matches = len(matches)
+        if self.find_dialog.is_regex():
+            if force_recount or self.regex_key != key:
+                self.start_regex_search(key)
+            self.show_regex_result(cursor)
+            return
+        if force_recount or self.find_index.key != key:
+            self.find_index.start(find_str, case_sensitive, whole_words)
+            if not self.find_index.advance(COUNT_SLICE_TIME):
+                self.count_timer.start()
+        self.show_find_result(cursor)
+
+    def show_find_result(self, cursor=None):
+        # 总数仍在统计时后面显示 "+"
+        total_matches = len(self.find_index)
+        suffix = '+' if self.find_index.pending() else ''
         if total_matches == 0:
-            self.find_dialog.result_label.setText("0/0")
+            self.find_dialog.result_label.setText(f"0/0{suffix}")
+            self.refresh_match_highlights()
+            return
+        current_cursor = cursor or self.text_edit.textCursor()
+        current_index = self.find_index.number_of(current_cursor.selectionStart(), current_cursor.selectionEnd())
+        self.find_dialog.result_label.setText(f"{current_index}/{total_matches}{suffix}")
+        self.refresh_match_highlights()
+
+    def _continue_count(self):
+        if self.find_index.advance(COUNT_SLICE_TIME):
+            self.count_timer.stop()
+        if self.type_ahead_from is not None:
+            self.select_type_ahead_match(self.type_ahead_from)
+        if self.find_index.key is not None and hasattr(self, 'find_dialog') and not self.find_dialog.is_regex():
+            self.show_find_result()
+
+    def type_ahead_search(self):
+        # 边输入边查找：先选中光标处或之后最近的匹配项，总数随后分段统计
+        if not hasattr(self, 'find_dialog') or not self.find_dialog.isVisible() or self.find_dialog.is_regex():
+            return
+        self.type_ahead_from = None
+        self.update_result_label()
+        find_str = self.find_dialog.get_find_replace_texts()[0]
+        if find_str and not self.large_file_mode:
+            self.select_type_ahead_match(self.text_edit.textCursor().selectionStart(), TYPE_AHEAD_WINDOW)
+            self.show_find_result()
+
+    def select_type_ahead_match(self, position, window=0):
+        # 先在已统计的部分中找，再直接扫描光标之后 window 范围内的文本；都没有时记下位置，
+        # 等分段统计继续找到之后再选中，界面线程中不扫描整个文档。光标之后没有匹配项时从头开始
+        index = self.find_index
+        span = index.next_span(position)
+        if span is None and index.pending() and window:
+            span = index.first_in(position, position + window)
+        if span is None and not index.pending():
+            span = index.next_span(0)
+        self.type_ahead_from = position if span is None and index.pending() else None
+        if span is not None:
+            cursor = self.text_edit.textCursor()
+            cursor.setPosition(span[0])
+            cursor.setPosition(span[1], QTextCursor.KeepAnchor)
+            self.text_edit.setTextCursor(cursor)
+
+    def find_in_files(self):
+        try:
+            if not hasattr(self, 'find_in_files_dialog'):
+                directory = os.path.dirname(os.path.abspath(self.file_path)) if self.file_path else os.getcwd()
+                self.find_in_files_dialog = FindInFilesDialog(self, directory)
+                self.find_in_files_dialog.result_activated.connect(self.open_file_at)
+            selected_text = self.text_edit.textCursor().selectedText()
+            if selected_text and '\u2029' not in selected_text:
+                self.find_in_files_dialog.find_input.setText(selected_text)
+            self.find_in_files_dialog.show()
+            self.find_in_files_dialog.raise_()
+            self.find_in_files_dialog.find_input.setFocus()
+        except Exception as exc:
+            self.show_error_dialog('在文件中查找', f'无法打开查找窗口: {exc}')
+
+    def open_file_at(self, file_path, line, column, length=0):
+        # 打开文件并跳转到指定位置；文件已经打开时直接跳转，后台加载时在加载完成后跳转
+        same_file = self.file_path and os.path.realpath(self.file_path) == os.path.realpath(file_path)
+        if same_file and not self.loader and not self.pending_file:
+            self.goto_position(line, column, length)
+            return
+        self.pending_jump = (line, column, length)
+        self.open_file(file_path)
+
+    def goto_position(self, line, column, length=0):
+        # line 和 column 从 0 开始，column 以字符计
+        if self.large_file_mode:
+            if self.large_view.index_complete():
+                self.large_view.set_cursor(line, column)
+            else:
+                self.large_view.restore_position = (line, column, max(line - 5, 0))
+            return
+        block = self.text_edit.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        text = block.text()
+        cursor = QTextCursor(block)
+        start = block.position() + utf16_length(text[:column])
+        cursor.setPosition(start)
+        if length:
+            cursor.setPosition(start + utf16_length(text[column:column + length]), QTextCursor.KeepAnchor)
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.centerCursor()
+        self.text_edit.setFocus()
+
+    def connect_find_query(self, dialog):
+        dialog.find_input.textChanged.connect(self.on_find_query_changed)
+        dialog.case_checkbox.toggled.connect(self.on_find_query_changed)
+        dialog.whole_checkbox.toggled.connect(self.on_find_query_changed)
+        dialog.regex_checkbox.toggled.connect(self.on_find_query_changed)
+        dialog.highlight_checkbox.toggled.connect(self.on_find_query_changed)
+        dialog.finished.connect(self.refresh_match_highlights)
+
+    def on_find_query_changed(self):
+        # 查询内容变化时立即停止旧的正则匹配
+        # 正则匹配在子进程中进行，立即重新开始；普通查找在输入停顿后进行
+        self.pending_find = None
+        self.cancel_regex_search()
+        if self.find_dialog.is_regex():
+            self.find_timer.stop()
+            self.update_result_label()
+        else:
+            self.find_dialog.result_label.setToolTip('')
+            self.find_timer.start()
+
+    def start_regex_search(self, key):
+        self.cancel_regex_search()
+        self.regex_key = key
+        try:
+            pattern = build_text_pattern(*key, True)
+        except re.error as exc:
+            self.regex_error = f'正则表达式有误: {exc}'
+            self.regex_complete = True
+            return
+        search = RegexSearch(key, pattern, self.text_edit.toPlainText(), parent=self)
+        search.found.connect(self._on_regex_found)
+        search.search_finished.connect(self._on_regex_finished)
+        search.search_failed.connect(self._on_regex_failed)
+        search.finished.connect(search.deleteLater)
+        self.regex_search = search
+        search.start()
+
+    def cancel_regex_search(self):
+        # 停止后台匹配并丢弃已有结果；子进程由线程在退出时终止
+        if self.regex_search:
+            self.regex_search.cancel()
+            self.regex_search = None
+        self.regex_timer.stop()
+        self.regex_key = None
+        self.regex_matches = []
+        self.regex_starts = []
+        self.regex_complete = False
+        self.regex_error = None
+        self.refresh_match_highlights()
+
+    def _on_regex_found(self, matches, done, total):
+        if self.sender() is not self.regex_search:
+            return
+        self.regex_matches.extend(matches)
+        self.regex_starts.extend(start for start, _ in matches)
+        self.show_regex_result()
+        if self.pending_find and matches:
+            self.find_regex_match(*self.pending_find)
+
+    def _on_regex_finished(self, count):
+        if self.sender() is not self.regex_search:
+            return
+        self.regex_search = None
+        self.regex_complete = True
+        self.show_regex_result()
+        if self.pending_find:
+            self.find_regex_match(*self.pending_find)
+
+    def _on_regex_failed(self, message):
+        if self.sender() is not self.regex_search:
             return
+        self.regex_search = None
+        self.regex_complete = True
+        self.regex_error = message
+        self.show_regex_result()
+        if self.pending_find:
+            self.pending_find = None
+            self.status_bar.showMessage(message, 3000)
+
+    def show_regex_result(self, cursor=None):
+        # 匹配仍在进行时总数后面显示 "+"
+        if not hasattr(self, 'find_dialog'):
+            return
+        label = self.find_dialog.result_label
+        if self.regex_error:
+            label.setText("错误")
+            label.setToolTip(self.regex_error)
+            return
+        label.setToolTip('')
         current_cursor = cursor or self.text_edit.textCursor()
-        current_index = self._determine_current_match(current_cursor, matches)
-        self.find_dialog.result_label.setText(f"{current_index}/{total_matches}")
+        span = (current_cursor.selectionStart(), current_cursor.selectionEnd())
+        index = bisect.bisect_left(self.regex_starts, span[0])
+        current = index + 1 if index < len(self.regex_matches) and self.regex_matches[index] == span else 0
+        suffix = '' if self.regex_complete else '+'
+        label.setText(f"{current}/{len(self.regex_matches)}{suffix}")
+        self.refresh_match_highlights()
+
+    def refresh_match_highlights(self):
+        # 查找窗口打开并勾选"高亮全部匹配"时，由编辑区按可见范围绘制匹配项
+        dialog = getattr(self, 'find_dialog', None)
+        if (dialog is None or not dialog.isVisible() or not dialog.highlight_checkbox.isChecked()
+                or self.large_file_mode):
+            self.text_edit.match_provider = None
+        else:
+            self.text_edit.match_provider = self.visible_matches
+        self.text_edit.update_match_highlights(force=True)
+
+    def visible_matches(self, start, stop):
+        if self.find_dialog.is_regex():
+            low = bisect.bisect_left(self.regex_starts, start)
+            return self.regex_matches[low:bisect.bisect_left(self.regex_starts, stop, low)]
+        if self.find_index.key is None:
+            return []
+        return self.find_index.spans_between(start, stop)
+
+    def _next_regex_match(self, backward):
+        # 返回光标之后（向上查找时为之前）的匹配；结果尚未到达时返回 None，没有任何匹配时返回 False
+        cursor = self.text_edit.textCursor()
+        matches = self.regex_matches
+        if backward:
+            index = bisect.bisect_left(self.regex_starts, cursor.selectionStart()) - 1
+            if index >= 0:
+                return matches[index]
+        else:
+            index = bisect.bisect_left(self.regex_starts, cursor.selectionEnd())
+            selection = (cursor.selectionStart(), cursor.selectionEnd())
+            while index < len(matches) and matches[index] == selection:
+                index += 1
+            if index < len(matches):
+                return matches[index]
+        if not self.regex_complete:
+            return None
+        if not matches:
+            return False
+        return matches[-1] if backward else matches[0]
+
+    def find_regex_match(self, replace, backward):
+        # 在后台匹配的结果中查找；结果尚未到达时记下请求，收到新的结果后继续
+        find_str, replace_str, case_sensitive, whole_words = self.find_dialog.get_find_replace_texts()
+        key = (find_str, case_sensitive, whole_words)
+        if self.regex_key != key:
+            self.start_regex_search(key)
+        if self.regex_error:
+            self.pending_find = None
+            self.show_regex_result()
+            self.show_error_dialog('替换' if replace else '查找', self.regex_error)
+            return
+        if replace:
+            # 当前选中的正是一个匹配项时替换它，否则替换下一个
+            cursor = self.text_edit.textCursor()
+            selection = (cursor.selectionStart(), cursor.selectionEnd())
+            index = bisect.bisect_left(self.regex_starts, selection[0])
+            if cursor.hasSelection() and index < len(self.regex_matches) and self.regex_matches[index] == selection:
+                match = selection
+            else:
+                match = self._next_regex_match(backward)
+        else:
+            match = self._next_regex_match(backward)
+        if match is None:
+            self.pending_find = (replace, backward)
+            self.status_bar.showMessage('正在查找…', 1000)
+            return
+        self.pending_find = None
+        if match is False:
+            QMessageBox.information(self, '替换' if replace else '查找', f'未找到 "{find_str}"')
+            return
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(match[0])
+        cursor.setPosition(match[1], QTextCursor.KeepAnchor)
+        if replace:
+            replacement = self._expand_regex_match(cursor, key, replace_str)
+            if replacement is None:
+                self.update_result_label(force_recount=True)
+                return
+            cursor.insertText(replacement)
+            cursor.setPosition(match[0], QTextCursor.KeepAnchor)
+            self.text_edit.setTextCursor(cursor)
+            self.update_result_label(cursor, force_recount=True)
+            return
+        self.text_edit.setTextCursor(cursor)
+        self.show_regex_result(cursor)
+
+    def _expand_regex_match(self, cursor, key, replace_str):
+        # 在所在段落中重新匹配一次以取得分组内容，按 \1、\g<name> 等展开替换文本
+        block = self.text_edit.document().findBlock(cursor.selectionStart())
+        text = block.text()
+        start = utf16_index(text, cursor.selectionStart() - block.position())
+        match = build_text_pattern(*key, True).match(text, start)
+        if match is None or utf16_length(match.group()) != cursor.selectionEnd() - cursor.selectionStart():
+            return None
+        try:
+            return match.expand(replace_str)
+        except (re.error, IndexError) as exc:
+            self.show_error_dialog('替换', f'替换文本有误: {exc}')
+            return None
 
     def _build_find_flags(self, case_sensitive, whole_words):
         flags = QTextDocument.FindFlags()
@@ -788,27 +2057,6 @@ class YunjiEditor(QMainWindow):
             flags |= QTextDocument.FindWholeWords
         return flags
 
-    def _collect_matches(self, find_str, case_sensitive, whole_words):
-        document = self.text_edit.document()
-        cursor = QTextCursor(document)
-        cursor.movePosition(QTextCursor.Start)
-        flags = self._build_find_flags(case_sensitive, whole_words)
-        matches = []
-        while True:
-            cursor = document.find(find_str, cursor, flags)
-            if cursor.isNull():
-                break
-            matches.append((cursor.selectionStart(), cursor.selectionEnd()))
-        return matches
-
-    def _determine_current_match(self, cursor, matches):
-        start = cursor.selectionStart()
-        end = cursor.selectionEnd()
-        for index, (match_start, match_end) in enumerate(matches, start=1):
-            if match_start == start and match_end == end:
-                return index
-        return 0
-
     def bold_text(self):
         cursor = self.text_edit.textCursor()
         if cursor.charFormat().fontWeight() != QFont.Bold:
@@ -848,13 +2096,132 @@ class YunjiEditor(QMainWindow):
             self.show_error_dialog('字体设置', f'无法打开字体设置: {exc}')
 
     def toggle_line_numbers(self):
+        if self.show_line_numbers_action.isChecked():
+            self.release_feature('line_numbers')
         try:
             self.text_edit.line_numbers_visible = self.show_line_numbers_action.isChecked()
             self.text_edit.updateLineNumberAreaWidth(0)
             self.text_edit.update()
+            self.large_view.line_numbers_visible = self.text_edit.line_numbers_visible
+            self.large_view.updateLineNumberAreaWidth(0)
         except Exception as exc:
             self.show_error_dialog('行号', f'切换行号显示失败: {exc}')
 
+    def toggle_minimap(self, checked):
+        self.release_feature('minimap')
+        self.text_edit.minimap_visible = checked
+        self.text_edit.updateLineNumberAreaWidth(0)
+
+    def apply_performance_policy(self, size, longest=0, file_path=None):
+        # 按文件大小和最长行关闭开销大的功能；上一个文档因策略关闭、这次不需要关闭的功能重新开启
+        self.apply_reduced_features(reduced_features(size, longest), file_path)
+
+    def apply_reduced_features(self, reduced, file_path=None):
+        for name in sorted(self.reduced_features - reduced):
+            self.reduced_features.discard(name)
+            self.set_feature(name, True)
+        for name in sorted(reduced - self.reduced_features):
+            if self.feature_enabled(name, file_path):
+                self.reduced_features.add(name)
+                self.set_feature(name, False)
+        self.update_policy_indicator()
+
+    def feature_enabled(self, name, file_path=None):
+        if name == 'syntax':
+            return self.text_edit.syntax.grammar is not None or grammar_for_path(file_path or self.file_path) is not None
+        if name == 'current_line':
+            return self.text_edit.current_line_visible
+        if name == 'line_numbers':
+            return self.show_line_numbers_action.isChecked()
+        if name == 'minimap':
+            return self.show_minimap_action.isChecked()
+        return self.updates.timer.interval() == FRAME_INTERVAL
+
+    def set_feature(self, name, on):
+        if name == 'syntax':
+            if on:
+                self.update_syntax()
+            else:
+                self.text_edit.syntax.set_grammar(None)
+        elif name == 'current_line':
+            self.text_edit.current_line_visible = on
+            self.text_edit.highlightCurrentLine()
+        elif name == 'line_numbers':
+            self.show_line_numbers_action.setChecked(on)
+            self.toggle_line_numbers()
+        elif name == 'minimap':
+            self.show_minimap_action.setChecked(on)
+            self.text_edit.minimap_visible = on
+            self.text_edit.updateLineNumberAreaWidth(0)
+        else:
+            self.updates.timer.setInterval(FRAME_INTERVAL if on else REDUCED_UPDATE_INTERVAL)
+
+    def enable_feature(self, name):
+        # 用户在状态栏的精简模式菜单中重新开启某项功能
+        self.reduced_features.discard(name)
+        self.set_feature(name, True)
+        self.update_policy_indicator()
+
+    def enable_all_features(self):
+        for name in sorted(self.reduced_features):
+            self.enable_feature(name)
+
+    def release_feature(self, name):
+        # 用户通过菜单自行切换了被策略关闭的功能，之后不再由策略管理
+        if name in self.reduced_features:
+            self.reduced_features.discard(name)
+            self.update_policy_indicator()
+
+    def update_policy_indicator(self):
+        self.policy_menu.clear()
+        if not self.reduced_features:
+            self.policy_button.hide()
+            return
+        names = [name for name in POLICY_FEATURES if name in self.reduced_features]
+        for name in names:
+            action = self.policy_menu.addAction(f'开启{feature_label(name)}')
+            action.triggered.connect(lambda checked, name=name: self.enable_feature(name))
+        self.policy_menu.addSeparator()
+        self.policy_menu.addAction('全部开启').triggered.connect(self.enable_all_features)
+        self.policy_button.setToolTip('文件较大或含有很长的行，已关闭: ' + '、'.join(feature_label(name) for name in names))
+        self.policy_button.show()
+
+    def toggle_bookmark(self):
+        if self.large_file_mode:
+            self.status_bar.showMessage('大文件模式下不支持书签', 2000)
+            return
+        self.text_edit.toggle_bookmark()
+
+    def goto_bookmark(self, backward=False):
+        if self.large_file_mode:
+            return
+        if not self.text_edit.goto_bookmark(backward):
+            self.status_bar.showMessage('没有书签', 2000)
+
+    def update_syntax(self, file_path=None, reset=True):
+        # 按文件扩展名选择语法；reset 为 False 表示文档内容随后会被整体替换
+        grammar = None if 'syntax' in self.reduced_features else grammar_for_path(file_path or self.file_path)
+        self.text_edit.syntax.set_grammar(grammar, reset)
+
+    def update_syntax_menu(self):
+        # 第一次显示时创建菜单项，之后每次显示时勾选当前使用的语法
+        if not self.syntax_actions:
+            group = QActionGroup(self.syntax_menu)
+            for grammar in [None] + GRAMMARS:
+                action = QAction(grammar.name if grammar else '纯文本', group, checkable=True)
+                action.triggered.connect(lambda checked, grammar=grammar: self.choose_syntax(grammar))
+                self.syntax_menu.addAction(action)
+                self.syntax_actions[grammar] = action
+        action = self.syntax_actions.get(self.text_edit.syntax.grammar)
+        if action is not None:
+            action.setChecked(True)
+
+    def choose_syntax(self, grammar):
+        self.release_feature('syntax')
+        self.text_edit.syntax.set_grammar(grammar)
+        if self.text_edit.syntax.suspended:
+            self.status_bar.showMessage('文档过大，已关闭语法高亮', 3000)
+
     def toggle_auto_wrap(self, checked):
         self.text_edit.setLineWrapMode(QPlainTextEdit.WidgetWidth if checked else QPlainTextEdit.NoWrap)
 
@@ -889,8 +2256,13 @@ class YunjiEditor(QMainWindow):
             self.show_error_dialog('文本颜色', f'设置文本颜色失败: {exc}')
 
     def handle_document_modified(self):
-        self.status_label_doc.setText("文档状态: 已修改")
-        self.update_file_size()
+        if self.loading or self.follower:
+            return
+        # 状态只在第一次修改时变化；未保存大小随每次编辑变化，留到下一帧刷新
+        if self.status_label_doc.text() != "文档状态: 已修改":
+            self.status_label_doc.setText("文档状态: 已修改")
+            self.update_tab_title()
+        self.updates.mark('size')
         self.is_saved = False
 
     def update_insert_overwrite_mode(self):
@@ -901,49 +2273,434 @@ class YunjiEditor(QMainWindow):
             print(f"更新插入/改写状态失败: {exc}")
 
     def closeEvent(self, event):
-        if not self.is_saved  and self.text_edit.document().isModified():  # 检查文本内容是否被修改过
-            reply = QMessageBox.question(self, '确认关闭', '是否保存已修改的内容?',
-                                         QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel)
-            if reply == QMessageBox.Save:
-                self.save_file()
-            elif reply == QMessageBox.Cancel:
+        if self.loader:
+            self.cancel_loading()
+        self.cancel_replace_all()
+        self.cancel_regex_search()
+        if hasattr(self, 'find_in_files_dialog'):
+            self.find_in_files_dialog.stop_search()
+        for search in self.findChildren(RegexSearch):
+            search.wait()
+        self.stop_following()
+        # 先询问当前文档，再逐个切换到有修改的后台标签页询问；任何一个取消都不关闭窗口
+        keep_journals = {}
+        current = self.tabs[self.current_tab]
+        for tab in [current] + [tab for tab in self.tabs if tab is not current]:
+            if tab is not current:
+                if not self.tab_modified(tab):
+                    continue
+                if self.saver:
+                    self.saver.finish_now()
+                self.tab_bar.setCurrentIndex(self.tabs.index(tab))
+                if self.tabs[self.current_tab] is not tab:
+                    event.ignore()
+                    return
+            keep_journal = self.confirm_close_document()
+            if keep_journal is None:
                 event.ignore()  # 忽略关闭事件
                 return
+            keep_journals[tab] = keep_journal
+        keep_journal = keep_journals.get(self.tabs[self.current_tab], False)
+        if self.saver:
+            self.saver.finish_now()
+        self.remember_file_state()
+        # 关闭最后一个窗口（退出程序）时保留它在会话中，否则从会话中移除
+        if self in open_editors and len(open_editors) > 1:
+            open_editors.remove(self)
+        self.record_session()
+        if self in open_editors:
+            open_editors.remove(self)
+        self.large_view.close_file()
+        self.reset_journal(discard=not keep_journal)
+        for tab in self.tabs:
+            if tab is not self.tabs[self.current_tab]:
+                self.release_tab(tab, keep_journals.get(tab, False))
+        self.evict_timer.stop()
+        self.find_timer.stop()
+        self.count_timer.stop()
+        self.updates.timer.stop()
+        self.text_edit.minimap.stop()
+        self.reset_find_cache()
         event.accept()
 
+    def confirm_close_document(self):
+        # 询问是否保存当前文档；取消时返回 None，否则返回是否需要保留恢复日志
+        if self.is_saved or not self.is_document_modified():  # 检查文本内容是否被修改过
+            return False
+        reply = QMessageBox.question(self, '确认关闭', '是否保存已修改的内容?',
+                                     QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel)
+        if reply == QMessageBox.Save:
+            self.save_file()
+            # 保存失败时保留恢复日志，下次启动时仍可恢复
+            return not self.saver and self.text_edit.document().isModified()
+        if reply == QMessageBox.Cancel:
+            return None
+        return False
+
+    def is_document_modified(self):
+        if self.large_file_mode:
+            return self.large_view.is_modified()
+        return self.text_edit.document().isModified()
+
+    def undo(self):
+        if self.large_file_mode:
+            self.large_view.undo()
+        else:
+            self.text_edit.undo()
+
+    def redo(self):
+        if self.large_file_mode:
+            self.large_view.redo()
+        else:
+            self.text_edit.redo()
+
     def on_text_changed(self):
+        if self.loading:
+            return
+        # 查找索引已经根据 contentsChange 更新，只需刷新查找窗口中的 "n/总数"；正则匹配结果作废，稍后重新匹配
+        if self.regex_key is not None or self.regex_search:
+            self.cancel_regex_search()
+        if hasattr(self, 'find_dialog') and self.find_dialog.isVisible():
+            if self.find_dialog.is_regex():
+                self.regex_timer.start()
+            else:
+                self.updates.mark('find')
+        if self.follower:
+            return
         self.is_saved = False  # 文本更改后，设置未保存标志
-        self.reset_find_cache()
+
+    def toggle_follow_mode(self, checked):
+        if checked:
+            self.start_following()
+        else:
+            self.stop_following()
+
+    def start_following(self):
+        # 跟踪期间文档只读，新内容追加到末尾，不记录撤销历史
+        if not self.file_path or self.large_file_mode or self.loading:
+            QMessageBox.information(self, '跟踪文件变化', '请先打开一个文件（大文件模式下不支持跟踪）。')
+            self.follow_action.setChecked(False)
+            return
+        if self.text_edit.document().isModified():
+            QMessageBox.information(self, '跟踪文件变化', '文档有未保存的修改，请先保存后再跟踪文件变化。')
+            self.follow_action.setChecked(False)
+            return
+        try:
+            follower = FileFollower(self.file_path, self.encoding or 'utf-8', self.file_offset, self)
+            follower.start()
+        except Exception as exc:
+            self.follow_action.setChecked(False)
+            self.show_error_dialog('跟踪文件变化', f'无法跟踪文件: {exc}')
+            return
+        follower.appended.connect(self._on_follow_appended)
+        follower.truncated.connect(self._on_follow_truncated)
+        follower.rotated.connect(lambda: self.status_bar.showMessage('文件已被替换，从新文件开头继续跟踪', 3000))
+        follower.follow_failed.connect(self._on_follow_failed)
+        self.follower = follower
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setUndoRedoEnabled(False)
+        self.follow_action.setChecked(True)
+        self.status_label_doc.setText("文档状态: 跟踪中")
+
+    def stop_following(self):
+        if not self.follower:
+            return
+        follower = self.follower
+        self.follower = None
+        follower.stop()
+        follower.deleteLater()
+        self.reset_journal()
+        self.file_offset = follower.offset
+        self.text_edit.setReadOnly(False)
+        self.text_edit.setUndoRedoEnabled(True)
+        self.follow_action.setChecked(False)
+        self.status_label_doc.setText("文档状态: 已打开")
+
+    def _on_follow_appended(self, text):
+        # 用户停留在末尾时自动滚动；若已向上滚动查看，则保持当前位置
+        scroll_bar = self.text_edit.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 1
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.text_edit.document().setModified(False)
+        if self.follower and self.follower.decoder.lossy and not self.lossy_decoding:
+            self.lossy_decoding = True
+            self.update_encoding_label()
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+        self.update_file_size()
+
+    def _on_follow_truncated(self):
+        self.text_edit.clear()
+        self.text_edit.document().setModified(False)
+        self.status_bar.showMessage('文件已被截断，从头开始跟踪', 3000)
+
+    def _on_follow_failed(self, message):
+        self.stop_following()
+        self.show_error_dialog('跟踪文件变化', f'跟踪文件失败: {message}')
+
+    def record_edit(self, position, removed, added):
+        # 把用户的修改追加到恢复日志；加载文件、跟踪模式下写入的内容来自磁盘，不需要记录
+        if self.loading or self.follower or self.large_file_mode:
+            return
+        document = self.text_edit.document()
+        end = document.characterCount() - 1
+        cursor = QTextCursor(document)
+        cursor.setPosition(min(position, end))
+        cursor.setPosition(min(position + added, end), QTextCursor.KeepAnchor)
+        journal = self.journal()
+        journal.record(position, removed, cursor.selectedText().replace('\u2029', '\n'))
+        if journal.needs_compaction(end):
+            journal.compact(document.toPlainText())
+
+    def journal(self):
+        if self.temp_file is None:
+            self.temp_file = RecoveryJournal(self.file_path, self.encoding, self.file_offset,
+                                             line_ending=self.line_ending, file_stat=self.disk_stat, parent=self)
+        return self.temp_file
+
+    def reset_journal(self, discard=True):
+        # 文档与磁盘上的文件一致时（打开、保存之后）丢弃日志，下一次修改时重新开始记录
+        if self.temp_file:
+            self.temp_file.close(discard)
+            self.temp_file.deleteLater()
+            self.temp_file = None
+
+    def offer_recovery(self):
+        # 启动时检查未正常关闭的会话留下的日志，询问是否恢复
+        journals = find_orphaned_journals()
+        if not journals:
+            return
+        names = []
+        for journal_path in journals:
+            try:
+                header = read_journal(journal_path)[0]
+            except Exception:
+                header = {}
+            name = os.path.basename(header.get('path') or '') or '未命名文档'
+            if base_changed(header):
+                name += '（原文件已被修改，恢复结果可能不准确）'
+            names.append(name)
+        reply = QMessageBox.question(self, '恢复未保存的内容',
+                                     '以下文档上次没有正常关闭，是否恢复未保存的修改？\n' + '\n'.join(names),
+                                     QMessageBox.Yes | QMessageBox.No)
+        for journal_path in journals:
+            if reply == QMessageBox.Yes:
+                if (self.file_path is None and not self.is_document_modified()) or self.new_tab():
+                    self.restore_from_journal(journal_path)
+            discard_temp_file(journal_path)
+
+    def restore_from_journal(self, journal_path):
+        try:
+            header, snapshot, deltas = read_journal(journal_path)
+            text = snapshot if snapshot is not None else read_base_text(header)
+        except Exception as exc:
+            self.show_error_dialog('恢复文档', f'无法恢复文档: {exc}')
+            return
+        self.reset_journal()
+        self.file_path = header.get('path')
+        self.encoding = header.get('encoding') or 'utf-8'
+        self.file_offset = header.get('size') or 0
+        self.set_line_ending(header.get('line_ending') or default_line_ending(), False)
+        self.loading = True
+        try:
+            self.text_edit.setPlainText(text)
+        finally:
+            self.loading = False
+        document = self.text_edit.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for position, removed, inserted in deltas:
+            end = document.characterCount() - 1
+            cursor.setPosition(min(position, end))
+            cursor.setPosition(min(position + removed, end), QTextCursor.KeepAnchor)
+            cursor.insertText(inserted)
+        cursor.endEditBlock()
+        if snapshot is not None:
+            # 快照不在原文件中，新的日志也从快照开始
+            self.journal().compact(self.text_edit.toPlainText())
+        document.setModified(True)
+        self.is_saved = False
+        self.filename_label.setText(os.path.basename(self.file_path) if self.file_path else "  ")
+        self.status_label_filepath.setText(f'打开文件: {self.file_path or ""}')
+        self.status_label_doc.setText("文档状态: 已恢复（未保存）")
+        self.update_encoding_label()
+        self.update_tab_title()
+
+    def _after_open(self):
+        # 记录检测到的编码，恢复上次的光标、滚动、缩放等状态，并更新会话
+        try:
+            store = session_store()
+            store.remember_encoding(self.file_path, self.encoding, self.encoding_confidence)
+            state = None if self.large_file_mode else store.file_state(self.file_path)
+        except Exception as exc:
+            print(f"读取文件状态失败: {exc}")
+            state = None
+        if state:
+            self.restore_file_state(state)
+        if self.pending_jump:
+            self.goto_position(*self.pending_jump)
+            self.pending_jump = None
+        self.update_tab_title()
+        self.record_session()
+
+    def remember_file_state(self):
+        if not self.file_path or self.loading or self.large_file_mode or self.pending_file:
+            return
+        try:
+            session_store().save_file_state(
+                self.file_path,
+                cursor=self.text_edit.textCursor().position(),
+                scroll=self.text_edit.verticalScrollBar().value(),
+                font_size=self.text_edit.new_font_size,
+                line_numbers=self.show_line_numbers_action.isChecked() or 'line_numbers' in self.reduced_features,
+                wrap=self.auto_wrap_action.isChecked())
+        except Exception as exc:
+            print(f"保存文件状态失败: {exc}")
+
+    def restore_file_state(self, state):
+        if 'font_size' in state:
+            self.text_edit.new_font_size = state['font_size']
+            self.text_edit.apply_zoom()
+            self.text_edit.update_status_label_zoom()
+        if 'line_numbers' in state and 'line_numbers' not in self.reduced_features:
+            self.show_line_numbers_action.setChecked(bool(state['line_numbers']))
+            self.toggle_line_numbers()
+        if 'wrap' in state:
+            self.auto_wrap_action.setChecked(bool(state['wrap']))
+            self.toggle_auto_wrap(bool(state['wrap']))
+        cursor = self.text_edit.textCursor()
+        cursor.setPosition(min(state.get('cursor', 0), self.text_edit.document().characterCount() - 1))
+        self.text_edit.setTextCursor(cursor)
+        # 滚动范围在布局完成后才确定
+        scroll = state.get('scroll', 0)
+        QTimer.singleShot(0, lambda: self.text_edit.verticalScrollBar().setValue(scroll))
+
+    def record_session(self):
+        entries = []
+        for editor in open_editors:
+            for index, tab in enumerate(editor.tabs):
+                current = index == editor.current_tab
+                path = (editor.pending_file or editor.file_path) if current else tab.path()
+                if path:
+                    entries.append((path, current and (editor.isActiveWindow() or editor is self)))
+        try:
+            session_store().save_session(entries)
+        except Exception as exc:
+            print(f"保存会话失败: {exc}")
+
+    def restore_session(self):
+        # 只有当前标签页的文档立即读取，其余标签页在第一次切换过去时才加载
+        try:
+            entries = session_store().load_session()
+        except Exception as exc:
+            print(f"读取会话失败: {exc}")
+            return
+        if not entries:
+            return
+        active_index = next((index for index, (_, active) in enumerate(entries) if active), len(entries) - 1)
+        for index, (path, _) in enumerate(entries):
+            if index == active_index:
+                continue
+            tab = DocumentTab(self.new_document_state())
+            tab.state['pending_file'] = path
+            self.add_tab(tab, self.current_tab if index < active_index else None)
+        self.open_file(entries[active_index][0])
+        self.raise_()
+        self.activateWindow()
+
+    def defer_open(self, file_path):
+        self.pending_file = file_path
+        self.filename_label.setText(os.path.basename(file_path))
+        self.status_label_filepath.setText(f'打开文件: {file_path}')
+        self.status_label_doc.setText("文档状态: 未加载")
+        self.update_tab_title()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow() and self.pending_file:
+            file_path = self.pending_file
+            QTimer.singleShot(0, lambda: self.open_file(file_path) if self.pending_file == file_path else None)
+        super(YunjiEditor, self).changeEvent(event)
+
+    def set_line_ending(self, line_ending, mixed=False):
+        self.line_ending = line_ending
+        self.mixed_line_endings = mixed
+        self.size_tracker.set_format(self.encoding, line_ending)
+        self.status_label_os_info.setText(f"{line_ending} (混合)" if mixed else line_ending)
+
+    def update_line_ending_menu(self):
+        # 第一次显示时创建菜单项，之后每次显示时勾选当前文档的换行符
+        if not self.line_ending_actions:
+            group = QActionGroup(self.line_ending_menu)
+            for name in LINE_ENDINGS:
+                action = QAction(name, group, checkable=True)
+                action.triggered.connect(lambda _, name=name: self.convert_line_endings(name))
+                self.line_ending_menu.addAction(action)
+                self.line_ending_actions[name] = action
+        self.line_ending_actions[self.line_ending].setChecked(True)
+
+    def convert_line_endings(self, line_ending):
+        # 转换在保存时逐块进行，这里只记录目标换行符并把文档标记为已修改
+        if self.large_file_mode:
+            QMessageBox.information(self, '换行符', '大文件模式下不支持转换换行符。')
+            return
+        if line_ending == self.line_ending and not self.mixed_line_endings:
+            return
+        self.set_line_ending(line_ending)
+        self.text_edit.document().setModified(True)
+        self.handle_document_modified()
+
+    def update_encoding_label(self):
+        text = format_encoding(self.encoding, self.encoding_confidence)
+        self.status_label_encoding.setText(f'{text} 有无法解码的字节' if self.lossy_decoding else text)
+        self.size_tracker.set_format(self.encoding, self.line_ending)
 
     def update_file_size(self):
+        # 只在打开、保存等时机读取磁盘上的大小，输入时使用 update_size_label
+        self.disk_stat = None
         try:
-            if self.file_path and os.path.isfile(self.file_path):
-                size = os.path.getsize(self.file_path)
-                human_readable_size = self.convert_size(size)
-                self.status_label_file_size.setText(f"文件大小: {human_readable_size}")
-            else:
-                self.status_label_file_size.setText("文件大小: N/A")
+            if self.file_path:
+                stat_result = os.stat(self.file_path)
+                if stat.S_ISREG(stat_result.st_mode):
+                    self.disk_stat = stat_result
+        except FileNotFoundError:
+            pass
         except Exception as exc:
-            self.status_label_file_size.setText("文件大小: N/A")
             print(f'更新文件大小失败: {exc}')
+        self.update_size_label()
+
+    def update_size_label(self):
+        if self.disk_stat:
+            text = f"文件大小: {self.convert_size(self.disk_stat.st_size)}"
+        else:
+            text = "文件大小: N/A"
+        if self.is_document_modified():
+            if self.large_file_mode:
+                unsaved = self.large_view.table.size if self.large_view.table else None
+            else:
+                unsaved = self.size_tracker.size()
+            if unsaved is not None:
+                text += f" (未保存: {self.convert_size(unsaved)})"
+        if not self.large_file_mode and not self.size_tracker.is_complete() and not self.size_timer.isActive():
+            self.size_timer.start()
+        self.status_label_file_size.setText(text)
+
+    def _continue_size(self):
+        # 大小表建立完成后刷新未保存大小，在此之前显示上一次得到的大小
+        if self.large_file_mode or self.size_tracker.advance():
+            self.size_timer.stop()
+            self.updates.mark('size')
 
     def show_error_dialog(self, title, message):
         QMessageBox.critical(self, title, message)
 
     def _read_file_with_fallback(self, file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read(), 'utf-8'
-        except UnicodeDecodeError:
-            with open(file_path, 'rb') as file:
-                raw_data = file.read()
-                result = chardet.detect(raw_data) or {}
-                encoding = result.get('encoding') or 'utf-8'
-            with open(file_path, 'r', encoding=encoding, errors='ignore') as file:
-                return file.read(), encoding
+        # 文件只读取一次：抽样检测编码（结果按路径、大小和修改时间缓存），再从同一缓冲区解码
+        return read_text_file(file_path)
 
     def reset_find_cache(self):
-        self.find_cache = {"key": None, "matches": []}
+        self.find_index.clear()
 
     def convert_size(self, size):
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -954,11 +2711,27 @@ class YunjiEditor(QMainWindow):
 
 def open_with_yunji(filename=None):
     app = QApplication(sys.argv)
-    editor = YunjiEditor(filename)
+    editor = YunjiEditor()
     editor.show()
+    # 先绘制窗口，单实例服务、恢复检查和加载文件内容都在第一次绘制之后进行
+    app.processEvents()
+    # 成为单实例服务端，之后启动的 yunji 把文件转发到这里
+    from yunji.instance import InstanceServer
+    instance_server = InstanceServer(app)
+    instance_server.files_received.connect(editor.open_files)
+    if not instance_server.listen():
+        print('无法启动单实例服务，之后打开的文件将在新进程中打开')
+    editor.offer_recovery()
+    if filename:
+        QTimer.singleShot(0, lambda: editor.open_file(filename))
+    else:
+        editor.restore_session()
     app.exec_()
 
 def cli_editor():
+    from yunji.instance import send_to_running_instance
+    if send_to_running_instance(sys.argv[1:2]):
+        return
     if len(sys.argv) > 1:
         file_path = sys.argv[1]
         open_with_yunji(file_path)
@@ -966,5 +2739,8 @@ def cli_editor():
         open_with_yunji()
 
 if __name__ == "__main__":
+    import multiprocessing
+    # 打包后的程序中正则匹配子进程需要由此启动
+    multiprocessing.freeze_support()
     cli_editor()
     
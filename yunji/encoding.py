@@ -0,0 +1,127 @@
+# encoding
+import codecs
+import os
+from collections import OrderedDict
+
+# 检测时读取的文件开头字节数
+SAMPLE_HEAD_SIZE = 64 * 1024
+# 文件中部额外抽样的窗口数量和每个窗口的大小
+SAMPLE_WINDOWS = 4
+SAMPLE_WINDOW_SIZE = 16 * 1024
+# 检测缓存最多保留的文件数
+CACHE_SIZE = 256
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+_detection_cache = OrderedDict()
+
+
+def _cache_key(file_path, stat_result):
+    return (os.path.realpath(file_path), stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def cached_detection(file_path, stat_result):
+    key = _cache_key(file_path, stat_result)
+    result = _detection_cache.get(key)
+    if result is not None:
+        _detection_cache.move_to_end(key)
+    return result
+
+
+def remember_detection(file_path, stat_result, result):
+    _detection_cache[_cache_key(file_path, stat_result)] = result
+    _detection_cache.move_to_end(_cache_key(file_path, stat_result))
+    while len(_detection_cache) > CACHE_SIZE:
+        _detection_cache.popitem(last=False)
+
+
+def clear_detection_cache():
+    _detection_cache.clear()
+
+
+def _is_utf8_sample(sample, at_start, at_end):
+    if not at_start:
+        # 跳过窗口开头被截断的多字节字符的后续字节
+        skip = 0
+        while skip < 3 and skip < len(sample) and 0x80 <= sample[skip] < 0xC0:
+            skip += 1
+        sample = sample[skip:]
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=at_end)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def read_samples(file, size, head):
+    # 返回文件中部均匀分布的抽样窗口，读取后把文件位置恢复到 head 之后
+    windows = []
+    position = file.tell()
+    remaining = size - len(head)
+    if remaining > SAMPLE_WINDOW_SIZE * (SAMPLE_WINDOWS + 1):
+        for index in range(1, SAMPLE_WINDOWS + 1):
+            file.seek(len(head) + remaining * index // (SAMPLE_WINDOWS + 1))
+            windows.append(file.read(SAMPLE_WINDOW_SIZE))
+    elif remaining > 0:
+        windows.append(file.read(remaining))
+    file.seek(position)
+    return windows
+
+
+def detect_encoding(head, windows=(), complete=False):
+    # head 为文件开头的数据，windows 为抽样窗口，complete 表示 head 已经包含整个文件
+    # 返回 (编码, 置信度)
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name, 1.0
+
+    samples = [head] + list(windows)
+    if all(_is_utf8_sample(sample, index == 0, complete) for index, sample in enumerate(samples)):
+        return 'utf-8', 1.0 if complete else 0.99
+
+    # chardet 导入较慢，只在需要统计检测时才导入，不影响启动
+    import chardet
+    detector = chardet.UniversalDetector()
+    for sample in samples:
+        detector.feed(sample)
+        if detector.done:  # 已经足够确定，提前结束
+            break
+    detector.close()
+    result = detector.result or {}
+    encoding = result.get('encoding')
+    if not encoding:
+        return 'utf-8', 0.0
+    try:
+        encoding = codecs.lookup(encoding).name
+    except LookupError:
+        return 'utf-8', 0.0
+    return encoding, float(result.get('confidence') or 0.0)
+
+
+def detect_file_encoding(file_path, file, stat_result, head):
+    # file 的当前位置应在 head 之后；优先使用缓存结果
+    result = cached_detection(file_path, stat_result)
+    if result is None:
+        complete = len(head) >= stat_result.st_size
+        windows = () if complete else read_samples(file, stat_result.st_size, head)
+        result = detect_encoding(head, windows, complete)
+        remember_detection(file_path, stat_result, result)
+    return result
+
+
+def format_encoding(encoding, confidence):
+    return f"{encoding} ({confidence:.0%})"
+
+
+def detect_path_encoding(file_path):
+    # 只读取开头和抽样窗口来检测编码，不读取整个文件
+    with open(file_path, 'rb') as file:
+        stat_result = os.fstat(file.fileno())
+        head = file.read(SAMPLE_HEAD_SIZE)
+        return detect_file_encoding(file_path, file, stat_result, head)
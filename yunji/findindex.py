@@ -0,0 +1,352 @@
+# findindex
+import functools
+import re
+import time
+from PyQt5.QtGui import QTextCursor
+
+# 非 BMP 字符在 Qt 中占两个 UTF-16 单位，在 Python 字符串中只占一个
+_ASTRAL = re.compile('[\U00010000-\U0010ffff]')
+
+# 查找框输入停顿多久（毫秒）后开始边输入边查找
+TYPE_AHEAD_DELAY = 150
+# 边输入边查找时在界面线程中立即查找的范围（光标之后的 UTF-16 单位数），更远的匹配项等分段统计找到
+TYPE_AHEAD_WINDOW = 1 << 18
+# 统计匹配总数时每次在界面线程中连续运行的时间（秒），其余时间留给界面响应
+COUNT_SLICE_TIME = 0.01
+# 分段统计时每段读取的文档长度（UTF-16）、扫描的字符数和检查的旧匹配项数
+READ_CHUNK_SIZE = 1 << 19
+SCAN_CHUNK_SIZE = 16384
+NARROW_CHUNK_SIZE = 1024
+
+
+def utf16_length(text):
+    return len(text) + len(_ASTRAL.findall(text))
+
+
+def utf16_index(text, offset):
+    # 把 UTF-16 偏移换算为 text 中的下标
+    if _ASTRAL.search(text) is None:
+        return offset
+    index = 0
+    while offset > 0 and index < len(text):
+        offset -= 2 if ord(text[index]) > 0xffff else 1
+        index += 1
+    return index
+
+
+@functools.lru_cache(maxsize=64)
+def build_text_pattern(find_str, case_sensitive, whole_words, regex=False):
+    # 与 QTextDocument.find 的规则一致：全词匹配要求前后不是字母或数字（下划线不算单词字符）
+    # 编译结果按参数缓存，反复查找同一内容时不再重新编译；正则表达式有误时抛出 re.error
+    pattern = f'(?:{find_str})' if regex else re.escape(find_str)
+    if whole_words:
+        pattern = r'(?<![^\W_])' + pattern + r'(?![^\W_])'
+    return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+
+
+def _has_border(text):
+    # text 的某个真前缀同时也是它的后缀时（如 "aa"、"abab"），这个查询的匹配项可能互相重叠
+    border = [0] * len(text)
+    length = 0
+    for index in range(1, len(text)):
+        while length and text[index] != text[length]:
+            length = border[length - 1]
+        if text[index] == text[length]:
+            length += 1
+        border[index] = length
+    return bool(text) and border[-1] > 0
+
+
+def find_spans(pattern, text, offset=0, start=0, stop=None):
+    # 在 text[start:stop] 中查找匹配，返回以 UTF-16 为单位、加上 offset 的 (起点, 终点)；前后的字符只用于判断边界
+    spans = []
+    astral = _ASTRAL.search(text) is not None
+    position = offset  # text[index] 对应的文档位置
+    index = 0
+    for match in pattern.finditer(text, start):
+        if stop is not None and match.start() >= stop:
+            break
+        if astral:
+            position += utf16_length(text[index:match.start()])
+            end = position + utf16_length(match.group())
+            index = match.start()
+        else:
+            position = offset + match.start()
+            end = offset + match.end()
+        spans.append((position, end))
+    return spans
+
+
+class MatchIndex:
+    # 文档中查找结果的位置索引，根据 contentsChange 只重新扫描修改附近的区域
+    # 修改之后的匹配项位置不立即更新：下标不小于 shift_from 的项还需要加上 shift
+    # 统计可以分段进行（start 之后反复调用 advance），尚未完成时 starts 中是文档开头部分已经找到的匹配项
+    def __init__(self, document):
+        self.document = document
+        self.key = None
+        self.pattern = None
+        self.margin = 0
+        self.starts = []
+        self.ends = []
+        self.shift_from = 0
+        self.shift = 0
+        self.job = None  # 尚未完成的统计（生成器）
+        self.text = None  # 统计过程中文档文本的快照，统计完成或文档修改后释放
+        self.astral = False
+        document.contentsChange.connect(self._on_contents_change)
+
+    def clear(self):
+        self.key = None
+        self.pattern = None
+        self.starts = []
+        self.ends = []
+        self.shift_from = 0
+        self.shift = 0
+        self.job = None
+        self.text = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def pending(self):
+        return self.job is not None
+
+    def rebuild(self, find_str, case_sensitive, whole_words):
+        self.start(find_str, case_sensitive, whole_words)
+        self.advance()
+
+    def can_narrow(self, find_str, case_sensitive, whole_words):
+        # 新查询在旧查询后面追加了内容时，新的匹配项只可能出现在旧匹配项的位置上
+        # 全词匹配、旧查询自身可以重叠（从头查找时会跳过一些位置）或旧结果不完整时只能重新扫描
+        if self.key is None or self.job is not None:
+            return False
+        old_str, old_case, old_whole = self.key
+        if whole_words or old_whole or old_case != case_sensitive:
+            return False
+        if not case_sensitive:
+            old_str, find_str = old_str.lower(), find_str.lower()
+        return find_str.startswith(old_str) and not _has_border(old_str)
+
+    def start(self, find_str, case_sensitive, whole_words):
+        # 开始统计新的查询；能缩小旧结果时只检查旧匹配项的位置
+        narrow = self.can_narrow(find_str, case_sensitive, whole_words)
+        candidates = (self.starts, self.shift_from, self.shift)
+        self.key = (find_str, case_sensitive, whole_words)
+        self.pattern = build_text_pattern(find_str, case_sensitive, whole_words)
+        # 修改可能影响的范围：匹配长度加上全词匹配时需要检查的前后各一个字符
+        self.margin = utf16_length(find_str) + 1
+        self.starts = []
+        self.ends = []
+        self.shift_from = 0
+        self.shift = 0
+        self.job = self._count_job(candidates if narrow else None)
+
+    def advance(self, budget=None):
+        # 继续尚未完成的统计，最多运行 budget 秒（None 表示直到完成）；全部完成时返回 True
+        deadline = None if budget is None else time.perf_counter() + budget
+        while self.job is not None:
+            try:
+                next(self.job)
+            except StopIteration:
+                self.job = None
+                self.shift_from = len(self.starts)
+                self.text = None
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return self.job is None
+
+    def _count_job(self, candidates):
+        if self.text is None:
+            yield from self._read_job()
+        # 文档中有非 BMP 字符时位置与下标不一致，不缩小旧结果
+        if candidates is not None and not self.astral:
+            yield from self._narrow_job(candidates)
+        else:
+            yield from self._scan_job()
+
+    def _read_job(self):
+        # 分段读取文档文本作为快照，每段在段落末尾结束
+        document = self.document
+        cursor = QTextCursor(document)
+        end = document.characterCount() - 1
+        pieces = []
+        astral = False
+        position = 0
+        while position < end:
+            block = document.findBlock(min(position + READ_CHUNK_SIZE, end))
+            stop = min(block.position() + block.length() - 1, end)
+            cursor.setPosition(position)
+            cursor.setPosition(stop, QTextCursor.KeepAnchor)
+            piece = cursor.selectedText().replace('\u2029', '\n')
+            astral = astral or (not piece.isascii() and _ASTRAL.search(piece) is not None)
+            pieces.append(piece)
+            if stop < end:
+                pieces.append('\n')
+            position = stop + 1
+            yield
+        self.text = ''.join(pieces)
+        self.astral = astral
+
+    def _narrow_job(self, candidates):
+        # 旧查询不会自身重叠，它的匹配项就是所有出现位置；新查询的匹配项是其中能匹配的、且不与前一个重叠的那些
+        text = self.text
+        match = self.pattern.match
+        length = len(self.key[0])
+        starts, ends = self.starts, self.ends
+        old_starts, shift_from, shift = candidates
+        last_end = 0
+        for number, start in enumerate(old_starts, 1):
+            if number > shift_from:
+                start += shift
+            if start >= last_end and match(text, start):
+                last_end = start + length
+                starts.append(start)
+                ends.append(last_end)
+            if number % NARROW_CHUNK_SIZE == 0:
+                yield
+
+    def _scan_job(self):
+        # 分段扫描快照；每段多取查询长度加一个字符，保证跨段的匹配项和全词边界判断正确
+        text = self.text
+        finditer = self.pattern.finditer
+        extra = len(self.key[0]) + 1
+        starts, ends = self.starts, self.ends
+        position = index = 0  # 上一个匹配项起点的文档位置（UTF-16）和下标
+        chunk_start = 0
+        while chunk_start < len(text):
+            chunk_stop = min(chunk_start + SCAN_CHUNK_SIZE, len(text))
+            next_start = chunk_stop
+            for match in finditer(text, chunk_start, min(chunk_stop + extra, len(text))):
+                if match.start() >= chunk_stop:
+                    break
+                if self.astral:
+                    position += utf16_length(text[index:match.start()])
+                    index = match.start()
+                    end = position + utf16_length(match.group())
+                else:
+                    position = match.start()
+                    end = match.end()
+                starts.append(position)
+                ends.append(end)
+                next_start = max(next_start, match.end())
+            chunk_start = next_start
+            yield
+
+    def span(self, index):
+        shift = self.shift if index >= self.shift_from else 0
+        return self.starts[index] + shift, self.ends[index] + shift
+
+    def spans(self):
+        return [self.span(index) for index in range(len(self.starts))]
+
+    def bisect(self, position):
+        # 第一个起点不小于 position 的匹配项下标
+        low, high = 0, len(self.starts)
+        while low < high:
+            middle = (low + high) // 2
+            if self.span(middle)[0] < position:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def spans_between(self, start, stop):
+        # 起点落在 [start, stop) 之内的匹配项，只用两次二分查找，与匹配总数无关
+        return [self.span(index) for index in range(self.bisect(start), self.bisect(stop))]
+
+    def next_span(self, position):
+        # 起点不小于 position 的第一个匹配项；统计尚未完成时只在已经找到的部分中查找
+        index = self.bisect(position)
+        return self.span(index) if index < len(self.starts) else None
+
+    def first_in(self, start, stop):
+        # 直接扫描文档中 [start, stop) 的一段，返回其中第一个匹配项；用于统计尚未到达的位置
+        spans = self._scan(start, stop)
+        return spans[0] if spans else None
+
+    def number_of(self, start, end):
+        # 选区恰好是某个匹配项时返回它的序号（从 1 开始），否则返回 0
+        index = self.bisect(start)
+        if index < len(self.starts) and self.span(index) == (start, end):
+            return index + 1
+        return 0
+
+    def _apply_shift(self, start, stop):
+        shift = self.shift
+        if shift:
+            starts, ends = self.starts, self.ends
+            for index in range(start, stop):
+                starts[index] += shift
+                ends[index] += shift
+
+    def _shift_after(self, index, delta):
+        # 让下标不小于 index 的项再移动 delta；连续在同一处输入时只修改 shift
+        if index >= self.shift_from:
+            self._apply_shift(self.shift_from, index)
+            self.shift += delta
+        else:
+            self._apply_shift(self.shift_from, len(self.starts))
+            self.shift = delta
+        self.shift_from = index
+
+    def _remove(self, start, stop):
+        if stop <= start:
+            return
+        del self.starts[start:stop]
+        del self.ends[start:stop]
+        if self.shift_from >= stop:
+            self.shift_from -= stop - start
+        elif self.shift_from > start:
+            self.shift_from = start
+
+    def _scan(self, start, stop):
+        # 查找起点在 [start, stop) 中的匹配项，多取前后的字符用于判断全词边界
+        document = self.document
+        end = document.characterCount() - 1
+        text_start = max(start - 1, 0)
+        text_end = min(stop + self.margin, end)
+        if text_start >= text_end:
+            return []
+        cursor = QTextCursor(document)
+        cursor.setPosition(text_start)
+        cursor.setPosition(text_end, QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+        # 从 start 开始查找，前一个字符只用于判断边界，不能被匹配占用
+        spans = find_spans(self.pattern, text, text_start, start - text_start)
+        return [span for span in spans if span[0] < stop]
+
+    def _on_contents_change(self, position, removed, added):
+        self.text = None
+        if self.job is not None:
+            # 快照已经过期，未完成的统计作废，由调用方重新开始
+            self.clear()
+        if self.key is None:
+            return
+        margin = self.margin
+        # 起点在修改位置前后 margin 范围内的旧匹配项可能失效，其余的只需要移动位置
+        first = self.bisect(max(position - margin, 0))
+        last = self.bisect(position + removed + margin)
+        stop = position + added + margin
+        if last > first:
+            # 查询自身可以重叠时，旧的查找在被删除的匹配项之内跳过了一些出现位置，这一段也要重新扫描
+            stop = max(stop, self.span(last - 1)[1] + added - removed)
+        self._remove(first, last)
+        self._shift_after(first, added - removed)
+        # 从前一个匹配项的终点之后开始扫描，与从头查找时的结果保持一致
+        start = max(position - margin, 0)
+        if first:
+            start = max(start, self.span(first - 1)[1])
+        found = self._scan(start, stop)
+        # 新的匹配项与之后的旧匹配项重叠时，旧的作废，从最后一个新匹配项的终点继续向后扫描，
+        # 直到新的匹配项不再越过下一个旧匹配项的起点，此后两次查找的对齐方式相同
+        while found and first < len(self.starts) and self.span(first)[0] < found[-1][1]:
+            old_end = self.span(first)[1]
+            self._remove(first, first + 1)
+            resume = found[-1][1]
+            stop = max(stop, old_end)
+            found += self._scan(resume, stop)
+        # 新的匹配项同样减去 shift 保存，shift_from 不变，连续输入时不必更新之后的所有项
+        shift = self.shift
+        self.starts[first:first] = [span[0] - shift for span in found]
+        self.ends[first:first] = [span[1] - shift for span in found]
@@ -0,0 +1,368 @@
+# findinfiles
+import fnmatch
+import mmap
+import os
+import queue
+import re
+import threading
+import time
+from PyQt5.QtWidgets import (QDialog, QFileDialog, QLabel, QLineEdit, QPushButton, QCheckBox, QHBoxLayout,
+                             QVBoxLayout, QGridLayout, QTreeWidget, QTreeWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from yunji.encoding import SAMPLE_HEAD_SIZE, detect_encoding, read_samples
+from yunji.findindex import build_text_pattern
+from yunji.largefile import build_byte_pattern, supports_large_file_mode
+from yunji.loader import make_decoder
+
+# 文件开头包含 NUL 字节时视为二进制文件跳过（UTF-16/32 文件以 BOM 区分）
+BINARY_SNIFF_SIZE = 8 * 1024
+# 一个任务中包含的文件总字节数上限，小文件合并提交，减少进程间通信
+FIND_BATCH_BYTES = 8 * 1024 * 1024
+FIND_BATCH_FILES = 64
+# 每个文件最多返回的匹配数，以及结果列表中最多显示的条数
+MAX_MATCHES_PER_FILE = 1000
+MAX_RESULTS = 20000
+# 结果预览最多显示的字符数
+PREVIEW_LENGTH = 200
+# 不区分大小写的预筛每次转为小写的字节数，不复制整个文件
+PREFILTER_CHUNK_SIZE = 4 * 1024 * 1024
+# 等待搜索结果时检查是否已取消的间隔（秒）
+CANCEL_POLL_INTERVAL = 0.1
+# 默认排除的目录
+DEFAULT_EXCLUDES = '.git;.svn;.hg;node_modules;__pycache__'
+
+_WIDE_BOMS = (b'\xff\xfe', b'\xfe\xff')
+
+
+def split_globs(text):
+    return [glob.strip() for glob in re.split('[;,]', text or '') if glob.strip()]
+
+
+def _matches_any(name, relative_path, globs):
+    return any(fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(relative_path, glob) for glob in globs)
+
+
+def iter_files(root, includes=(), excludes=()):
+    # 遍历目录树，返回 (路径, 大小)；排除规则同时作用于目录名和文件名
+    for directory, subdirectories, files in os.walk(root):
+        relative_directory = os.path.relpath(directory, root)
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if not _matches_any(name, os.path.normpath(os.path.join(relative_directory, name)),
+                                                       excludes))
+        for name in sorted(files):
+            relative_path = os.path.normpath(os.path.join(relative_directory, name))
+            if excludes and _matches_any(name, relative_path, excludes):
+                continue
+            if includes and not _matches_any(name, relative_path, includes):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if size:
+                yield path, size
+
+
+def _preview(line, column):
+    line = line.rstrip()
+    if len(line) <= PREVIEW_LENGTH:
+        return line
+    start = max(0, min(column - PREVIEW_LENGTH // 4, len(line) - PREVIEW_LENGTH))
+    return line[start:start + PREVIEW_LENGTH]
+
+
+def _find_in_text(pattern, text, regex):
+    # 返回 [(行号, 列, 长度, 预览)]，行号和列从 0 开始，列以字符计
+    matches = []
+    if regex:
+        # 与编辑器中的正则查找一样逐行匹配
+        for number, line in enumerate(text.split('\n')):
+            for match in pattern.finditer(line):
+                matches.append((number, match.start(), match.end() - match.start(), _preview(line, match.start())))
+                if len(matches) >= MAX_MATCHES_PER_FILE:
+                    return matches
+        return matches
+    # 普通查找的内容不含换行，可以在整个文本上查找，再按换行符数量换算行号
+    number = 0
+    counted = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        number += text.count('\n', counted, start)
+        counted = start
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        line = text[line_start:line_end if line_end >= 0 else len(text)]
+        matches.append((number, start - line_start, match.end() - start, _preview(line, start - line_start)))
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    return matches
+
+
+def _may_contain(mapped, find_str, encoding, case_sensitive):
+    # 字节层面的预筛：区分大小写时直接用 mmap.find；ASCII 内容分块转为小写后查找（bytes.lower 只转换 ASCII 字母，
+    # 比 IGNORECASE 的字节正则快得多），相邻块重叠查询长度减一个字节；其余按各字符的大小写变体匹配
+    if case_sensitive:
+        return mapped.find(find_str.encode(encoding, errors='replace')) >= 0
+    if find_str.isascii():
+        needle = find_str.lower().encode('ascii')
+        overlap = len(needle) - 1
+        for start in range(0, len(mapped), PREFILTER_CHUNK_SIZE):
+            if mapped[start:start + PREFILTER_CHUNK_SIZE + overlap].lower().find(needle) >= 0:
+                return True
+        return False
+    return build_byte_pattern(find_str, encoding, False, False).search(mapped) is not None
+
+
+def search_file(path, query):
+    # 在进程池中运行：映射文件，跳过二进制文件，先在字节层面预筛，有命中时才解码
+    find_str, case_sensitive, whole_words, regex = query
+    try:
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if not size:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                head = mapped[:SAMPLE_HEAD_SIZE]
+                if b'\0' in head[:BINARY_SNIFF_SIZE] and not head.startswith(_WIDE_BOMS):
+                    return []
+                file.seek(len(head))
+                encoding, _ = detect_encoding(head, read_samples(file, size, head), len(head) >= size)
+                if not regex and supports_large_file_mode(encoding) and not _may_contain(mapped, find_str, encoding,
+                                                                                        case_sensitive):
+                    return []
+                text = make_decoder(encoding).decode(mapped[:], final=True)
+    except (OSError, ValueError, LookupError):
+        return []
+    return _find_in_text(build_text_pattern(find_str, case_sensitive, whole_words, regex), text, regex)
+
+
+def search_files(paths, query):
+    return [(path, search_file(path, query)) for path in paths]
+
+
+def _batches(files):
+    batch, batch_bytes = [], 0
+    for path, size in files:
+        batch.append((path, size))
+        batch_bytes += size
+        if batch_bytes >= FIND_BATCH_BYTES or len(batch) >= FIND_BATCH_FILES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+class FindInFilesWorker(QThread):
+    # 遍历目录并把文件分批交给进程池，按完成顺序转发结果；取消时不等待正在运行的批次，直接结束工作进程
+    file_matched = pyqtSignal(str, object)  # 文件路径, [(行号, 列, 长度, 预览)]
+    progress = pyqtSignal(int, int, int, float)  # 已搜索文件数, 文件总数, 已搜索字节数, 已用秒数
+    search_failed = pyqtSignal(str)
+
+    def __init__(self, root, query, includes=(), excludes=(), workers=None, parent=None):
+        super(FindInFilesWorker, self).__init__(parent)
+        self.root = root
+        self.query = query
+        self.includes = includes
+        self.excludes = excludes
+        self.workers = workers or os.cpu_count() or 1
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        # 第一次搜索时才导入，减少启动时间
+        import multiprocessing
+        started = time.monotonic()
+        try:
+            if self.query[3]:
+                re.compile(self.query[0])  # 在主进程中报告表达式错误
+            files = list(iter_files(self.root, self.includes, self.excludes))
+            done = 0
+            done_bytes = 0
+            # 用 spawn 启动工作进程，不在多线程的 Qt 进程中 fork；各批次的结果按完成顺序放入 results
+            results = queue.Queue()
+            pool = multiprocessing.get_context('spawn').Pool(self.workers)
+            pending = 0
+            try:
+                for batch in _batches(files):
+                    count, size = len(batch), sum(size for _, size in batch)
+                    pool.apply_async(search_files, ([path for path, _ in batch], self.query),
+                                     callback=lambda found, count=count, size=size: results.put((found, count, size)),
+                                     error_callback=lambda exc: results.put((exc, 0, 0)))
+                    pending += 1
+                while pending and not self.is_cancelled():
+                    try:
+                        found, count, size = results.get(timeout=CANCEL_POLL_INTERVAL)
+                    except queue.Empty:
+                        continue
+                    pending -= 1
+                    if isinstance(found, Exception):
+                        raise found
+                    for path, matches in found:
+                        if matches:
+                            self.file_matched.emit(path, matches)
+                    done += count
+                    done_bytes += size
+                    self.progress.emit(done, len(files), done_bytes, time.monotonic() - started)
+            finally:
+                if pending:
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+            if self.is_cancelled():
+                return
+            if not files:
+                self.progress.emit(0, 0, 0, time.monotonic() - started)
+        except Exception as exc:
+            if not self.is_cancelled():
+                self.search_failed.emit(str(exc))
+
+
+class FindInFilesDialog(QDialog):
+    # 在文件中查找：结果逐个文件加入列表，点击结果在编辑器中打开对应位置
+    result_activated = pyqtSignal(str, int, int, int)  # 文件路径, 行号, 列, 长度
+
+    def __init__(self, parent=None, directory='', initial_text=''):
+        super(FindInFilesDialog, self).__init__(parent)
+        self.setWindowTitle("在文件中查找")
+        self.resize(760, 480)
+        self.worker = None
+        self.result_count = 0
+
+        self.find_input = QLineEdit(initial_text)
+        self.directory_input = QLineEdit(directory)
+        self.browse_button = QPushButton("浏览...")
+        self.browse_button.clicked.connect(self.choose_directory)
+        self.include_input = QLineEdit()
+        self.include_input.setPlaceholderText("例如 *.log;*.conf，留空表示全部文件")
+        self.exclude_input = QLineEdit(DEFAULT_EXCLUDES)
+        self.case_checkbox = QCheckBox("区分大小写")
+        self.whole_checkbox = QCheckBox("全字匹配")
+        self.regex_checkbox = QCheckBox("正则表达式")
+        self.find_button = QPushButton("查找")
+        self.find_button.clicked.connect(self.start_search)
+        self.stop_button = QPushButton("停止")
+        self.stop_button.clicked.connect(self.stop_search)
+        self.stop_button.setEnabled(False)
+        self.status_label = QLabel("")
+
+        self.result_tree = QTreeWidget()
+        self.result_tree.setHeaderLabels(["文件", "行", "列", "内容"])
+        self.result_tree.setRootIsDecorated(False)
+        self.result_tree.setUniformRowHeights(True)
+        self.result_tree.header().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.result_tree.itemClicked.connect(self._on_item_clicked)
+        self.result_tree.itemActivated.connect(self._on_item_clicked)
+
+        form = QGridLayout()
+        form.addWidget(QLabel("查找内容:"), 0, 0)
+        form.addWidget(self.find_input, 0, 1, 1, 2)
+        form.addWidget(QLabel("目录:"), 1, 0)
+        form.addWidget(self.directory_input, 1, 1)
+        form.addWidget(self.browse_button, 1, 2)
+        form.addWidget(QLabel("包含:"), 2, 0)
+        form.addWidget(self.include_input, 2, 1, 1, 2)
+        form.addWidget(QLabel("排除:"), 3, 0)
+        form.addWidget(self.exclude_input, 3, 1, 1, 2)
+
+        option_layout = QHBoxLayout()
+        option_layout.addWidget(self.case_checkbox)
+        option_layout.addWidget(self.whole_checkbox)
+        option_layout.addWidget(self.regex_checkbox)
+        option_layout.addStretch()
+        option_layout.addWidget(self.find_button)
+        option_layout.addWidget(self.stop_button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addLayout(option_layout)
+        layout.addWidget(self.result_tree)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def choose_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择目录", self.directory_input.text())
+        if directory:
+            self.directory_input.setText(directory)
+
+    def start_search(self):
+        find_str = self.find_input.text()
+        directory = self.directory_input.text()
+        if not find_str or not os.path.isdir(directory):
+            self.status_label.setText("请输入查找内容和有效的目录")
+            return
+        self.stop_search()
+        self.result_tree.clear()
+        self.result_count = 0
+        query = (find_str, self.case_checkbox.isChecked(), self.whole_checkbox.isChecked(),
+                 self.regex_checkbox.isChecked())
+        self.worker = FindInFilesWorker(directory, query, split_globs(self.include_input.text()),
+                                        split_globs(self.exclude_input.text()), parent=self)
+        self.worker.file_matched.connect(self._on_file_matched)
+        self.worker.progress.connect(self._on_progress)
+        self.worker.search_failed.connect(self._on_search_failed)
+        self.worker.finished.connect(self._on_search_finished)
+        self.find_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("正在查找…")
+        self.worker.start()
+
+    def stop_search(self):
+        if not self.worker:
+            return
+        worker = self.worker
+        self.worker = None
+        worker.cancel()
+        worker.wait()
+        worker.deleteLater()
+        self.find_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+
+    def _on_file_matched(self, path, matches):
+        if self.sender() is not self.worker or self.result_count >= MAX_RESULTS:
+            return
+        matches = matches[:MAX_RESULTS - self.result_count]
+        self.result_count += len(matches)
+        directory = self.directory_input.text()
+        name = os.path.relpath(path, directory)
+        items = []
+        for line, column, length, preview in matches:
+            item = QTreeWidgetItem([name, str(line + 1), str(column + 1), preview])
+            item.setData(0, Qt.UserRole, (path, line, column, length))
+            items.append(item)
+        self.result_tree.addTopLevelItems(items)
+
+    def _on_progress(self, done, total, done_bytes, elapsed):
+        if self.sender() is not self.worker:
+            return
+        speed = done_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+        limit = f"（只显示前 {MAX_RESULTS} 条）" if self.result_count >= MAX_RESULTS else ""
+        self.status_label.setText(
+            f"已搜索 {done}/{total} 个文件，找到 {self.result_count} 处{limit}，{speed:.1f} MB/s")
+
+    def _on_search_failed(self, message):
+        if self.sender() is self.worker:
+            self.status_label.setText(f"查找失败: {message}")
+
+    def _on_search_finished(self):
+        worker = self.sender()
+        if worker is not self.worker:
+            return
+        self.worker = None
+        worker.deleteLater()
+        self.find_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+
+    def _on_item_clicked(self, item, _column=0):
+        path, line, column, length = item.data(0, Qt.UserRole)
+        self.result_activated.emit(path, line, column, length)
+
+    def closeEvent(self, event):
+        self.stop_search()
+        super(FindInFilesDialog, self).closeEvent(event)
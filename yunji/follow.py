@@ -0,0 +1,82 @@
+# follow
+import os
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from yunji.loader import make_decoder
+
+# 检查文件变化的间隔（毫秒），同一间隔内追加的内容合并为一批写入文档
+FOLLOW_INTERVAL = 250
+# 每次检查最多读取的字节数，文件增长过快时剩余部分留到下一次，保持界面响应
+FOLLOW_READ_LIMIT = 4 * 1024 * 1024
+
+
+class FileFollower(QObject):
+    # 类似 tail -F：从上次读取的位置开始只读取新追加的字节，并处理截断和轮转（文件被替换）
+    appended = pyqtSignal(str)
+    truncated = pyqtSignal()
+    rotated = pyqtSignal()
+    follow_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, encoding, offset, parent=None):
+        super(FileFollower, self).__init__(parent)
+        self.file_path = file_path
+        self.encoding = encoding
+        self.offset = offset  # 已经读入文档的字节数
+        self.file = None
+        self.decoder = make_decoder(encoding)
+        self.timer = QTimer(self)
+        self.timer.setInterval(FOLLOW_INTERVAL)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.file = open(self.file_path, 'rb')
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    def poll(self):
+        try:
+            self._poll()
+        except Exception as exc:
+            self.stop()
+            self.follow_failed.emit(str(exc))
+
+    def _poll(self):
+        try:
+            path_stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            # 轮转过程中文件可能暂时不存在，继续读取旧文件剩余的内容
+            path_stat = None
+        file_stat = os.fstat(self.file.fileno())
+        if path_stat and (path_stat.st_ino, path_stat.st_dev) != (file_stat.st_ino, file_stat.st_dev):
+            # 文件被替换：先读完旧文件剩余的内容，再从头读取新文件
+            self._read_new_bytes(file_stat.st_size, final=True)
+            self.file.close()
+            self.file = open(self.file_path, 'rb')
+            self.offset = 0
+            self.decoder = make_decoder(self.encoding)
+            self.rotated.emit()
+            file_stat = os.fstat(self.file.fileno())
+        if file_stat.st_size < self.offset:
+            # 文件被截断，从头开始读取
+            self.offset = 0
+            self.decoder = make_decoder(self.encoding)
+            self.truncated.emit()
+        self._read_new_bytes(file_stat.st_size)
+
+    def _read_new_bytes(self, size, final=False):
+        # final 时读完全部剩余内容（旧文件不会再增长），否则单次最多读取 FOLLOW_READ_LIMIT
+        self.file.seek(self.offset)
+        limit = -1 if final else min(max(size - self.offset, 0), FOLLOW_READ_LIMIT)
+        data = self.file.read(limit) if limit else b''
+        self.offset += len(data)
+        # 增量解码器会保留被截断的多字节字符和 \r，等下一次读取时再输出
+        text = self.decoder.decode(data, final=final)
+        if text:
+            self.appended.emit(text)
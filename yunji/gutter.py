@@ -0,0 +1,111 @@
+# gutter
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QStaticText, QTextBlockUserData, QTransform
+
+# 行号左侧标记栏的宽度（像素）
+MARKER_WIDTH = 6
+# 最多缓存多少个排好版的行号，超过后清空重来
+NUMBER_CACHE_SIZE = 4096
+# 标记类型及颜色：书签画成圆点，差异标记画成竖条
+MARKER_COLORS = {
+    'bookmark': QColor(59, 130, 246),
+    'added': QColor(34, 197, 94),
+    'modified': QColor(245, 158, 11),
+    'removed': QColor(239, 68, 68),
+}
+
+
+class BlockMarks(QTextBlockUserData):
+    # 保存在段落上的标记，随编辑移动，段落被删除时一起删除
+    def __init__(self):
+        super(BlockMarks, self).__init__()
+        self.kinds = set()
+
+
+def block_marks(block):
+    data = block.userData()
+    return data.kinds if isinstance(data, BlockMarks) else ()
+
+
+def set_block_mark(block, kind, on=True):
+    data = block.userData()
+    if not isinstance(data, BlockMarks):
+        if not on:
+            return
+        data = BlockMarks()
+        block.setUserData(data)
+    if on:
+        data.kinds.add(kind)
+    else:
+        data.kinds.discard(kind)
+
+
+class GutterRenderer:
+    # 行号栏的绘制：字体和度量只在字号变化时重新生成，行号排版一次（QStaticText）后反复使用
+    def __init__(self):
+        self.point_size = None
+        self.font = None
+        self.digit_width = 0
+        self.line_height = 0
+        self.numbers = {}  # 行号 -> (QStaticText, 文字宽度)
+        self.widths = {}  # 位数 -> 宽度
+
+    def set_point_size(self, point_size):
+        if point_size == self.point_size:
+            return
+        self.point_size = point_size
+        self.font = QFont("Consolas")
+        self.font.setPointSize(point_size)
+        metrics = QFontMetrics(self.font)
+        self.line_height = metrics.height()
+        self.digit_width = max(metrics.horizontalAdvance(str(digit)) for digit in range(10))
+        self.numbers = {}
+        self.widths = {}
+
+    def number_text(self, number):
+        entry = self.numbers.get(number)
+        if entry is None:
+            if len(self.numbers) >= NUMBER_CACHE_SIZE:
+                self.numbers = {}
+            text = QStaticText(str(number))
+            text.setTextFormat(Qt.PlainText)
+            text.prepare(QTransform(), self.font)
+            entry = self.numbers[number] = (text, text.size().width())
+        return entry
+
+    def width(self, line_count):
+        digits = len(str(line_count))
+        width = self.widths.get(digits)
+        if width is None:
+            width = self.widths[digits] = 3 + MARKER_WIDTH + self.digit_width * digits
+        return width
+
+    def paint(self, painter, rect, width, color, lines):
+        # lines 是可见行的 (顶部坐标, 行号, 标记)；只绘制与 rect 相交的部分
+        painter.fillRect(rect, QColor(Qt.gray))
+        painter.setFont(self.font)
+        painter.setPen(color)
+        height = self.line_height
+        number_text = self.number_text
+        rect_top = rect.top()
+        rect_bottom = rect.bottom()
+        for top, number, marks in lines:
+            if top + height < rect_top or top > rect_bottom:
+                continue
+            text, text_width = number_text(number)
+            painter.drawStaticText(QPointF(width - text_width, top), text)
+            if marks:
+                self._paint_marks(painter, top, height, marks)
+
+    def _paint_marks(self, painter, top, height, marks):
+        painter.save()
+        painter.setPen(Qt.NoPen)
+        for kind in ('added', 'modified', 'removed'):
+            if kind in marks:
+                painter.fillRect(0, top, 2, height, MARKER_COLORS[kind])
+        if 'bookmark' in marks:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setBrush(MARKER_COLORS['bookmark'])
+            size = min(MARKER_WIDTH - 1, height)
+            painter.drawEllipse(QRectF(1, top + (height - size) / 2, size, size))
+        painter.restore()
@@ -0,0 +1,120 @@
+# instance
+# 单实例：第一个启动的进程在本地套接字上监听，之后启动的 yunji 把要打开的文件转发给它后立即退出
+# 这个模块只导入 QtCore 和 QtNetwork，转发时不创建 QApplication，也不加载编辑器界面
+import getpass
+import json
+import os
+import re
+import sys
+from PyQt5.QtCore import QObject, QStandardPaths, pyqtSignal
+from PyQt5.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+# 等待连接和写入的时间（毫秒）；没有正在运行的实例时连接会立即失败
+CONNECT_TIMEOUT = 500
+
+
+def server_name():
+    # 每个用户一个实例：其他系统上把套接字放在只有当前用户能访问的运行时目录中，而不是共享的临时目录；
+    # Windows 的命名管道是全局的，名称中需要包含用户名，访问权限由 UserAccessOption 限制
+    if os.name != 'nt':
+        runtime_dir = QStandardPaths.writableLocation(QStandardPaths.RuntimeLocation)
+        if runtime_dir:
+            return os.path.join(runtime_dir, 'yunji.sock')
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = ''
+    return 'yunji-' + re.sub(r'[^0-9A-Za-z_.-]', '_', user)
+
+
+def send_to_running_instance(file_paths, name=None):
+    # 把文件的绝对路径发给正在运行的实例，成功返回 True；没有实例或发送失败时返回 False，由调用者正常启动
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+    message = json.dumps({'files': [os.path.abspath(path) for path in file_paths]}) + '\n'
+    socket.write(message.encode('utf-8'))
+    sent = socket.waitForBytesWritten(CONNECT_TIMEOUT) or not socket.bytesToWrite()
+    socket.disconnectFromServer()
+    return sent
+
+
+class InstanceServer(QObject):
+    # 接收之后启动的进程转发来的文件，每个连接发送一行 JSON
+    files_received = pyqtSignal(list)
+
+    def __init__(self, parent=None, name=None):
+        super(InstanceServer, self).__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)  # 其他用户不能连接
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}
+
+    def listen(self):
+        # 设置了访问选项时 Qt 会直接替换已有的套接字文件，需要先确认没有实例在监听
+        if self.is_running():
+            return False
+        if self.server.listen(self.name):
+            return True
+        # 上次异常退出留下的套接字文件：确认没有实例在监听后删除再重试
+        if self.server.serverError() == QAbstractSocket.AddressInUseError and not self.is_running():
+            QLocalServer.removeServer(self.name)
+            return self.server.listen(self.name)
+        return False
+
+    def is_running(self):
+        socket = QLocalSocket()
+        socket.connectToServer(self.name)
+        running = socket.waitForConnected(CONNECT_TIMEOUT)
+        socket.abort()
+        return running
+
+    def close(self):
+        self.server.close()
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b''
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.on_disconnected(socket))
+            if socket.bytesAvailable():
+                self.on_ready_read(socket)
+
+    def on_ready_read(self, socket):
+        if socket not in self.buffers:
+            return
+        self.buffers[socket] += bytes(socket.readAll())
+        if b'\n' not in self.buffers[socket]:
+            return
+        line = self.buffers.pop(socket).split(b'\n', 1)[0]
+        socket.disconnectFromServer()
+        try:
+            files = json.loads(line.decode('utf-8'))['files']
+        except Exception as exc:
+            print(f'无法解析其他实例发来的消息: {exc}')
+            return
+        self.files_received.emit([path for path in files if isinstance(path, str)])
+
+    def on_disconnected(self, socket):
+        self.on_ready_read(socket)
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+
+def main():
+    # 命令行入口：先尝试转发给正在运行的实例，失败时才导入编辑器正常启动
+    file_paths = sys.argv[1:2]
+    if send_to_running_instance(file_paths):
+        return
+    from yunji.editor import open_with_yunji
+    open_with_yunji(file_paths[0] if file_paths else None)
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    # 打包后的程序中正则匹配子进程需要由此启动
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,217 @@
+# journal
+import itertools
+import json
+import os
+import queue
+from PyQt5.QtCore import QObject, QThread, QTimer
+from yunji.loader import make_decoder
+from yunji.saver import discard_temp_file
+
+# 恢复日志所在目录
+JOURNAL_DIR = os.path.join(os.path.expanduser('~'), '.yunji', 'journal')
+# 积攒的修改每隔多久（毫秒）交给后台线程写入并 fsync
+JOURNAL_FLUSH_INTERVAL = 1000
+# 日志超过该大小且大于文档本身时压缩为一份快照
+JOURNAL_COMPACT_SIZE = 8 * 1024 * 1024
+
+_journal_ids = itertools.count(1)
+
+
+def _encode(record):
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def find_orphaned_journals(directory=None):
+    # 返回创建它们的进程已经不存在（未正常关闭）的日志文件
+    directory = directory or JOURNAL_DIR
+    if not os.path.isdir(directory):
+        return []
+    journals = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.journal'):
+            continue
+        try:
+            pid = int(name.split('-', 1)[0])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _process_alive(pid):
+            journals.append(os.path.join(directory, name))
+    return journals
+
+
+def read_journal(journal_path):
+    # 返回 (头部信息, 快照文本或 None, 修改列表)；忽略崩溃时写了一半的最后一行
+    header = {}
+    snapshot = None
+    deltas = []
+    with open(journal_path, 'rb') as file:
+        for line in file:
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                break
+            if isinstance(record, dict):
+                if 'snapshot' in record:
+                    snapshot = record['snapshot']
+                    deltas = []
+                else:
+                    header = record
+            else:
+                deltas.append(record)
+    return header, snapshot, deltas
+
+
+def base_changed(header):
+    # 日志记录的原文件在之后是否被修改过，若是则按日志恢复的结果可能不准确
+    path = header.get('path')
+    if not path or header.get('mtime') is None:
+        return False
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return True
+    return (stat_result.st_size, stat_result.st_mtime_ns) != (header.get('file_size'), header.get('mtime'))
+
+
+def read_base_text(header):
+    # 读取日志开始时文档对应的原文件内容（前 size 个字节）
+    path = header.get('path')
+    if not path or not header.get('size'):
+        return ''
+    with open(path, 'rb') as file:
+        data = file.read(header['size'])
+    return make_decoder(header.get('encoding') or 'utf-8').decode(data, final=True)
+
+
+class JournalWriter(QThread):
+    # 后台线程：把积攒的记录追加到日志并 fsync；快照写入临时文件后原子替换日志
+    def __init__(self, journal_path, parent=None):
+        super(JournalWriter, self).__init__(parent)
+        self.journal_path = journal_path
+        self.requests = queue.Queue()
+
+    def run(self):
+        # 第一条请求总是写入头部的 replace，之后日志文件保持以追加方式打开
+        file = None
+        try:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            request = self.requests.get()
+            while request[0] != 'stop':
+                kind, data = request
+                request = None
+                if kind == 'replace':
+                    if file:
+                        file.close()
+                    self._replace(data)
+                    file = open(self.journal_path, 'ab')
+                else:
+                    # 合并已经排队的追加请求，只 fsync 一次
+                    chunks = [data]
+                    while request is None:
+                        try:
+                            queued = self.requests.get_nowait()
+                        except queue.Empty:
+                            break
+                        if queued[0] == 'append':
+                            chunks.append(queued[1])
+                        else:
+                            request = queued
+                    file.write(b''.join(chunks))
+                    file.flush()
+                    os.fsync(file.fileno())
+                if request is None:
+                    request = self.requests.get()
+        except Exception as exc:
+            print(f"写入恢复日志失败: {exc}")
+        finally:
+            if file:
+                file.close()
+
+    def _replace(self, data):
+        temp_path = self.journal_path + '.tmp'
+        with open(temp_path, 'wb') as temp:
+            temp.write(data)
+            temp.flush()
+            os.fsync(temp.fileno())
+        os.replace(temp_path, self.journal_path)
+
+
+class RecoveryJournal(QObject):
+    # 记录文档的修改 (位置, 删除的字符数, 插入的文本)，开销只与输入量有关，与文档大小无关
+    # 在第一次修改时创建，界面线程中不访问文件系统；file_stat 为打开或保存时读取的原文件状态
+    def __init__(self, file_path, encoding, size, line_ending=None, file_stat=None, directory=None, parent=None):
+        super(RecoveryJournal, self).__init__(parent)
+        directory = directory or JOURNAL_DIR
+        self.journal_path = os.path.join(directory, f'{os.getpid()}-{next(_journal_ids)}.journal')
+        self.header = {'path': file_path, 'encoding': encoding, 'size': size, 'line_ending': line_ending}
+        if file_path and file_stat:
+            self.header.update(file_size=file_stat.st_size, mtime=file_stat.st_mtime_ns)
+        self.pending = []  # 尚未交给后台线程的修改
+        self.written = 0  # 上次快照之后写入的字节数
+        self.writer = JournalWriter(self.journal_path, self)
+        self.writer.requests.put(('replace', _encode(self.header)))
+        self.writer.start()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(JOURNAL_FLUSH_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+
+    def record(self, position, removed, inserted):
+        if self.pending:
+            last = self.pending[-1]
+            if last[1] == 0 and removed == 0 and position == last[0] + len(last[2]):
+                # 连续输入合并为一条记录
+                last[2] += inserted
+                return
+        self.pending.append([position, removed, inserted])
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = b''.join(_encode(record) for record in self.pending)
+        self.pending = []
+        self.written += len(data)
+        self.writer.requests.put(('append', data))
+
+    def needs_compaction(self, document_chars):
+        return self.written > JOURNAL_COMPACT_SIZE and self.written > document_chars
+
+    def compact(self, text):
+        # 用当前文档内容作为快照替换之前的所有记录
+        self.pending = []
+        self.written = 0
+        self.writer.requests.put(('replace', _encode(self.header) + _encode({'snapshot': text})))
+
+    def close(self, discard=True):
+        # 文档已保存或放弃修改时删除日志；discard 为 False 时写入剩余记录并保留日志，供下次启动时恢复
+        self.timer.stop()
+        if discard:
+            self.pending = []
+        else:
+            self.flush()
+        self.writer.requests.put(('stop', None))
+        self.writer.wait()
+        if discard:
+            discard_temp_file(self.journal_path)
@@ -0,0 +1,644 @@
+# largefile
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication
+from PyQt5.QtGui import QColor, QFont, QKeySequence, QPainter
+from PyQt5.QtCore import Qt, QEvent, QRect, QThread, pyqtSignal
+from yunji.piece_table import PieceTable, replace_all
+from yunji.saver import StreamWriter, replace_file
+from yunji.gutter import GutterRenderer
+
+# 超过该大小的文件默认以只读的大文件模式打开
+LARGE_FILE_THRESHOLD = 256 * 1024 * 1024
+# 行索引的粒度：每个块只记录块起点之前的换行符数量，内存占用约为 文件大小 / 8192
+INDEX_BLOCK_SIZE = 64 * 1024
+# 建立索引时每次扫描的字节数
+INDEX_SCAN_SIZE = INDEX_BLOCK_SIZE * 64
+# 单行最多显示的字节数，超长的行会被截断显示
+MAX_LINE_BYTES = 16 * 1024
+# 查找时每次扫描的字节数
+FIND_WINDOW_SIZE = 16 * 1024 * 1024
+
+_WORD_BYTES = b'0-9A-Za-z\\x80-\\xff'
+
+
+def supports_large_file_mode(encoding):
+    # 行索引按字节中的 \n 划分，只适用于与 ASCII 兼容的编码
+    return not encoding.lower().replace('_', '-').startswith(('utf-16', 'utf-32'))
+
+
+def build_byte_pattern(find_str, encoding, case_sensitive, whole_words):
+    parts = []
+    for char in find_str:
+        variants = {char} if case_sensitive else {char, char.lower(), char.upper()}
+        encoded = sorted({variant.encode(encoding, errors='replace') for variant in variants if len(variant) == 1})
+        if len(encoded) == 1:
+            parts.append(re.escape(encoded[0]))
+        else:
+            parts.append(b'(?:' + b'|'.join(re.escape(item) for item in encoded) + b')')
+    pattern = b''.join(parts)
+    if whole_words:
+        pattern = b'(?<![' + _WORD_BYTES + b'])' + pattern + b'(?![' + _WORD_BYTES + b'])'
+    return re.compile(pattern)
+
+
+class MappedFile:
+    def __init__(self, file_path, encoding):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.file = open(file_path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        # newline_counts[j] 为偏移 j * INDEX_BLOCK_SIZE 之前的换行符数量
+        self.newline_counts = array('Q', [0])
+        self.index_complete = False
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def reopen(self):
+        # 文件内容没有变化时重新映射，沿用已经建立的行索引
+        self.file = open(self.file_path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def indexed_bytes(self):
+        return min((len(self.newline_counts) - 1) * INDEX_BLOCK_SIZE, self.size)
+
+    def build_index(self, should_stop=None, progress=None):
+        position = self.indexed_bytes()
+        while position < self.size:
+            if should_stop and should_stop():
+                return False
+            data = self.mm[position:position + INDEX_SCAN_SIZE]
+            total = self.newline_counts[-1]
+            counts = array('Q')
+            for start in range(0, len(data), INDEX_BLOCK_SIZE):
+                total += data.count(b'\n', start, start + INDEX_BLOCK_SIZE)
+                counts.append(total)
+            self.newline_counts.extend(counts)
+            position += len(data)
+            if progress:
+                progress(position, self.size)
+        self.index_complete = True
+        return True
+
+    def line_count(self):
+        return self.newline_counts[-1] + 1
+
+    def line_offset(self, line):
+        if line <= 0:
+            return 0
+        block = bisect_left(self.newline_counts, line) - 1
+        position = block * INDEX_BLOCK_SIZE
+        for _ in range(line - self.newline_counts[block]):
+            position = self.mm.find(b'\n', position) + 1
+        return position
+
+    def line_of_offset(self, offset):
+        block = min(offset // INDEX_BLOCK_SIZE, len(self.newline_counts) - 1)
+        line = self.newline_counts[block]
+        # 索引尚未覆盖到的部分分段计数，避免一次复制过多数据
+        for start in range(block * INDEX_BLOCK_SIZE, offset, INDEX_SCAN_SIZE):
+            line += self.mm[start:min(start + INDEX_SCAN_SIZE, offset)].count(b'\n')
+        return line
+
+    def line_bytes(self, start, max_bytes=MAX_LINE_BYTES):
+        # 返回 (行内容, 下一行起点)；下一行起点为 None 表示已经到达文件末尾
+        end = self.mm.find(b'\n', start, start + max_bytes)
+        if end >= 0:
+            return self.mm[start:end].rstrip(b'\r'), end + 1
+        newline = self.mm.find(b'\n', start + max_bytes)
+        data = self.mm[start:min(start + max_bytes, self.size)]
+        return data, (newline + 1 if newline >= 0 else None)
+
+    def read(self, offset, length):
+        return self.mm[offset:offset + length]
+
+    def decode(self, data):
+        return data.decode(self.encoding, errors='replace')
+
+    def find(self, pattern, start, backward=False):
+        # 返回匹配的 (起始偏移, 结束偏移)，未找到时返回 None
+        overlap = max(len(pattern.pattern) * 4, 256)
+        if not backward:
+            position = start
+            while position < self.size:
+                end = min(position + FIND_WINDOW_SIZE, self.size)
+                match = pattern.search(self.mm, position, end)
+                if match:
+                    return match.span()
+                if end >= self.size:
+                    break
+                position = end - overlap
+            return None
+        end = start
+        while end > 0:
+            position = max(0, end - FIND_WINDOW_SIZE)
+            last = None
+            for match in pattern.finditer(self.mm, position, min(end + overlap, self.size)):
+                if match.end() <= end:
+                    last = match
+            if last:
+                return last.span()
+            end = position
+        return None
+
+
+class LineIndexer(QThread):
+    progress = pyqtSignal(int, int)  # 已建立索引的字节数, 文件总字节数
+    indexed = pyqtSignal()
+
+    def __init__(self, mapped_file, parent=None):
+        super(LineIndexer, self).__init__(parent)
+        self.mapped_file = mapped_file
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            if self.mapped_file.build_index(self._cancelled.is_set, self.progress.emit):
+                self.indexed.emit()
+        except Exception as exc:
+            print(f"建立行索引失败: {exc}")
+
+
+class LargeFileView(QAbstractScrollArea):
+    edited = pyqtSignal()
+    saved = pyqtSignal()
+    save_failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super(LargeFileView, self).__init__(parent)
+        # 延迟导入，避免与 editor 模块循环引用
+        from yunji.editor import LineNumberArea
+        self.parent = parent
+        self.mapped_file = None
+        self.table = None  # 可编辑模式下的片段表，行索引建立完成后创建
+        self.source = None  # 当前用于显示的数据来源：片段表或内存映射文件
+        self.editable = False
+        self.saving = False
+        self.writer = None
+        self.newline = b'\n'
+        self.indexer = None
+        self.cursor_line = 0
+        self.cursor_column = 0
+        self.match = None  # 当前查找结果的 (起始偏移, 结束偏移)
+        self.restore_position = None
+        self.max_line_width = 0
+        self.line_numbers_visible = False
+        self.lineNumberColor = QColor(Qt.cyan)
+        self.lineNumberArea = LineNumberArea(self)
+        self.gutter = GutterRenderer()
+        self.setFont(QFont("Consolas", 14))
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def open(self, file_path, encoding, editable=False):
+        self.close_file()
+        self.mapped_file = MappedFile(file_path, encoding)
+        self.source = self.mapped_file
+        self.editable = editable
+        first_newline = self.mapped_file.mm.find(b'\n')
+        self.newline = b'\r\n' if first_newline > 0 and self.mapped_file.mm[first_newline - 1] == 13 else b'\n'
+        self.cursor_line = 0
+        self.cursor_column = 0
+        self.match = None
+        self.max_line_width = 0
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self._start_indexer()
+        self._update_scroll_range()
+        self.update_cursor_position()
+
+    def _start_indexer(self):
+        self.indexer = LineIndexer(self.mapped_file, self)
+        self.indexer.progress.connect(self._on_index_progress)
+        self.indexer.indexed.connect(self._on_indexed)
+        self.indexer.finished.connect(self._on_indexer_finished)
+        self.indexer.start()
+
+    def close_file(self):
+        if self.writer:
+            self.writer.wait()
+            self.writer = None
+        if self.indexer:
+            self.indexer.cancel()
+            self.indexer.wait()
+            self.indexer = None
+        self.table = None
+        self.source = None
+        self.saving = False
+        self.restore_position = None
+        if self.mapped_file:
+            self.mapped_file.close()
+            self.mapped_file = None
+        self.viewport().update()
+
+    def _on_indexer_finished(self):
+        indexer = self.sender()
+        if indexer is self.indexer:
+            self.indexer = None
+        indexer.deleteLater()
+
+    def _on_indexed(self):
+        # 片段表依赖完整的行索引来统计各片段的换行数，因此索引完成后才允许编辑
+        if self.editable and self.mapped_file and self.table is None:
+            self.table = PieceTable(self.mapped_file)
+            self.source = self.table
+        self._on_index_progress()
+        if self.restore_position:
+            line, column, scroll = self.restore_position
+            self.restore_position = None
+            self.verticalScrollBar().setValue(scroll)
+            self.set_cursor(line, column)
+
+    def index_complete(self):
+        return bool(self.mapped_file and self.mapped_file.index_complete)
+
+    def can_edit(self):
+        return self.table is not None and not self.saving
+
+    def is_modified(self):
+        return bool(self.table and self.table.is_modified())
+
+    def line_count(self):
+        return self.source.line_count() if self.source else 1
+
+    def decode(self, data):
+        return data.decode(self.mapped_file.encoding, errors='replace')
+
+    def line_height(self):
+        return self.fontMetrics().height()
+
+    def visible_line_count(self):
+        return max(1, self.viewport().height() // self.line_height())
+
+    def first_visible_line(self):
+        return self.verticalScrollBar().value()
+
+    def _on_index_progress(self, *args):
+        self._update_scroll_range()
+        self.updateLineNumberAreaWidth(0)
+        self.viewport().update()
+
+    def _on_scrolled(self, _):
+        self.viewport().update()
+        self.lineNumberArea.update()
+
+    def _update_scroll_range(self):
+        self.verticalScrollBar().setRange(0, max(0, self.line_count() - self.visible_line_count()))
+        self.verticalScrollBar().setPageStep(self.visible_line_count())
+        self.horizontalScrollBar().setRange(0, max(0, self.max_line_width - self.viewport().width()))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+
+    def visible_lines(self):
+        # 依次返回可见区域内每一行的 (行号, 起始偏移, 文本)
+        if not self.source:
+            return
+        line = self.first_visible_line()
+        offset = self.source.line_offset(line)
+        for _ in range(self.visible_line_count() + 1):
+            if line >= self.line_count():
+                break
+            data, next_offset = self.source.line_bytes(offset, MAX_LINE_BYTES)
+            yield line, offset, self.decode(data)
+            if next_offset is None:
+                break
+            line += 1
+            offset = next_offset
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(event.rect(), self.palette().base())
+        if not self.source:
+            return
+        painter.setFont(self.font())
+        metrics = self.fontMetrics()
+        height = self.line_height()
+        x_offset = -self.horizontalScrollBar().value() + 4
+        first = self.first_visible_line()
+        widest = self.max_line_width
+        match_line = self.source.line_of_offset(self.match[0]) if self.match else -1
+        for line, offset, text in self.visible_lines():
+            top = (line - first) * height
+            if line == match_line:
+                self._paint_match(painter, offset, text, top, x_offset, metrics)
+            display = text.replace('\t', '    ')
+            painter.setPen(self.palette().text().color())
+            painter.drawText(x_offset, top + metrics.ascent(), display)
+            if line == self.cursor_line and self.hasFocus():
+                x = x_offset + metrics.horizontalAdvance(text[:self.cursor_column].replace('\t', '    '))
+                painter.fillRect(QRect(x, top, 2, height), self.palette().text())
+            widest = max(widest, metrics.horizontalAdvance(display) + 8)
+        if widest != self.max_line_width:
+            self.max_line_width = widest
+            self._update_scroll_range()
+
+    def _paint_match(self, painter, offset, text, top, x_offset, metrics):
+        data = self.source.read(offset, max(0, self.match[1] - offset))
+        start = len(self.decode(data[:max(0, self.match[0] - offset)]))
+        end = len(self.decode(data))
+        left = x_offset + metrics.horizontalAdvance(text[:start].replace('\t', '    '))
+        width = max(2, metrics.horizontalAdvance(text[start:end].replace('\t', '    ')))
+        painter.fillRect(QRect(left, top, width, self.line_height()), QColor("#A4DDD3"))
+
+    def resizeEvent(self, event):
+        super(LargeFileView, self).resizeEvent(event)
+        cr = self.contentsRect()
+        self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
+        self._update_scroll_range()
+
+    def lineNumberAreaWidth(self):
+        if not self.line_numbers_visible:
+            return 0
+        self.gutter.set_point_size(self.font().pointSize())
+        return self.gutter.width(self.line_count())
+
+    def updateLineNumberAreaWidth(self, _):
+        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+        cr = self.contentsRect()
+        self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height()))
+        self.lineNumberArea.setVisible(self.line_numbers_visible)
+
+    def lineNumberAreaPaintEvent(self, event):
+        if not self.line_numbers_visible:
+            return
+        painter = QPainter(self.lineNumberArea)
+        self.gutter.set_point_size(self.font().pointSize())
+        height = self.line_height()
+        first = self.first_visible_line()
+        top = self.viewport().y() - self.contentsRect().top()
+        rows = min(self.visible_line_count() + 1, self.line_count() - first)
+        lines = [(top + row * height, first + row + 1, ()) for row in range(rows)]
+        self.gutter.paint(painter, event.rect(), self.lineNumberArea.width(), self.lineNumberColor, lines)
+
+    # ---- 光标 ----
+
+    def set_cursor(self, line, column):
+        self.cursor_line = min(max(line, 0), self.line_count() - 1)
+        self.cursor_column = max(column, 0)
+        self.ensure_cursor_visible()
+        self.update_cursor_position()
+        self.viewport().update()
+
+    def ensure_cursor_visible(self):
+        first = self.first_visible_line()
+        rows = self.visible_line_count()
+        if self.cursor_line < first:
+            self.verticalScrollBar().setValue(self.cursor_line)
+        elif self.cursor_line >= first + rows:
+            self.verticalScrollBar().setValue(self.cursor_line - rows + 1)
+
+    def update_cursor_position(self):
+        if self.parent:
+            self.parent.status_label_line.setText(f"行: {self.cursor_line + 1} ;  列: {self.cursor_column + 1}")
+
+    def current_line_text(self):
+        if not self.source:
+            return ''
+        data, _ = self.source.line_bytes(self.source.line_offset(self.cursor_line), MAX_LINE_BYTES)
+        return self.decode(data)
+
+    def cursor_offset(self):
+        text = self.current_line_text()
+        column = min(self.cursor_column, len(text))
+        prefix = text[:column].encode(self.mapped_file.encoding, errors='replace')
+        return self.source.line_offset(self.cursor_line) + len(prefix)
+
+    def set_cursor_offset(self, offset):
+        line = self.source.line_of_offset(offset)
+        start = self.source.line_offset(line)
+        self.set_cursor(line, len(self.decode(self.source.read(start, offset - start))))
+
+    def mousePressEvent(self, event):
+        if not self.source or event.button() != Qt.LeftButton:
+            return super(LargeFileView, self).mousePressEvent(event)
+        self.setFocus()
+        self.cursor_line = min(self.first_visible_line() + event.pos().y() // self.line_height(), self.line_count() - 1)
+        text = self.current_line_text()
+        x = event.pos().x() + self.horizontalScrollBar().value() - 4
+        metrics = self.fontMetrics()
+        # 二分查找宽度不超过 x 的最长前缀，很长的行也只需测量 log(n) 次
+        column, high = 0, len(text)
+        while column < high:
+            middle = (column + high + 1) // 2
+            if metrics.horizontalAdvance(text[:middle].replace('\t', '    ')) <= x:
+                column = middle
+            else:
+                high = middle - 1
+        self.set_cursor(self.cursor_line, column)
+
+    def keyPressEvent(self, event):
+        if not self.source:
+            return super(LargeFileView, self).keyPressEvent(event)
+        if self.can_edit() and self._edit_key(event):
+            return
+        key = event.key()
+        line, column = self.cursor_line, min(self.cursor_column, len(self.current_line_text()))
+        rows = self.visible_line_count()
+        if key == Qt.Key_Up:
+            line -= 1
+        elif key == Qt.Key_Down:
+            line += 1
+        elif key == Qt.Key_PageUp:
+            line -= rows
+        elif key == Qt.Key_PageDown:
+            line += rows
+        elif key == Qt.Key_Home:
+            if event.modifiers() & Qt.ControlModifier:
+                line = 0
+            column = 0
+        elif key == Qt.Key_End:
+            if event.modifiers() & Qt.ControlModifier:
+                line = self.line_count() - 1
+            column = len(self.current_line_text()) if line == self.cursor_line else 0
+        elif key == Qt.Key_Left:
+            column -= 1
+        elif key == Qt.Key_Right:
+            column += 1
+        elif event.matches(QKeySequence.Copy):
+            QApplication.clipboard().setText(self.current_line_text())
+            return
+        else:
+            return super(LargeFileView, self).keyPressEvent(event)
+        self.set_cursor(line, column)
+
+    def event(self, event):
+        # 复制和粘贴由本控件处理，不交给窗口中针对 QTextEdit 的菜单快捷键
+        if event.type() == QEvent.ShortcutOverride and (event.matches(QKeySequence.Copy) or event.matches(QKeySequence.Paste)):
+            event.accept()
+            return True
+        return super(LargeFileView, self).event(event)
+
+    def wheelEvent(self, event):
+        if QApplication.keyboardModifiers() & Qt.ControlModifier:
+            font = self.font()
+            font.setPointSize(min(max(font.pointSize() + (1 if event.angleDelta().y() > 0 else -1), 6), 60))
+            self.setFont(font)
+            self.updateLineNumberAreaWidth(0)
+            self._update_scroll_range()
+            event.accept()
+            return
+        super(LargeFileView, self).wheelEvent(event)
+
+    # ---- 编辑 ----
+
+    def _edit_key(self, event):
+        key = event.key()
+        text = self.current_line_text()
+        column = min(self.cursor_column, len(text))
+        offset = self.cursor_offset()
+        if key in (Qt.Key_Return, Qt.Key_Enter):
+            self.insert_text('\n')
+        elif key == Qt.Key_Backspace:
+            if column > 0:
+                width = len(text[column - 1].encode(self.mapped_file.encoding, errors='replace'))
+                self._apply(lambda: self.table.delete(offset - width, width, offset), offset - width)
+            elif self.cursor_line > 0:
+                width = 2 if offset >= 2 and self.table.read(offset - 2, 2) == b'\r\n' else 1
+                self._apply(lambda: self.table.delete(offset - width, width, offset), offset - width)
+        elif key == Qt.Key_Delete:
+            if column < len(text):
+                width = len(text[column].encode(self.mapped_file.encoding, errors='replace'))
+            else:
+                width = 2 if self.table.read(offset, 2) == b'\r\n' else 1
+            self._apply(lambda: self.table.delete(offset, width, offset), offset)
+        elif event.matches(QKeySequence.Paste):
+            self.insert_text(QApplication.clipboard().text())
+        elif event.text() and not event.modifiers() & (Qt.ControlModifier | Qt.AltModifier) \
+                and (event.text() == '\t' or event.text().isprintable()):
+            self.insert_text(event.text())
+        else:
+            return False
+        return True
+
+    def insert_text(self, text):
+        if not self.can_edit() or not text:
+            return
+        data = text.replace('\r\n', '\n').replace('\n', self.newline.decode('ascii'))
+        data = data.encode(self.mapped_file.encoding, errors='replace')
+        offset = self.cursor_offset()
+        self._apply(lambda: self.table.insert(offset, data, offset), offset + len(data))
+
+    def _apply(self, operation, cursor_offset):
+        operation()
+        self.match = None
+        self._after_edit(cursor_offset)
+
+    def _after_edit(self, cursor_offset):
+        self._update_scroll_range()
+        self.updateLineNumberAreaWidth(0)
+        self.set_cursor_offset(min(cursor_offset, self.table.size))
+        self.edited.emit()
+
+    def undo(self):
+        if self.can_edit():
+            cursor_offset = self.table.undo()
+            if cursor_offset is not None:
+                self.match = None
+                self._after_edit(cursor_offset)
+
+    def redo(self):
+        if self.can_edit():
+            cursor_offset = self.table.redo()
+            if cursor_offset is not None:
+                self.match = None
+                self._after_edit(cursor_offset)
+
+    # ---- 查找和替换 ----
+
+    def find(self, find_str, case_sensitive=False, whole_words=False, backward=False):
+        # 从光标（或上一个匹配）处开始查找，到达文件末尾后从另一端继续；返回是否找到
+        if not self.source or not find_str:
+            return False
+        pattern = build_byte_pattern(find_str, self.mapped_file.encoding, case_sensitive, whole_words)
+        if self.match:
+            start = self.match[0] if backward else self.match[1]
+        else:
+            start = self.cursor_offset()
+        span = self.source.find(pattern, start, backward)
+        if span is None:
+            span = self.source.find(pattern, self.source.size if backward else 0, backward)
+        if span is None:
+            return False
+        self.match = span
+        self.set_cursor_offset(span[0])
+        self.verticalScrollBar().setValue(max(0, self.cursor_line - self.visible_line_count() // 2))
+        return True
+
+    def replace_next(self, find_str, replace_str, case_sensitive=False, whole_words=False, backward=False):
+        # 替换当前匹配（若有）并查找下一个；返回是否找到匹配
+        if not self.can_edit():
+            return False
+        if self.match:
+            start, end = self.match
+            pattern = build_byte_pattern(find_str, self.mapped_file.encoding, case_sensitive, whole_words)
+            if pattern.fullmatch(self.table.read(start, end - start)):
+                data = replace_str.encode(self.mapped_file.encoding, errors='replace')
+                self._apply(lambda: self.table.replace(start, end - start, data, start), start + len(data))
+                if backward:
+                    self.set_cursor_offset(start)
+        return self.find(find_str, case_sensitive, whole_words, backward)
+
+    def replace_all(self, find_str, replace_str, case_sensitive=False, whole_words=False):
+        if not self.can_edit() or not find_str:
+            return 0
+        pattern = build_byte_pattern(find_str, self.mapped_file.encoding, case_sensitive, whole_words)
+        data = replace_str.encode(self.mapped_file.encoding, errors='replace')
+        offset = self.cursor_offset()
+        count = replace_all(self.table, pattern, data, offset)
+        if count:
+            self.match = None
+            self._after_edit(offset)
+        return count
+
+    # ---- 保存 ----
+
+    def save(self, file_path):
+        # 后台把各片段依次写入临时文件；完成后释放映射、替换原文件并重新映射
+        if not self.table or self.saving:
+            return False
+        self.saving = True
+        self.writer = StreamWriter(file_path, self.table.iter_chunks(tuple(self.table.pieces)), self)
+        self.writer.written.connect(self._on_written)
+        self.writer.write_failed.connect(self._on_write_failed)
+        self.writer.start()
+        return True
+
+    def _on_written(self, target, temp_path):
+        self.writer.wait()
+        self.writer.deleteLater()
+        self.writer = None
+        line, column, scroll = self.cursor_line, self.cursor_column, self.first_visible_line()
+        encoding = self.mapped_file.encoding
+        # 只释放映射（Windows 上映射中的文件不能被替换），片段表保留到替换成功之后
+        self.mapped_file.close()
+        try:
+            replace_file(temp_path, target)
+        except Exception as exc:
+            # 原文件没有被替换：重新映射后片段表中的修改仍然有效
+            self.mapped_file.reopen()
+            self.saving = False
+            self.viewport().update()
+            self.save_failed.emit(str(exc))
+            return
+        self.open(target, encoding, editable=True)
+        # 行索引重新建立完成后再恢复光标和滚动位置
+        self.restore_position = (line, column, scroll)
+        self.saved.emit()
+
+    def _on_write_failed(self, message):
+        self.writer.wait()
+        self.writer.deleteLater()
+        self.writer = None
+        self.saving = False
+        self.save_failed.emit(message)
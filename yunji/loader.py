@@ -0,0 +1,160 @@
+# loader
+import codecs
+import io
+import os
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from yunji.encoding import SAMPLE_HEAD_SIZE, detect_file_encoding
+from yunji.policy import LineStats
+
+# 超过该大小的文件在后台线程中分块加载，较小的文件仍然同步打开
+ASYNC_LOAD_THRESHOLD = 2 * 1024 * 1024
+# 每次从磁盘读取的字节数
+READ_CHUNK_SIZE = 512 * 1024
+# 同时在途（已发出但界面尚未写入文档）的批次数，避免事件队列堆积
+MAX_PENDING_BATCHES = 2
+# 换行符类型与实际写入的字符
+LINE_ENDINGS = {'LF': '\n', 'CRLF': '\r\n', 'CR': '\r'}
+
+
+class CheckedDecoder:
+    # 先严格解码，遇到非法字节时该块改用 fallback 重新解码，并记录解码有损（lossy）
+    def __init__(self, encoding, fallback):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+        self.fallback = fallback
+        self.lossy = False
+
+    def decode(self, data, final=False):
+        state = self.decoder.getstate()
+        try:
+            return self.decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self.lossy = True
+            self.decoder.setstate(state)
+            self.decoder.errors = self.fallback
+            try:
+                return self.decoder.decode(data, final)
+            finally:
+                self.decoder.errors = 'strict'
+
+    def getstate(self):
+        return self.decoder.getstate()
+
+    def setstate(self, state):
+        self.decoder.setstate(state)
+
+    def reset(self):
+        self.decoder.reset()
+
+
+class TextDecoder(io.IncrementalNewlineDecoder):
+    # 换行符统一转换为 \n，与文本模式 open() 保持一致；lossy 表示已解码的内容中有字节被替换或忽略，
+    # 这样的文档原样保存会改变这些字节
+    def __init__(self, encoding):
+        # UTF-8 抽样检测通过后，个别非法字节显示为替换字符；其他编码与原先一样忽略非法字节
+        fallback = 'replace' if codecs.lookup(encoding).name.startswith('utf-8') else 'ignore'
+        self.checked = CheckedDecoder(encoding, fallback)
+        super(TextDecoder, self).__init__(self.checked, translate=True)
+
+    @property
+    def lossy(self):
+        return self.checked.lossy
+
+
+def make_decoder(encoding):
+    return TextDecoder(encoding)
+
+
+def default_line_ending():
+    return 'CRLF' if os.name == 'nt' else 'LF'
+
+
+def detect_line_ending(decoder):
+    # IncrementalNewlineDecoder 解码时会记录遇到过的换行符，不需要再扫描一遍文本
+    # 返回 (换行符类型, 是否混合)；混合时优先保留 CRLF，没有换行时使用系统默认值
+    seen = decoder.newlines
+    if seen is None:
+        return default_line_ending(), False
+    if isinstance(seen, str):
+        return {'\n': 'LF', '\r\n': 'CRLF', '\r': 'CR'}[seen], False
+    return ('CRLF' if '\r\n' in seen else 'LF'), True
+
+
+def read_text_file(file_path):
+    # 同步读取整个小文件，返回 (文本, 编码, 置信度, (换行符类型, 是否混合), 解码是否有损, 读入的字节数)
+    with open(file_path, 'rb') as file:
+        stat_result = os.fstat(file.fileno())
+        raw_data = file.read()
+        encoding, confidence = detect_file_encoding(file_path, file, stat_result, raw_data)
+    decoder = make_decoder(encoding)
+    text = decoder.decode(raw_data, final=True)
+    return text, encoding, confidence, detect_line_ending(decoder), decoder.lossy, len(raw_data)
+
+
+class FileLoader(QThread):
+    progress = pyqtSignal(int, int)  # 已处理字节数, 文件总字节数
+    chunk_loaded = pyqtSignal(str)
+    loaded = pyqtSignal(str, float)  # 检测到的编码及置信度
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, parent=None, chunk_size=READ_CHUNK_SIZE):
+        super(FileLoader, self).__init__(parent)
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.encoding = None
+        self.confidence = 0.0
+        self.bytes_read = 0  # 已读入的字节数，跟踪模式从这里继续读取
+        self.line_ending = (default_line_ending(), False)
+        self.lossy = False  # 是否有字节无法按检测到的编码解码
+        self.line_stats = LineStats()  # 最长行的长度，加载完成后用于性能策略
+        self._cancelled = threading.Event()
+        self._slots = threading.Semaphore(MAX_PENDING_BATCHES)
+
+    def cancel(self):
+        self._cancelled.set()
+        self._slots.release()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def acknowledge(self):
+        # 界面线程写入一批内容后调用，允许工作线程继续发送下一批
+        self._slots.release()
+
+    def run(self):
+        try:
+            with open(self.file_path, 'rb') as file:
+                stat_result = os.fstat(file.fileno())
+                total = stat_result.st_size
+                # 开头的数据既用于编码检测，也是解码的第一块，文件只顺序读取一遍
+                raw = file.read(max(self.chunk_size, SAMPLE_HEAD_SIZE))
+                self.encoding, self.confidence = detect_file_encoding(self.file_path, file, stat_result, raw)
+                decoder = make_decoder(self.encoding)
+                done = 0
+                while not self.is_cancelled():
+                    final = not raw
+                    text = decoder.decode(raw, final=final)
+                    done += len(raw)
+                    self.bytes_read = done
+                    if text:
+                        self.line_stats.feed(text)
+                        if not self._wait_for_slot():
+                            return
+                        self.chunk_loaded.emit(text)
+                    self.progress.emit(done, total)
+                    if final:
+                        break
+                    raw = file.read(self.chunk_size)
+                self.line_ending = detect_line_ending(decoder)
+                self.lossy = decoder.lossy
+            if not self.is_cancelled():
+                self.loaded.emit(self.encoding, self.confidence)
+        except Exception as exc:
+            if not self.is_cancelled():
+                self.load_failed.emit(str(exc))
+
+    def _wait_for_slot(self):
+        while not self._slots.acquire(timeout=0.1):
+            if self.is_cancelled():
+                return False
+        return not self.is_cancelled()
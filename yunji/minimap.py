@@ -0,0 +1,252 @@
+# minimap
+import itertools
+import queue
+import re
+from PyQt5.QtCore import Qt, QRect, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QPainter
+from PyQt5.QtWidgets import QWidget
+
+# 缩略图的宽度（像素）
+MINIMAP_WIDTH = 100
+# 每行文本在缩略图中的高度、每个字符的宽度（像素）
+LINE_PIXELS = 2
+CHAR_PIXELS = 1
+# 每个图块覆盖的段落数
+TILE_BLOCKS = 128
+TILE_HEIGHT = TILE_BLOCKS * LINE_PIXELS
+# 最多缓存的图块数，超过后丢弃离可见区域最远的
+TILE_CACHE_SIZE = 64
+# 编辑之后最快多久重新生成一次过期的图块（毫秒）
+TILE_DELAY = 200
+
+_WORDS = re.compile(r'\S+')
+_minimap_ids = itertools.count(1)
+_renderer = None
+
+
+def render_tile(lines, color, width=MINIMAP_WIDTH):
+    # 把一组文本行画成图块：每段连续的非空白字符画成一条短横线；只使用 QImage，可以在后台线程中执行
+    image = QImage(width, TILE_HEIGHT, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    columns = width // CHAR_PIXELS
+    height = max(LINE_PIXELS - 1, 1)
+    for row, text in enumerate(lines):
+        if '\t' in text:
+            text = text[:columns].expandtabs(4)
+        top = row * LINE_PIXELS
+        for match in _WORDS.finditer(text, 0, columns):
+            start = match.start()
+            painter.fillRect(start * CHAR_PIXELS, top, (match.end() - start) * CHAR_PIXELS, height, color)
+    painter.end()
+    return image
+
+
+class TileRenderer(QThread):
+    # 后台线程：依次生成排队的图块，同一图块只生成最新的请求；队列为空时线程结束，有新请求时再启动
+    # tile_ready 的参数为 (缩略图编号, 图块序号, 版本, 图像)
+    tile_ready = pyqtSignal(int, int, int, QImage)
+
+    def __init__(self, parent=None):
+        super(TileRenderer, self).__init__(parent)
+        self.requests = queue.Queue()
+        self.finished.connect(self._on_finished)
+
+    def request(self, owner, key, generation, lines, color):
+        self.requests.put((owner, key, generation, lines, color))
+        if not self.isRunning():
+            self.start()
+
+    def _on_finished(self):
+        # 线程检查队列为空之后、结束之前放入的请求
+        if not self.requests.empty():
+            self.start()
+
+    def run(self):
+        while True:
+            pending = {}
+            try:
+                while True:
+                    owner, key, generation, lines, color = self.requests.get_nowait()
+                    pending[owner, key] = (generation, lines, color)
+            except queue.Empty:
+                pass
+            if not pending:
+                return
+            for (owner, key), (generation, lines, color) in pending.items():
+                try:
+                    self.tile_ready.emit(owner, key, generation, render_tile(lines, color))
+                except Exception as exc:
+                    print(f"生成缩略图失败: {exc}")
+
+
+def tile_renderer():
+    # 所有窗口的缩略图共用一个后台线程，不随窗口销毁
+    global _renderer
+    if _renderer is None:
+        _renderer = TileRenderer()
+    return _renderer
+
+
+class Minimap(QWidget):
+    # 文档缩略图：按固定段落数分成图块，图块在后台线程中生成并缓存。编辑只让涉及的图块过期（插入或删除行时
+    # 之后的图块整体移动，也一起过期），过期的图块在新图像生成之前继续显示旧图像；滚动时只重新拼接图块
+    def __init__(self, editor):
+        super(Minimap, self).__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.tiles = {}  # 图块序号 -> QImage
+        self.generations = {}  # 图块序号 -> 版本，每次过期加一；不在其中的图块版本为 0
+        self.stale = set()  # 已过期、正在显示旧图像的图块
+        self.requested = {}  # 已交给后台线程的图块 -> 版本
+        self.block_count = self.document.blockCount()
+        self.drag_offset = None  # 拖动时固定使用按下时的滚动位置，避免缩略图随滚动移动造成跳动
+        self.id = next(_minimap_ids)
+        self.renderer = tile_renderer()
+        self.renderer.tile_ready.connect(self._on_tile_ready)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(TILE_DELAY)
+        self.timer.timeout.connect(self.update)
+        self.document.contentsChange.connect(self._on_contents_change)
+        editor.updateRequest.connect(self._on_update_request)
+        self.setCursor(Qt.PointingHandCursor)
+
+    def stop(self):
+        # 关闭窗口时不再接收图块，已排队的请求由后台线程处理完后丢弃
+        self.timer.stop()
+        self.requested = {}
+        self.renderer.tile_ready.disconnect(self._on_tile_ready)
+
+    def set_document(self, document):
+        # 切换标签页时丢弃全部图块；换一个编号，旧文档尚未生成完的图块到达后被忽略
+        self.document.contentsChange.disconnect(self._on_contents_change)
+        self.document = document
+        self.document.contentsChange.connect(self._on_contents_change)
+        self.tiles = {}
+        self.generations = {}
+        self.stale = set()
+        self.requested = {}
+        self.block_count = document.blockCount()
+        self.id = next(_minimap_ids)
+        self.update()
+
+    def offset(self):
+        # 缩略图顶部在整个文档缩略图中的位置：文档比缩略图高时按滚动条的比例移动
+        total = self.document.blockCount() * LINE_PIXELS
+        height = self.height()
+        scroll_bar = self.editor.verticalScrollBar()
+        if total <= height or scroll_bar.maximum() <= 0:
+            return 0
+        return int((total - height) * scroll_bar.value() / scroll_bar.maximum())
+
+    def visible_tiles(self, offset):
+        last = min(offset + self.height(), self.document.blockCount() * LINE_PIXELS - 1)
+        return range(offset // TILE_HEIGHT, max(last, 0) // TILE_HEIGHT + 1)
+
+    def _on_update_request(self, rect, dy):
+        if dy or rect.contains(self.editor.viewport().rect()):
+            self.update()
+
+    def _on_contents_change(self, position, removed, added):
+        first = self.document.findBlock(position).blockNumber()
+        count = self.document.blockCount()
+        if count == self.block_count:
+            last = self.document.findBlock(position + added).blockNumber()
+            expired = range(first // TILE_BLOCKS, last // TILE_BLOCKS + 1)
+        else:
+            expired = [key for key in set(self.tiles) | set(self.requested) if key >= first // TILE_BLOCKS]
+            for key in [key for key in self.tiles if key * TILE_BLOCKS >= count]:
+                del self.tiles[key]
+        self.block_count = count
+        for key in expired:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            if key in self.tiles:
+                self.stale.add(key)
+        if self.stale and self.isVisible() and not self.timer.isActive():
+            self.timer.start()
+
+    def request_tiles(self, keys):
+        # 读取图块涉及的段落文本（界面线程中进行，只读可见的几个图块），交给后台线程绘制
+        color = QColor(self.editor.palette().text().color())
+        color.setAlpha(160)
+        for key in keys:
+            generation = self.generations.get(key, 0)
+            if self.requested.get(key) == generation:
+                continue
+            block = self.document.findBlockByNumber(key * TILE_BLOCKS)
+            lines = []
+            while block.isValid() and len(lines) < TILE_BLOCKS:
+                lines.append(block.text())
+                block = block.next()
+            self.requested[key] = generation
+            self.renderer.request(self.id, key, generation, lines, color)
+
+    def _on_tile_ready(self, owner, key, generation, image):
+        if owner != self.id:
+            return
+        if self.requested.get(key) == generation:
+            del self.requested[key]
+        if key * TILE_BLOCKS >= self.document.blockCount():
+            return
+        self.tiles[key] = image
+        if generation == self.generations.get(key, 0):
+            self.stale.discard(key)
+        else:
+            self.stale.add(key)
+        if len(self.tiles) > TILE_CACHE_SIZE:
+            center = self.offset() // TILE_HEIGHT
+            for far in sorted(self.tiles, key=lambda tile: abs(tile - center))[TILE_CACHE_SIZE:]:
+                del self.tiles[far]
+                self.stale.discard(far)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.editor.palette().base().color().darker(104))
+        offset = self.offset()
+        missing = []
+        for key in self.visible_tiles(offset):
+            image = self.tiles.get(key)
+            if image is None:
+                missing.append(key)
+            else:
+                painter.drawImage(0, key * TILE_HEIGHT - offset, image)
+        # 当前可见区域
+        first, last = self.visible_blocks()
+        painter.fillRect(QRect(0, first * LINE_PIXELS - offset, self.width(), (last - first + 1) * LINE_PIXELS),
+                         QColor(0, 0, 0, 32))
+        painter.end()
+        # 没有图像的图块立即生成；过期的图块在编辑暂停或间隔 TILE_DELAY 之后生成
+        if missing:
+            self.request_tiles(missing)
+        if not self.timer.isActive():
+            stale = [key for key in self.visible_tiles(offset) if key in self.stale]
+            if stale:
+                self.request_tiles(stale)
+
+    def visible_blocks(self):
+        editor = self.editor
+        first = editor.firstVisibleBlock().blockNumber()
+        last = editor.cursorForPosition(editor.viewport().rect().bottomLeft()).blockNumber()
+        return first, max(first, last)
+
+    def scroll_to(self, y, offset):
+        # 把缩略图中 y 处对应的段落滚动到编辑区中间
+        number = min(max((y + offset) // LINE_PIXELS, 0), self.document.blockCount() - 1)
+        block = self.document.findBlockByNumber(number)
+        line_spacing = max(self.editor.fontMetrics().lineSpacing(), 1)
+        lines = self.editor.viewport().height() // line_spacing
+        self.editor.verticalScrollBar().setValue(block.firstLineNumber() - lines // 2)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_offset = self.offset()
+            self.scroll_to(event.pos().y(), self.drag_offset)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_offset is not None:
+            self.scroll_to(event.pos().y(), self.drag_offset)
+
+    def mouseReleaseEvent(self, event):
+        self.drag_offset = None
@@ -0,0 +1,369 @@
+# piece_table
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+ORIGINAL = 0
+ADDED = 1
+# 输出或查找时每次读取的字节数
+READ_SLICE_SIZE = 1024 * 1024
+# 撤销历史最多保留的步数
+MAX_UNDO_STEPS = 1000
+# 查找时每次读取的字节数
+FIND_WINDOW_SIZE = 16 * 1024 * 1024
+
+
+class PieceTable:
+    # 片段表：原始文件（内存映射，只读）加上只追加的新增缓冲区，文档由若干 (来源, 起点, 长度, 换行数) 片段拼接而成
+    # 所有偏移量都以文件编码后的字节计；内存占用只与编辑量有关
+    def __init__(self, original):
+        self.original = original  # yunji.largefile.MappedFile，需要已建立完整的行索引
+        self.encoding = original.encoding
+        self.add_buffer = bytearray()
+        self.add_newlines = array('Q')  # 新增缓冲区中各个 \n 的位置
+        self.pieces = [(ORIGINAL, 0, original.size, original.line_count() - 1)] if original.size else []
+        self.saved_pieces = tuple(self.pieces)
+        self.undo_stack = []
+        self.redo_stack = []
+        self._last_edit = None  # 用于把连续输入合并为一个撤销步骤
+        self._batch_depth = 0
+        self._offsets = None
+        self._lines = None
+
+    @property
+    def size(self):
+        self._ensure_tables()
+        return self._offsets[-1]
+
+    def is_modified(self):
+        return tuple(self.pieces) != self.saved_pieces
+
+    def mark_saved(self):
+        self.saved_pieces = tuple(self.pieces)
+
+    # ---- 读取 ----
+
+    def _ensure_tables(self):
+        if self._offsets is not None:
+            return
+        # 每个片段自带换行数，前缀和可以直接累加，编辑后重建的开销很小
+        self._offsets = list(accumulate((piece[2] for piece in self.pieces), initial=0))
+        self._lines = list(accumulate((piece[3] for piece in self.pieces), initial=0))
+
+    def _invalidate(self):
+        self._offsets = None
+        self._lines = None
+
+    def _count_newlines(self, source, start, end):
+        # 统计来源缓冲区 [start, end) 内的换行数
+        if source == ADDED:
+            return bisect_left(self.add_newlines, end) - bisect_left(self.add_newlines, start)
+        if end - start <= READ_SLICE_SIZE:
+            # 较短的范围直接计数，开销与范围长度成正比，不必从索引块的开头数起
+            return self.original.mm[start:end].count(b'\n')
+        return self.original.line_of_offset(end) - self.original.line_of_offset(start)
+
+    def _piece_bytes(self, piece, start, end):
+        # 返回片段内 [start, end) 范围（相对片段起点）的字节
+        source, offset = piece[:2]
+        if source == ADDED:
+            return bytes(self.add_buffer[offset + start:offset + end])
+        return self.original.mm[offset + start:offset + end]
+
+    def _piece_index(self, offset):
+        self._ensure_tables()
+        return max(0, bisect_right(self._offsets, offset) - 1)
+
+    def read(self, offset, length):
+        self._ensure_tables()
+        parts = []
+        index = self._piece_index(offset)
+        end = min(offset + length, self.size)
+        while offset < end and index < len(self.pieces):
+            piece_start = self._offsets[index]
+            piece_end = self._offsets[index + 1]
+            stop = min(end, piece_end)
+            parts.append(self._piece_bytes(self.pieces[index], offset - piece_start, stop - piece_start))
+            offset = stop
+            index += 1
+        return b''.join(parts)
+
+    def iter_chunks(self, pieces=None):
+        # 按片段顺序输出整个文档的字节，用于流式保存
+        for piece in (self.pieces if pieces is None else pieces):
+            for start in range(0, piece[2], READ_SLICE_SIZE):
+                yield self._piece_bytes(piece, start, min(start + READ_SLICE_SIZE, piece[2]))
+
+    def find_byte(self, value, start):
+        # 返回 start 之后第一个 value 字节的位置，未找到返回 -1
+        self._ensure_tables()
+        index = self._piece_index(start)
+        while index < len(self.pieces):
+            source, offset, length, _ = self.pieces[index]
+            piece_start = self._offsets[index]
+            relative = max(0, start - piece_start)
+            buffer = self.add_buffer if source == ADDED else self.original.mm
+            found = buffer.find(value, offset + relative, offset + length)
+            if found >= 0:
+                return piece_start + found - offset
+            index += 1
+        return -1
+
+    def line_count(self):
+        self._ensure_tables()
+        return self._lines[-1] + 1
+
+    def line_offset(self, line):
+        if line <= 0:
+            return 0
+        self._ensure_tables()
+        if line > self._lines[-1]:
+            return self.size
+        # 第 line 个换行符所在的片段
+        index = bisect_left(self._lines, line) - 1
+        source, start = self.pieces[index][:2]
+        nth = line - self._lines[index]
+        if source == ADDED:
+            position = self.add_newlines[bisect_left(self.add_newlines, start) + nth - 1] + 1
+        else:
+            position = self.original.line_offset(self.original.line_of_offset(start) + nth)
+        return self._offsets[index] + position - start
+
+    def line_of_offset(self, offset):
+        self._ensure_tables()
+        offset = min(offset, self.size)
+        index = self._piece_index(offset)
+        if index >= len(self.pieces):
+            return self._lines[-1]
+        source, start = self.pieces[index][:2]
+        return self._lines[index] + self._count_newlines(source, start, start + offset - self._offsets[index])
+
+    def line_bytes(self, start, max_bytes):
+        # 返回 (行内容, 下一行起点)；下一行起点为 None 表示已经到达文档末尾
+        data = self.read(start, max_bytes)
+        end = data.find(b'\n')
+        if end >= 0:
+            return data[:end].rstrip(b'\r'), start + end + 1
+        newline = self.find_byte(b'\n', start + len(data))
+        return data, (newline + 1 if newline >= 0 else None)
+
+    def find(self, pattern, start, backward=False, window=FIND_WINDOW_SIZE):
+        # 返回匹配的 (起始偏移, 结束偏移)，未找到时返回 None
+        overlap = _window_overlap(pattern)
+        size = self.size
+        if not backward:
+            position = start
+            while position < size:
+                data = self.read(position, window)
+                match = pattern.search(data)
+                if match:
+                    return position + match.start(), position + match.end()
+                if position + len(data) >= size:
+                    break
+                position += len(data) - overlap
+            return None
+        end = start
+        while end > 0:
+            position = max(0, end - window)
+            data = self.read(position, end - position + overlap)
+            last = None
+            for match in pattern.finditer(data):
+                if position + match.end() <= end:
+                    last = match
+            if last:
+                return position + last.start(), position + last.end()
+            end = position
+        return None
+
+    # ---- 编辑 ----
+
+    def _slice(self, start, end):
+        # 返回覆盖 [start, end) 的片段列表，不修改片段表
+        self._ensure_tables()
+        pieces = []
+        index = self._piece_index(start)
+        while start < end and index < len(self.pieces):
+            piece = self.pieces[index]
+            source, offset, length = piece[:3]
+            head = start - self._offsets[index]
+            tail = min(end - self._offsets[index], length)
+            if head == 0 and tail == length:
+                pieces.append(piece)
+            else:
+                pieces.append((source, offset + head, tail - head,
+                               self._count_newlines(source, offset + head, offset + tail)))
+            start = self._offsets[index] + tail
+            index += 1
+        return pieces
+
+    def _append(self, data):
+        # 把 data 追加到新增缓冲区，返回 (起点, 换行数)
+        add_start = len(self.add_buffer)
+        self.add_buffer.extend(data)
+        newlines = 0
+        position = data.find(b'\n')
+        while position >= 0:
+            self.add_newlines.append(add_start + position)
+            newlines += 1
+            position = data.find(b'\n', position + 1)
+        return add_start, newlines
+
+    def _split(self, offset):
+        # 保证有一个片段恰好从 offset 开始，返回该片段的下标
+        index = self._piece_index(offset)
+        if index >= len(self.pieces) or self._offsets[index] == offset:
+            return index
+        source, start, length, newlines = self.pieces[index]
+        cut = offset - self._offsets[index]
+        head_newlines = self._count_newlines(source, start, start + cut)
+        self.pieces[index:index + 1] = [(source, start, cut, head_newlines),
+                                        (source, start + cut, length - cut, newlines - head_newlines)]
+        self._invalidate()
+        return index + 1
+
+    def _record_undo(self, kind, offset, cursor):
+        if self._batch_depth:
+            return
+        # 连续的单字符输入或删除合并为一个撤销步骤
+        last = self._last_edit
+        merge = last and last[0] == kind and last[1] == offset and not self.redo_stack
+        if not merge:
+            self.undo_stack.append((tuple(self.pieces), cursor))
+            del self.undo_stack[:-MAX_UNDO_STEPS]
+        self.redo_stack.clear()
+
+    def begin_batch(self, cursor):
+        # begin_batch 与 end_batch 之间的所有编辑作为一个撤销步骤
+        if not self._batch_depth:
+            self.undo_stack.append((tuple(self.pieces), cursor))
+            del self.undo_stack[:-MAX_UNDO_STEPS]
+            self.redo_stack.clear()
+        self._batch_depth += 1
+        self._last_edit = None
+
+    def end_batch(self):
+        self._batch_depth -= 1
+        self._last_edit = None
+
+    def insert(self, offset, data, cursor=None):
+        if not data:
+            return
+        self._ensure_tables()
+        offset = min(max(offset, 0), self.size)
+        self._record_undo('insert', offset, offset if cursor is None else cursor)
+        add_start, newlines = self._append(data)
+        boundary = bisect_left(self._offsets, offset)
+        previous = boundary - 1
+        if (previous >= 0 and self._offsets[boundary] == offset
+                and self.pieces[previous][0] == ADDED and sum(self.pieces[previous][1:3]) == add_start):
+            # 紧接在上一次输入之后，直接延长该片段
+            source, start, length, count = self.pieces[previous]
+            self.pieces[previous] = (source, start, length + len(data), count + newlines)
+        else:
+            index = self._split(offset)
+            self.pieces.insert(index, (ADDED, add_start, len(data), newlines))
+        self._invalidate()
+        self._last_edit = ('insert', offset + len(data)) if b'\n' not in data and len(data) < 8 else None
+
+    def delete(self, offset, length, cursor=None):
+        self._ensure_tables()
+        offset = max(offset, 0)
+        length = min(length, self.size - offset)
+        if length <= 0:
+            return
+        self._record_undo('delete', offset + length, offset + length if cursor is None else cursor)
+        first = self._split(offset)
+        last = self._split(offset + length)
+        del self.pieces[first:last]
+        self._invalidate()
+        self._last_edit = ('delete', offset) if length < 8 else None
+
+    def replace(self, offset, length, data, cursor=None):
+        # 替换算作一个撤销步骤
+        self.begin_batch(offset + length if cursor is None else cursor)
+        try:
+            self.delete(offset, length)
+            self.insert(offset, data)
+        finally:
+            self.end_batch()
+
+    def replace_spans(self, spans, data, cursor=None):
+        # 把按顺序排列、互不重叠的 [(起点, 终点)] 都替换为 data：一次生成新的片段列表，只重建一次前缀表，作为一个撤销步骤
+        # 所有替换共用新增缓冲区中的同一段 data
+        if not spans:
+            return
+        self.begin_batch(spans[0][0] if cursor is None else cursor)
+        try:
+            replacement = []
+            if data:
+                add_start, newlines = self._append(data)
+                replacement.append((ADDED, add_start, len(data), newlines))
+            pieces = []
+            position = 0
+            for start, end in spans:
+                pieces.extend(self._slice(position, start))
+                pieces.extend(replacement)
+                position = end
+            pieces.extend(self._slice(position, self.size))
+            self.pieces = pieces
+            self._invalidate()
+        finally:
+            self.end_batch()
+
+    def undo(self):
+        # 返回撤销前记录的光标偏移，没有可撤销的操作时返回 None
+        if not self.undo_stack:
+            return None
+        pieces, cursor = self.undo_stack.pop()
+        self.redo_stack.append((tuple(self.pieces), cursor))
+        self.pieces = list(pieces)
+        self._invalidate()
+        self._last_edit = None
+        return cursor
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        pieces, cursor = self.redo_stack.pop()
+        self.undo_stack.append((tuple(self.pieces), cursor))
+        self.pieces = list(pieces)
+        self._invalidate()
+        self._last_edit = None
+        return cursor
+
+
+def _window_overlap(pattern):
+    # 相邻的读取窗口重叠的字节数，不小于匹配可能的最大长度
+    return max(len(pattern.pattern) * 4, 256)
+
+
+def find_all(table, pattern, window=FIND_WINDOW_SIZE):
+    # 返回所有不重叠匹配的 (起始偏移, 结束偏移)；每个窗口只读取一次，用 finditer 扫描
+    # 起点落在窗口末尾重叠区内的匹配留给下一个窗口，那里能看到完整的匹配
+    spans = []
+    overlap = _window_overlap(pattern)
+    size = table.size
+    position = 0
+    while position < size:
+        # 多读窗口之前的一个字节，使全字匹配的后顾断言在窗口开头也能看到前一个字符
+        base = max(position - 1, 0)
+        data = table.read(base, position - base + max(window, overlap * 2))
+        last = base + len(data) >= size
+        limit = len(data) if last else len(data) - overlap
+        next_position = base + limit
+        for match in pattern.finditer(data, position - base):
+            if match.start() >= limit and not last:
+                break
+            spans.append((base + match.start(), base + match.end()))
+            next_position = max(next_position, base + match.end())
+        if last:
+            break
+        position = next_position
+    return spans
+
+
+def replace_all(table, pattern, data, cursor=None):
+    # 替换所有匹配，整体作为一个撤销步骤；返回替换的数量
+    spans = find_all(table, pattern)
+    table.replace_spans(spans, data, cursor or 0)
+    return len(spans)
@@ -0,0 +1,57 @@
+# policy
+# 大文档的性能策略：打开文件时按文件大小和最长行的长度关闭开销大的功能，用户可以逐项重新开启
+# 阈值来自 benchmarks/bench_policy.py 的测量（1 核，offscreen）：
+#   - 每行 80 个字符时每次按键约 2.6 ms，与文件大小无关；加载时间约 90 ms/MB
+#   - 每行 10000 个字符时每次按键约 5 ms，当前行高亮、语法高亮、缩略图、行号各增加 0.3~1.3 ms；
+#     每行 50000 个字符时语法高亮每次按键增加约 6 ms
+#   - 语法高亮的空闲计算约 1 s / 10 万行，文档越大后台占用越久
+#   - 自动换行不在策略中：不换行时长行的改变宽度、跳转需要 100~700 ms，短行的大文件改变宽度也慢一倍，
+#     换行反而更快
+
+# 功能 -> (名称, 文件大小阈值(字节), 最长行阈值(字符))；达到任一阈值时关闭，None 表示不按该项判断
+POLICY_FEATURES = {
+    'syntax': ('语法高亮', 4 * 1024 * 1024, 10000),
+    'current_line': ('高亮当前行', None, 10000),
+    'line_numbers': ('行号', None, 10000),
+    'minimap': ('缩略图', 16 * 1024 * 1024, 10000),
+    'live_status': ('实时刷新状态栏', 16 * 1024 * 1024, None),
+}
+# 关闭实时刷新后状态栏的刷新间隔（毫秒）
+REDUCED_UPDATE_INTERVAL = 250
+
+
+def reduced_features(size, longest_line=0):
+    reduced = set()
+    for name, (_, size_limit, line_limit) in POLICY_FEATURES.items():
+        if (size_limit is not None and size >= size_limit) or (line_limit is not None and longest_line >= line_limit):
+            reduced.add(name)
+    return reduced
+
+
+def feature_label(name):
+    return POLICY_FEATURES[name][0]
+
+
+class LineStats:
+    # 分块统计最长行的长度（字符数），块的边界可以在一行的中间
+    def __init__(self):
+        self.longest = 0
+        self.current = 0  # 最后一行目前的长度
+
+    def feed(self, text):
+        first = text.find('\n')
+        if first < 0:
+            self.current += len(text)
+        else:
+            last = text.rfind('\n')
+            longest = self.current + first
+            if last > first:
+                longest = max(longest, max(map(len, text[first + 1:last].split('\n'))))
+            self.longest = max(self.longest, longest)
+            self.current = len(text) - last - 1
+        self.longest = max(self.longest, self.current)
+        return self
+
+
+def longest_line(text):
+    return LineStats().feed(text).longest
@@ -0,0 +1,208 @@
+# regexsearch
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from yunji.findindex import utf16_length
+from yunji.replacer import REPLACE_MERGE_GAP
+
+# 子进程超过该秒数没有任何进展时认为表达式陷入回溯失控，终止匹配进程
+REGEX_TIME_BUDGET = 3.0
+# 匹配速度的下限（每秒字符数）：子进程开始扫描很长的一行时，超时按这一行的长度相应延长
+REGEX_SCAN_RATE = 1000000
+# 超过该字符数的行在开始匹配之前先告知父进程
+REGEX_LONG_LINE = 64 * 1024
+# 子进程每隔多久（秒）把找到的匹配项和进度发回一次
+REGEX_BATCH_INTERVAL = 0.05
+# 编辑后等待多久（毫秒）再重新匹配
+REGEX_RESTART_DELAY = 300
+# 取消后等待子进程停下的时间（秒）；子进程正在匹配很长的一行、来不及响应时终止它
+REGEX_CANCEL_GRACE = 0.5
+
+# 长期运行的匹配子进程及与它通信的连接，第一次正则搜索时启动；同一时间只运行一个搜索
+_process = None
+_connection = None
+_lock = threading.Lock()
+
+
+def _serve(connection):
+    # 子进程的主循环：每个请求为 (表达式, 文本, 替换文本, 合并间距)；空闲时收到的取消请求直接忽略
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request != 'cancel':
+            _search_lines(connection, *request)
+
+
+def _cancel_requested(connection):
+    # 父进程在搜索过程中发来取消请求时停止，并告知父进程本次搜索已结束
+    if connection.poll() and connection.recv() == 'cancel':
+        connection.send(('cancelled', None, None, 0))
+        return True
+    return False
+
+
+def _search_lines(connection, pattern, text, replace_str, merge_gap):
+    # 在子进程中逐行匹配（与 QTextDocument.find 一样，匹配不跨越段落），分批发回 (起点, 终点[, 替换文本])
+    # re 在匹配过程中不释放 GIL，放在线程里会让界面一起卡住，所以放在单独的进程中运行
+    # 消息为 (类型, 数据, 已处理字符数, 当前行还要扫描的字符数)，最后一项供父进程放宽超时
+    # 替换时与 plan_replacements 一样，把相距不超过 merge_gap 的匹配项合并为一段整体替换
+    try:
+        astral = utf16_length(text) != len(text)
+        batch = []
+        count = 0
+        position = 0  # 当前行起点的文档位置（UTF-16）
+        done = 0  # 当前行起点在 text 中的下标
+        region = None  # 正在合并的一段: [text 中的起点, text 中的终点, 文档起点, 文档终点, 片段列表]
+        last_sent = time.monotonic()
+        for line in text.split('\n'):
+            if len(line) > REGEX_LONG_LINE:
+                connection.send(('found', batch, done, len(line)))
+                batch = []
+                last_sent = time.monotonic()
+            for match in pattern.finditer(line):
+                start, end = match.span()
+                text_start = done + start
+                text_end = done + end
+                if astral:
+                    start = utf16_length(line[:start])
+                    end = start + utf16_length(match.group())
+                span = (position + start, position + end)
+                count += 1
+                if replace_str is None:
+                    batch.append(span)
+                elif region is not None and text_start - region[1] <= merge_gap:
+                    region[4].append(text[region[1]:text_start])
+                    region[4].append(match.expand(replace_str))
+                    region[1] = text_end
+                    region[3] = span[1]
+                else:
+                    if region is not None:
+                        batch.append((region[2], region[3], ''.join(region[4])))
+                    region = [text_start, text_end, span[0], span[1], [match.expand(replace_str)]]
+                if time.monotonic() - last_sent >= REGEX_BATCH_INTERVAL:
+                    # 很长的一行中的匹配项也按时发回，不让父进程误判为超时
+                    if _cancel_requested(connection):
+                        return
+                    connection.send(('found', batch, text_end, len(line) - match.end()))
+                    batch = []
+                    last_sent = time.monotonic()
+            position += (utf16_length(line) if astral else len(line)) + 1
+            done += len(line) + 1
+            if time.monotonic() - last_sent >= REGEX_BATCH_INTERVAL:
+                if _cancel_requested(connection):
+                    return
+                connection.send(('found', batch, done, 0))
+                batch = []
+                last_sent = time.monotonic()
+        if region is not None:
+            batch.append((region[2], region[3], ''.join(region[4])))
+        connection.send(('found', batch, len(text), 0))
+        connection.send(('done', count, None, 0))
+    except Exception as exc:
+        connection.send(('error', str(exc), None, 0))
+
+
+def _match_connection():
+    # 返回与匹配子进程的连接，子进程不存在时启动；用 spawn 启动，不在多线程的 Qt 进程中 fork
+    global _process, _connection
+    if _process is None or not _process.is_alive():
+        _stop_match_process()
+        import multiprocessing  # 第一次正则搜索时才导入，减少启动时间
+        context = multiprocessing.get_context('spawn')
+        _connection, child = context.Pipe()
+        _process = context.Process(target=_serve, args=(child,), daemon=True)
+        _process.start()
+        child.close()
+    return _connection
+
+
+def _stop_match_process():
+    # 回溯失控或不响应取消时终止子进程，下一次搜索重新启动
+    global _process, _connection
+    if _connection is not None:
+        _connection.close()
+    if _process is not None:
+        if _process.is_alive():
+            _process.terminate()
+        _process.join()
+    _process = _connection = None
+
+
+class RegexSearch(QThread):
+    # 把搜索交给匹配子进程并转发分批结果；取消时请子进程停下，子进程长时间没有进展时终止它
+    found = pyqtSignal(object, int, int)  # 匹配项列表, 已处理字符数, 总字符数
+    search_finished = pyqtSignal(int)
+    search_failed = pyqtSignal(str)
+
+    def __init__(self, key, pattern, text, replace_str=None, revision=None, parent=None):
+        super(RegexSearch, self).__init__(parent)
+        self.key = key
+        self.find_str = key[0]
+        self.pattern = pattern
+        self.text = text
+        self.replace_str = replace_str
+        self.revision = revision
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        total = len(self.text)
+        with _lock:
+            if self.is_cancelled():
+                return
+            try:
+                connection = _match_connection()
+                connection.send((self.pattern, self.text, self.replace_str, REPLACE_MERGE_GAP))
+                self.text = None
+                if not self._relay(connection, total):
+                    _stop_match_process()
+            except Exception as exc:
+                _stop_match_process()
+                if not self.is_cancelled():
+                    self.search_failed.emit(str(exc))
+            finally:
+                self.text = None
+
+    def _relay(self, connection, total):
+        # 转发子进程的消息直到本次搜索结束；子进程需要终止时返回 False
+        last_message = time.monotonic()
+        scanning = total  # 子进程先要拆分整个文本
+        cancel_sent = None
+        while True:
+            if cancel_sent is None and self.is_cancelled():
+                connection.send('cancel')
+                cancel_sent = time.monotonic()
+            if not connection.poll(REGEX_BATCH_INTERVAL):
+                if cancel_sent is not None and time.monotonic() - cancel_sent > REGEX_CANCEL_GRACE:
+                    return False
+                if time.monotonic() - last_message > REGEX_TIME_BUDGET + scanning / REGEX_SCAN_RATE:
+                    if not self.is_cancelled():
+                        self.search_failed.emit('正则表达式匹配超时，可能存在灾难性回溯')
+                    return False
+                if not _process.is_alive() and not connection.poll():
+                    if not self.is_cancelled():
+                        self.search_failed.emit('匹配进程意外退出')
+                    return False
+                continue
+            kind, data, done, scanning = connection.recv()
+            last_message = time.monotonic()
+            if kind == 'cancelled':
+                return True
+            if self.is_cancelled():
+                if kind != 'found':
+                    return True
+            elif kind == 'found':
+                self.found.emit(data, done, total)
+            elif kind == 'done':
+                self.search_finished.emit(data)
+                return True
+            else:
+                self.search_failed.emit(data)
+                return True
@@ -0,0 +1,118 @@
+# replacer
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QTextCursor
+from yunji.findindex import utf16_length
+
+# 文档字符数超过该值时在后台线程中查找匹配并生成替换结果，同时显示进度和取消按钮
+REPLACE_ASYNC_THRESHOLD = 1024 * 1024
+# 相距不超过该字符数的匹配项合并为一段整体替换，减少写入文档的次数
+REPLACE_MERGE_GAP = 4096
+# 每处理多少个匹配项报告一次进度并检查是否取消
+REPLACE_PROGRESS_STEP = 4096
+
+
+class ReplaceCancelled(Exception):
+    pass
+
+
+def plan_replacements(pattern, text, replace_str, cancelled=None, progress=None):
+    # 对文本快照做一遍查找，返回 ([(起点, 终点, 新文本)], 替换次数)；位置以 UTF-16 为单位
+    edits = []
+    count = 0
+    astral = utf16_length(text) != len(text)
+    region_start = region_end = None  # 当前合并段在 text 中的范围
+    region_position = 0  # region_start 对应的文档位置
+    pieces = []
+    index = 0  # position 对应的 text 下标
+    position = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if region_end is not None and start - region_end <= REPLACE_MERGE_GAP:
+            pieces.append(text[region_end:start])
+        else:
+            if region_end is not None:
+                edits.append((region_position, region_position + _length(text, region_start, region_end, astral),
+                              ''.join(pieces)))
+            position += _length(text, index, start, astral)
+            index = region_start = start
+            region_position = position
+            pieces = []
+        pieces.append(replace_str)
+        region_end = end
+        count += 1
+        if count % REPLACE_PROGRESS_STEP == 0:
+            if cancelled is not None and cancelled.is_set():
+                raise ReplaceCancelled()
+            if progress is not None:
+                progress(end, len(text))
+    if region_end is not None:
+        edits.append((region_position, region_position + _length(text, region_start, region_end, astral),
+                      ''.join(pieces)))
+    return edits, count
+
+
+def _length(text, start, end, astral):
+    return utf16_length(text[start:end]) if astral else end - start
+
+
+def map_position(position, edits):
+    # 替换之后原来的位置移到哪里；位于被替换区域中间的位置移到新文本中相同的偏移处（不超过新文本长度）
+    shift = 0
+    for start, end, new_text in edits:
+        if position < start:
+            break
+        new_length = utf16_length(new_text)
+        if position < end:
+            return start + shift + min(position - start, new_length)
+        shift += new_length - (end - start)
+    return position + shift
+
+
+def apply_replacements(document, edits):
+    # 从后向前写入，前面的位置不受影响；所有修改在同一个编辑块中，一次撤销即可全部恢复
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    try:
+        for start, end, new_text in reversed(edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(new_text)
+    finally:
+        cursor.endEditBlock()
+
+
+class ReplaceWorker(QThread):
+    progress = pyqtSignal(int, int)  # 已处理字符数, 总字符数
+    planned = pyqtSignal(object, int)  # 修改列表, 替换次数
+    plan_failed = pyqtSignal(str)
+
+    def __init__(self, find_str, pattern, text, replace_str, revision, parent=None):
+        super(ReplaceWorker, self).__init__(parent)
+        self.find_str = find_str
+        self.pattern = pattern
+        self.text = text
+        self.replace_str = replace_str
+        self.revision = revision  # 生成快照时的文档版本，写入前据此判断文档是否又被修改
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        try:
+            edits, count = plan_replacements(self.pattern, self.text, self.replace_str,
+                                             self._cancelled, self.progress.emit)
+        except ReplaceCancelled:
+            return
+        except Exception as exc:
+            if not self.is_cancelled():
+                self.plan_failed.emit(str(exc))
+            return
+        finally:
+            self.text = None
+        if not self.is_cancelled():
+            self.planned.emit(edits, count)
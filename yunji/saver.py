@@ -0,0 +1,220 @@
+# saver
+import codecs
+import os
+import queue
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+# 字符数超过该值的文档在后台线程中保存
+ASYNC_SAVE_THRESHOLD = 1024 * 1024
+# 每次从文档中取出并编码的字符数（按段落边界对齐）
+SAVE_CHUNK_CHARS = 256 * 1024
+# 等待写入的块数上限，保存时的内存峰值约为该值乘以块大小
+MAX_QUEUED_CHUNKS = 4
+
+
+def document_end(document):
+    # 文档末尾总有一个段落分隔符，不属于正文
+    return document.characterCount() - 1
+
+
+def read_document_chunk(document, start, chunk_chars=None):
+    # 从 start 开始取出大约 chunk_chars 个字符，结束位置对齐到段落边界，避免切开代理对
+    # 返回 (文本, 结束位置)
+    chunk_chars = chunk_chars or SAVE_CHUNK_CHARS
+    end = document_end(document)
+    if start + chunk_chars < end:
+        block = document.findBlock(start + chunk_chars)
+        stop = block.position() if block.position() > start else block.position() + block.length()
+        end = min(stop, end)
+    cursor = QTextCursor(document)
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.KeepAnchor)
+    return cursor.selectedText().replace('\u2029', '\n'), end
+
+
+def iter_document_chunks(document, chunk_chars=None):
+    position = 0
+    end = document_end(document)
+    while position < end:
+        text, position = read_document_chunk(document, position, chunk_chars)
+        yield text
+
+
+def write_atomic(file_path, chunks, encoding, newline='\n'):
+    # 先写入同目录下的临时文件并 fsync，再原子替换目标文件；中途失败不会破坏原文件
+    # 文档中的换行统一为 \n，写入时逐块转换为 newline，不产生整个文档的副本
+    encoder = codecs.getincrementalencoder(encoding or 'utf-8')()
+
+    def encoded():
+        for chunk in chunks:
+            if newline != '\n':
+                chunk = chunk.replace('\n', newline)
+            yield encoder.encode(chunk)
+        yield encoder.encode('', final=True)
+
+    target, temp_path = write_temp_file(file_path, encoded())
+    replace_file(temp_path, target)
+
+
+def write_temp_file(file_path, chunks):
+    # 把字节块写入目标文件所在目录下的临时文件并 fsync，返回 (目标路径, 临时文件路径)
+    import tempfile  # 第一次保存时才导入，减少启动时间
+    target = os.path.realpath(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target)}.', suffix='.tmp',
+                                     dir=os.path.dirname(target))
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(target):
+            os.chmod(temp_path, os.stat(target).st_mode & 0o7777)
+    except BaseException:
+        discard_temp_file(temp_path)
+        raise
+    return target, temp_path
+
+
+def replace_file(temp_path, target):
+    try:
+        os.replace(temp_path, target)
+    except BaseException:
+        discard_temp_file(temp_path)
+        raise
+    _fsync_directory(os.path.dirname(target))
+
+
+def discard_temp_file(temp_path):
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def _fsync_directory(directory):
+    # 确保重命名本身也落盘；Windows 不支持打开目录
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SaveWriter(QThread):
+    written = pyqtSignal()
+    write_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, encoding, newline='\n', parent=None):
+        super(SaveWriter, self).__init__(parent)
+        self.file_path = file_path
+        self.encoding = encoding
+        self.newline = newline
+        self.chunks = queue.Queue(MAX_QUEUED_CHUNKS)
+
+    def _iter_chunks(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def run(self):
+        try:
+            write_atomic(self.file_path, self._iter_chunks(), self.encoding, self.newline)
+            self.written.emit()
+        except Exception as exc:
+            self.write_failed.emit(str(exc))
+            # 取走剩余的块，避免界面线程阻塞在已满的队列上
+            while self.chunks.get() is not None:
+                pass
+
+
+class StreamWriter(QThread):
+    # 在后台把字节块写入临时文件，由界面线程在完成后调用 replace_file 替换目标文件
+    written = pyqtSignal(str, str)  # 目标路径, 临时文件路径
+    write_failed = pyqtSignal(str)
+
+    def __init__(self, file_path, chunks, parent=None):
+        super(StreamWriter, self).__init__(parent)
+        self.file_path = file_path
+        self.chunks = chunks
+
+    def run(self):
+        try:
+            target, temp_path = write_temp_file(self.file_path, self.chunks)
+            self.written.emit(target, temp_path)
+        except Exception as exc:
+            self.write_failed.emit(str(exc))
+
+
+class DocumentSaver(QObject):
+    # 在界面线程中分片从文档取出文本，交给 SaveWriter 在后台编码并写入
+    progress = pyqtSignal(int, int)
+    saved = pyqtSignal()
+    save_failed = pyqtSignal(str)
+
+    def __init__(self, document, file_path, encoding, newline='\n', parent=None):
+        super(DocumentSaver, self).__init__(parent)
+        self.document = document
+        self.file_path = file_path
+        self.position = 0  # 已取出部分的结束位置
+        self.finished_reading = False
+        # 保存期间是否在已取出的部分发生了编辑；若是，写入的文件不包含这些修改
+        self.stale = False
+        self.writer = SaveWriter(file_path, encoding, newline, self)
+        self.writer.written.connect(self._on_written)
+        self.writer.write_failed.connect(self._on_write_failed)
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._read_next_chunk)
+        self.document.contentsChange.connect(self._on_contents_change)
+
+    def start(self):
+        self.writer.start()
+        self.timer.start()
+
+    def is_running(self):
+        return not self.finished_reading or self.writer.isRunning()
+
+    def _on_contents_change(self, position, removed, added):
+        if self.finished_reading or position < self.position:
+            self.stale = True
+            self.position = max(position + added, self.position + added - removed)
+
+    def _read_next_chunk(self):
+        if self.finished_reading or self.writer.chunks.full():
+            return
+        end = document_end(self.document)
+        if self.position < end:
+            text, self.position = read_document_chunk(self.document, self.position)
+            self.writer.chunks.put(text)
+            self.progress.emit(self.position, end)
+            return
+        self._finish_reading()
+
+    def _finish_reading(self):
+        self.finished_reading = True
+        self.timer.stop()
+        self.writer.chunks.put(None)
+
+    def _on_written(self):
+        self.document.contentsChange.disconnect(self._on_contents_change)
+        self.saved.emit()
+
+    def _on_write_failed(self, message):
+        if not self.finished_reading:
+            self._finish_reading()
+        self.document.contentsChange.disconnect(self._on_contents_change)
+        self.save_failed.emit(message)
+
+    def finish_now(self):
+        # 关闭窗口时同步完成剩余的保存工作
+        if not self.finished_reading:
+            end = document_end(self.document)
+            while self.position < end:
+                text, self.position = read_document_chunk(self.document, self.position)
+                self.writer.chunks.put(text)
+            self._finish_reading()
+        self.writer.wait()
@@ -0,0 +1,41 @@
+# scheduler
+from PyQt5.QtCore import QObject, QTimer
+
+# 合并界面更新的间隔（毫秒），大约一帧
+FRAME_INTERVAL = 16
+
+
+class UpdateScheduler(QObject):
+    # 记录哪些界面状态需要刷新，每帧最多刷新一次；一帧之内重复标记的次数记在 skipped 中
+    def __init__(self, parent=None):
+        super(UpdateScheduler, self).__init__(parent)
+        self.callbacks = {}  # 名称 -> 刷新函数，按注册顺序刷新
+        self.dirty = set()
+        self.skipped = 0
+        self.flushed = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FRAME_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+
+    def register(self, name, callback):
+        self.callbacks[name] = callback
+
+    def mark(self, name):
+        if name in self.dirty:
+            self.skipped += 1
+            return
+        self.dirty.add(name)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        dirty, self.dirty = self.dirty, set()
+        for name, callback in self.callbacks.items():
+            if name in dirty:
+                self.flushed += 1
+                try:
+                    callback()
+                except Exception as exc:
+                    print(f"刷新界面状态失败 ({name}): {exc}")
@@ -0,0 +1,124 @@
+# session
+import os
+import sqlite3
+import time
+from yunji.encoding import cached_detection, remember_detection
+
+# 会话和文件状态数据库
+SESSION_DB = os.path.join(os.path.expanduser('~'), '.yunji', 'session.sqlite3')
+# 最多保留的文件状态条数，超出时删除最久未使用的记录
+MAX_FILE_STATES = 2000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS file_state (
+    path TEXT PRIMARY KEY,
+    encoding TEXT,
+    confidence REAL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    cursor INTEGER DEFAULT 0,
+    scroll INTEGER DEFAULT 0,
+    font_size INTEGER,
+    line_numbers INTEGER,
+    wrap INTEGER,
+    used REAL
+);
+CREATE TABLE IF NOT EXISTS session (
+    position INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    active INTEGER DEFAULT 0
+);
+'''
+
+_STATE_FIELDS = ('cursor', 'scroll', 'font_size', 'line_numbers', 'wrap')
+
+_store = None
+
+
+def session_store():
+    # 同一进程中的所有窗口共用一个连接，在首次使用时打开
+    global _store
+    if _store is None:
+        _store = SessionStore(SESSION_DB)
+    return _store
+
+
+def close_session_store():
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+class SessionStore:
+    def __init__(self, db_path):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(_SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def file_state(self, file_path):
+        row = self.connection.execute(
+            f'SELECT {", ".join(_STATE_FIELDS)} FROM file_state WHERE path = ?',
+            (os.path.realpath(file_path),)).fetchone()
+        if row is None:
+            return None
+        return {name: value for name, value in zip(_STATE_FIELDS, row) if value is not None}
+
+    def save_file_state(self, file_path, **state):
+        path = os.path.realpath(file_path)
+        fields = [name for name in _STATE_FIELDS if name in state]
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO file_state (path) VALUES (?)', (path,))
+            self.connection.execute(
+                f'UPDATE file_state SET {", ".join(f"{name} = ?" for name in fields + ["used"])} WHERE path = ?',
+                [int(state[name]) for name in fields] + [time.time(), path])
+            self._prune()
+
+    def remember_encoding(self, file_path, encoding, confidence):
+        # 与编码检测缓存一样，以文件大小和修改时间判断记录是否仍然有效
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return
+        path = os.path.realpath(file_path)
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO file_state (path) VALUES (?)', (path,))
+            self.connection.execute(
+                'UPDATE file_state SET encoding = ?, confidence = ?, size = ?, mtime_ns = ?, used = ? WHERE path = ?',
+                (encoding, confidence, stat_result.st_size, stat_result.st_mtime_ns, time.time(), path))
+
+    def prime_detection(self, file_path):
+        # 把上次检测到的编码放入内存中的检测缓存，打开文件时不再运行 chardet
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return
+        if cached_detection(file_path, stat_result) is not None:
+            return
+        row = self.connection.execute(
+            'SELECT encoding, confidence FROM file_state WHERE path = ? AND size = ? AND mtime_ns = ?',
+            (os.path.realpath(file_path), stat_result.st_size, stat_result.st_mtime_ns)).fetchone()
+        if row and row[0]:
+            remember_detection(file_path, stat_result, (row[0], row[1] or 0.0))
+
+    def save_session(self, entries):
+        # entries 为 (文件路径, 是否为当前窗口) 的列表
+        with self.connection:
+            self.connection.execute('DELETE FROM session')
+            self.connection.executemany(
+                'INSERT INTO session (position, path, active) VALUES (?, ?, ?)',
+                [(position, path, int(active)) for position, (path, active) in enumerate(entries)])
+
+    def load_session(self):
+        rows = self.connection.execute('SELECT path, active FROM session ORDER BY position').fetchall()
+        return [(path, bool(active)) for path, active in rows if os.path.isfile(path)]
+
+    def _prune(self):
+        self.connection.execute(
+            'DELETE FROM file_state WHERE path NOT IN '
+            '(SELECT path FROM file_state ORDER BY used DESC LIMIT ?)', (MAX_FILE_STATES,))
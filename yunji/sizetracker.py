@@ -0,0 +1,92 @@
+# sizetracker
+import codecs
+import time
+from yunji.loader import LINE_ENDINGS
+
+# 带 BOM 的编码：逐段落计算时使用不带 BOM 的编码，BOM 只计算一次
+_BOM_CODECS = {'utf-8-sig': ('utf-8', 3), 'utf-16': ('utf-16-le', 2), 'utf-32': ('utf-32-le', 4)}
+# 一次修改涉及的段落数超过该值时（如 setPlainText）不逐段更新，从修改处截断，之后在空闲时重新计算
+MAX_PATCH_BLOCKS = 10000
+# 建立大小表时每次在界面线程中连续运行的时间（秒），其余时间留给界面响应
+SIZE_SLICE_TIME = 0.01
+
+
+class DocumentSizeTracker:
+    # 根据编辑增量维护文档按当前编码和换行符保存后的字节数，输入时不访问文件系统
+    # 大小表在空闲时分段建立（反复调用 advance），尚未完成时 size 返回上一次得到的大小
+    def __init__(self, document):
+        self.document = document
+        self.sizes = []  # 文档开头部分每个段落编码后的字节数，全部段落都计算之后才能得到大小
+        self.text_bytes = 0  # sizes 之和
+        self.block_count = document.blockCount()  # 上一次修改之后的段落数
+        self.last_size = None
+        self.codec = 'utf-8'
+        self.bom = 0
+        self.newline_size = 1
+        document.contentsChange.connect(self._on_contents_change)
+
+    def set_format(self, encoding, line_ending):
+        name = codecs.lookup(encoding or 'utf-8').name
+        codec, bom = _BOM_CODECS.get(name, (name, 0))
+        if codec != self.codec:
+            self.invalidate()
+        self.codec = codec
+        self.bom = bom
+        self.newline_size = len(LINE_ENDINGS[line_ending].encode(codec))
+
+    def invalidate(self):
+        self.sizes = []
+        self.text_bytes = 0
+        self.block_count = self.document.blockCount()
+        self.last_size = None
+
+    def encoded_length(self, text):
+        return len(text.encode(self.codec, errors='replace'))
+
+    def is_complete(self):
+        return len(self.sizes) == self.block_count
+
+    def advance(self, time_limit=SIZE_SLICE_TIME):
+        # 从第一个尚未计算的段落继续计算，用完时间后返回；全部完成时返回 True
+        deadline = time.monotonic() + time_limit
+        block = self.document.findBlockByNumber(len(self.sizes))
+        sizes = []
+        while block.isValid():
+            sizes.append(self.encoded_length(block.text()))
+            block = block.next()
+            if len(sizes) % 256 == 0 and time.monotonic() >= deadline:
+                break
+        self.sizes.extend(sizes)
+        self.text_bytes += sum(sizes)
+        return self.is_complete()
+
+    def size(self):
+        if self.is_complete():
+            if len(self.sizes) == 1 and not self.text_bytes:
+                self.last_size = 0
+            else:
+                self.last_size = self.bom + self.text_bytes + (len(self.sizes) - 1) * self.newline_size
+        return self.last_size
+
+    def _on_contents_change(self, position, removed, added):
+        document = self.document
+        old_count = self.block_count
+        self.block_count = document.blockCount()
+        first = document.findBlock(position).blockNumber()
+        if first >= len(self.sizes):
+            return
+        end = document.characterCount() - 1
+        last = document.findBlock(min(position + added, end)).blockNumber()
+        # 修改范围之后的段落没有变化，只是整体移动；段落数的变化就是被替换的旧段落数与新段落数之差
+        old_last = last - (self.block_count - old_count)
+        if last - first > MAX_PATCH_BLOCKS or old_last < first - 1 or old_last >= len(self.sizes):
+            self.text_bytes -= sum(self.sizes[first:])
+            del self.sizes[first:]
+            return
+        block = document.findBlockByNumber(first)
+        new_sizes = []
+        for _ in range(first, last + 1):
+            new_sizes.append(self.encoded_length(block.text()))
+            block = block.next()
+        self.text_bytes += sum(new_sizes) - sum(self.sizes[first:old_last + 1])
+        self.sizes[first:old_last + 1] = new_sizes
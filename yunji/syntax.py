@@ -0,0 +1,376 @@
+# syntax
+import os
+import re
+import time
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QColor, QFont, QTextCharFormat, QTextLayout
+from yunji.findindex import utf16_length
+
+# 文档超过该字符数时自动关闭语法高亮
+SYNTAX_SIZE_LIMIT = 8 * 1024 * 1024
+# 编辑后立即重新计算的段落数上限，超过的部分留到空闲时继续
+CASCADE_LIMIT = 2000
+# 空闲时每次连续计算的时间（秒）
+HIGHLIGHT_SLICE_TIME = 0.005
+
+# 各类记号的颜色和是否加粗
+SYNTAX_STYLES = {
+    'keyword': ('#0033B3', True),
+    'builtin': ('#7A3E9D', False),
+    'constant': ('#0033B3', False),
+    'string': ('#067D17', False),
+    'comment': ('#8C8C8C', False),
+    'number': ('#1750EB', False),
+    'key': ('#871094', False),
+    'definition': ('#00627A', True),
+    'decorator': ('#9E880D', False),
+    'tag': ('#9E880D', False),
+}
+
+
+def _style_formats():
+    formats = {}
+    for name, (color, bold) in SYNTAX_STYLES.items():
+        char_format = QTextCharFormat()
+        char_format.setForeground(QColor(color))
+        if bold:
+            char_format.setFontWeight(QFont.Bold)
+        formats[name] = char_format
+    return formats
+
+
+class Grammar:
+    # 语法定义：逐行着色。state 是上一行结束时的状态（非负整数，0 表示普通状态），
+    # highlight_line 返回 ([(起点, 长度, 记号类型)], 本行结束时的状态)，位置以 Python 字符串下标计
+    name = ''
+    extensions = ()
+
+    def highlight_line(self, text, state):
+        return [], 0
+
+    def regex(self, name):
+        # 类属性中只保存正则表达式的字符串，第一次着色时才编译，导入模块时不占用时间
+        compiled = self.__dict__.setdefault('compiled', {})
+        if name not in compiled:
+            compiled[name] = re.compile(getattr(self, name))
+        return compiled[name]
+
+
+class PythonGrammar(Grammar):
+    # 状态 1、2 分别表示位于 ''' 和 """ 字符串之中
+    name = 'Python'
+    extensions = ('.py', '.pyw', '.pyi')
+    KEYWORDS = ('False None True and as assert async await break class continue def del elif else except '
+                'finally for from global if import in is lambda nonlocal not or pass raise return try while '
+                'with yield match case').split()
+    BUILTINS = ('print len range str int float dict list set tuple bool open isinstance super object type '
+                'Exception self cls').split()
+    TOKENS = (
+        r'(?P<comment>#.*)'
+        r"|(?P<triple>(?:\b[rRbBuUfF]{1,2})?(?:'''|\"\"\"))"
+        r"|(?P<string>(?:\b[rRbBuUfF]{1,2})?(?:'(?:[^'\\]|\\.)*'?|\"(?:[^\"\\]|\\.)*\"?))"
+        r'|(?P<decorator>^\s*@[\w.]+)'
+        r'|(?P<definition>(?<=\bdef )\w+|(?<=\bclass )\w+)'
+        r'|(?P<keyword>\b(?:' + '|'.join(KEYWORDS) + r')\b)'
+        r'|(?P<builtin>\b(?:' + '|'.join(BUILTINS) + r')\b)'
+        r'|(?P<number>\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?j?)\b)')
+    QUOTES = {1: "'''", 2: '"""'}
+
+    def _close(self, text, start, quote):
+        # 返回三引号字符串结束的位置（跳过转义字符），没有结束时返回 -1
+        position = start
+        while True:
+            position = text.find(quote, position)
+            if position < 0:
+                return -1
+            backslashes = 0
+            while position - backslashes - 1 >= start and text[position - backslashes - 1] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return position + len(quote)
+            position += 1
+
+    def highlight_line(self, text, state):
+        spans = []
+        position = 0
+        if state in self.QUOTES:
+            end = self._close(text, 0, self.QUOTES[state])
+            if end < 0:
+                return [(0, len(text), 'string')], state
+            spans.append((0, end, 'string'))
+            position = end
+        search = self.regex('TOKENS').search
+        while True:
+            match = search(text, position)
+            if match is None:
+                return spans, 0
+            kind = match.lastgroup
+            if kind == 'triple':
+                quote = match.group()[-3:]
+                end = self._close(text, match.end(), quote)
+                if end < 0:
+                    spans.append((match.start(), len(text) - match.start(), 'string'))
+                    return spans, 1 if quote == "'''" else 2
+                spans.append((match.start(), end - match.start(), 'string'))
+                position = end
+                continue
+            spans.append((match.start(), match.end() - match.start(), kind))
+            position = max(match.end(), position + 1)
+
+
+class JsonGrammar(Grammar):
+    name = 'JSON'
+    extensions = ('.json', '.jsonl', '.geojson')
+    TOKENS = (
+        r'(?P<key>"(?:[^"\\]|\\.)*"(?=\s*:))'
+        r'|(?P<string>"(?:[^"\\]|\\.)*"?)'
+        r'|(?P<constant>\b(?:true|false|null)\b)'
+        r'|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)')
+
+    def highlight_line(self, text, state):
+        return [(match.start(), match.end() - match.start(), match.lastgroup)
+                for match in self.regex('TOKENS').finditer(text)], 0
+
+
+class YamlGrammar(Grammar):
+    # 块标量（| 或 >）之后缩进更深的行都是字符串；状态为块标量所属行的缩进加一
+    name = 'YAML'
+    extensions = ('.yaml', '.yml')
+    TOKENS = (
+        r'(?P<comment>(?:^|(?<=\s))#.*)'
+        r'|(?P<tag>^(?:---|\.\.\.)(?=\s|$)|![\w!/.-]*|[&*][\w-]+)'
+        r'|(?P<key>(?:^|(?<=[\s{,-]))[^\s#\'"{}\[\],:&*!|>-][^#:{}\[\],]*?(?=:(?:\s|$)))'
+        r"|(?P<string>'(?:[^']|'')*'?|\"(?:[^\"\\]|\\.)*\"?)"
+        r'|(?P<constant>(?<![\w.-])(?:true|false|yes|no|on|off|null|True|False|Yes|No|NULL|Null|~)(?![\w.-]))'
+        r'|(?P<number>(?<![\w.-])[-+]?(?:\d[\d_]*(?:\.\d*)?(?:[eE][-+]?\d+)?|\.inf|\.nan)(?![\w.-]))')
+    BLOCK_SCALAR = r'(?:^|[\s:-])[|>][+-]?\d*\s*(?:#.*)?$'
+
+    def highlight_line(self, text, state):
+        indent = len(text) - len(text.lstrip(' '))
+        if state:
+            if not text.strip() or indent >= state:
+                return [(0, len(text), 'string')], state
+        spans = [(match.start(), match.end() - match.start(), match.lastgroup)
+                 for match in self.regex('TOKENS').finditer(text)]
+        if self.regex('BLOCK_SCALAR').search(text):
+            return spans, indent + 1
+        return spans, 0
+
+
+GRAMMARS = [PythonGrammar(), JsonGrammar(), YamlGrammar()]
+
+
+def register_grammar(grammar):
+    GRAMMARS.append(grammar)
+
+
+def grammar_for_path(path):
+    extension = os.path.splitext(path or '')[1].lower()
+    for grammar in GRAMMARS:
+        if extension in grammar.extensions:
+            return grammar
+    return None
+
+
+class SyntaxHighlighter(QObject):
+    # 文档的语法高亮。每个段落的 userState 记录 (行尾状态 << 1) | 是否已应用格式，-1 表示尚未计算；
+    # filled_to 之前段落的状态都是从文档开头算出的准确值。可见段落立即着色，其余段落只在空闲时分段计算状态，
+    # 滚动到可见区域时才应用格式；编辑只重新计算行尾状态发生变化的段落
+    def __init__(self, editor):
+        super(SyntaxHighlighter, self).__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.grammar = None
+        self.size_limit = SYNTAX_SIZE_LIMIT
+        self.suspended = False  # 文档过大时暂停
+        self.filled_to = 0
+        self.block_count = self.document.blockCount()
+        self.formats = _style_formats()
+        self.applying = False
+        self.fill_timer = QTimer(self)
+        self.fill_timer.setInterval(0)
+        self.fill_timer.timeout.connect(self._fill_slice)
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(0)
+        self.visible_timer.timeout.connect(self.highlight_visible)
+        self.document.contentsChange.connect(self._on_contents_change)
+
+    def active(self):
+        return self.grammar is not None and not self.suspended
+
+    def set_document(self, document, grammar):
+        # 切换标签页：段落的状态和格式保存在各自的文档中，只需从头重新确认一遍
+        self.fill_timer.stop()
+        self.visible_timer.stop()
+        self.document.contentsChange.disconnect(self._on_contents_change)
+        self.document = document
+        self.document.contentsChange.connect(self._on_contents_change)
+        self.grammar = grammar
+        self.filled_to = 0
+        self.block_count = document.blockCount()
+        self.suspended = document.characterCount() > self.size_limit
+        self._schedule()
+
+    def set_grammar(self, grammar, reset=True):
+        # reset 为 False 表示文档内容随后会被整体替换，不必清除旧段落的格式
+        if grammar is self.grammar:
+            return
+        if reset:
+            self._clear_blocks()
+        self.grammar = grammar
+        self.filled_to = 0
+        self.block_count = self.document.blockCount()
+        self.suspended = self.document.characterCount() > self.size_limit
+        self._schedule()
+
+    def _clear_blocks(self):
+        self.fill_timer.stop()
+        block = self.document.firstBlock()
+        while block.isValid():
+            state = block.userState()
+            if state != -1:
+                if state & 1:
+                    self._apply_formats(block, [])
+                block.setUserState(-1)
+            block = block.next()
+
+    def _schedule(self):
+        if not self.active():
+            self.fill_timer.stop()
+            return
+        self.visible_timer.start()
+        if self.filled_to < self.document.blockCount():
+            self.fill_timer.start()
+
+    def _start_state(self, block):
+        previous = block.previous()
+        state = previous.userState() if previous.isValid() else -1
+        return state >> 1 if state != -1 else 0
+
+    def _apply_formats(self, block, ranges):
+        self.applying = True
+        try:
+            block.layout().setFormats(ranges)
+            self.document.markContentsDirty(block.position(), block.length())
+        finally:
+            self.applying = False
+
+    def _update_block(self, block, state, visible):
+        # 计算段落的行尾状态；visible 为 True 时同时应用格式，否则只记录格式已过期
+        text = block.text()
+        spans, end_state = self.grammar.highlight_line(text, state)
+        block.setUserState((end_state << 1) | (1 if visible else 0))
+        if visible:
+            astral = not text.isascii() and utf16_length(text) != len(text)
+            ranges = []
+            for start, length, style in spans:
+                if length <= 0:
+                    continue
+                format_range = QTextLayout.FormatRange()
+                if astral:
+                    format_range.start = utf16_length(text[:start])
+                    format_range.length = utf16_length(text[start:start + length])
+                else:
+                    format_range.start = start
+                    format_range.length = length
+                format_range.format = self.formats.get(style, self.formats['keyword'])
+                ranges.append(format_range)
+            self._apply_formats(block, ranges)
+        return end_state
+
+    def visible_blocks(self):
+        editor = self.editor
+        block = editor.firstVisibleBlock()
+        offset = editor.contentOffset()
+        height = editor.viewport().height()
+        blocks = []
+        while block.isValid():
+            if editor.blockBoundingGeometry(block).translated(offset).top() > height:
+                break
+            blocks.append(block)
+            block = block.next()
+        return blocks
+
+    def highlight_visible(self):
+        # 可见段落中尚未着色或格式过期的立即着色；filled_to 之后的段落先用前一段落的状态临时着色
+        # 应用格式会引起重新布局和重绘请求，此时不再重入
+        if not self.active() or self.applying:
+            return
+        for block in self.visible_blocks():
+            state = block.userState()
+            if state == -1 or not state & 1:
+                self._update_block(block, self._start_state(block), True)
+
+    def _on_contents_change(self, position, removed, added):
+        if self.applying or self.grammar is None:
+            return
+        document = self.document
+        too_large = document.characterCount() > self.size_limit
+        if too_large != self.suspended:
+            self.suspended = too_large
+            if too_large:
+                self._clear_blocks()
+            self.filled_to = 0
+            self.block_count = document.blockCount()
+            self._schedule()
+            return
+        if self.suspended:
+            return
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(position + added).blockNumber()
+        delta = document.blockCount() - self.block_count
+        self.block_count = document.blockCount()
+        if self.filled_to > last - delta:
+            self.filled_to += delta
+        elif self.filled_to > first:
+            self.filled_to = first
+        if last - first < CASCADE_LIMIT:
+            self._rehighlight(first, last)
+        else:
+            # 大段粘贴或加载：不立即计算，交给可见区域着色和空闲时的计算
+            self.filled_to = min(self.filled_to, first)
+        self._schedule()
+
+    def _rehighlight(self, first, last):
+        # 重新计算被修改的段落，之后的段落只在行尾状态变化时继续向后计算
+        exact = first <= self.filled_to
+        block = self.document.findBlockByNumber(first)
+        state = self._start_state(block)
+        number = first
+        while block.isValid():
+            old_state = block.userState()
+            state = self._update_block(block, state, number <= last)
+            if number >= last:
+                if old_state != -1 and old_state >> 1 == state:
+                    break
+                if not exact or number + 1 >= self.filled_to:
+                    break
+            if number - first >= CASCADE_LIMIT:
+                self.filled_to = min(self.filled_to, number + 1)
+                break
+            block = block.next()
+            number += 1
+
+    def _fill_slice(self):
+        # 空闲时从 filled_to 开始按准确的前一状态向后计算，可见的段落同时着色
+        if not self.active():
+            self.fill_timer.stop()
+            return
+        deadline = time.perf_counter() + HIGHLIGHT_SLICE_TIME
+        visible = self.visible_blocks()
+        first_visible = visible[0].blockNumber() if visible else -1
+        last_visible = first_visible + len(visible) - 1
+        block = self.document.findBlockByNumber(self.filled_to)
+        state = self._start_state(block)
+        number = self.filled_to
+        while block.isValid():
+            # 可见段落之前可能是临时着色的，按准确状态重新着色
+            state = self._update_block(block, state, first_visible <= number <= last_visible)
+            number += 1
+            block = block.next()
+            if time.perf_counter() >= deadline:
+                break
+        self.filled_to = number
+        if not block.isValid():
+            self.fill_timer.stop()
@@ -0,0 +1,92 @@
+# workspace
+# 标签页工作区：一个窗口中打开多个文档，共用菜单、状态栏和编辑器控件。每个标签页保存自己的 QTextDocument
+# 和文档状态，切换标签页时与窗口交换；长时间没有显示、未修改的文档在内存超过上限时释放，只保留文件路径，
+# 光标、滚动等状态记录在会话数据库中，再次切换到该标签页时重新读取
+import time
+from PyQt5.QtCore import QEvent
+from PyQt5.QtWidgets import QTabBar, QToolTip
+
+# 一个窗口中所有文档估计占用的内存超过此值时开始释放（字节）
+EVICT_MEMORY_LIMIT = 512 * 1024 * 1024
+# 至少这么久没有显示的文档才会被释放（秒）
+EVICT_IDLE_TIME = 10 * 60
+# 检查内存占用的间隔（毫秒）
+EVICT_CHECK_INTERVAL = 60 * 1000
+# 文档内存的估计：每个字符 2 字节（UTF-16），每个段落另外约 420 字节；
+# 按 2000 万字符、每行 10~1000 个字符测量，各种行长下段落的开销都在 410~490 字节之间
+CHAR_BYTES = 2
+BLOCK_BYTES = 420
+
+# 每个标签页各自的文档状态，切换标签页时与窗口的同名属性交换
+DOCUMENT_ATTRIBUTES = ('file_path', 'temp_file', 'is_saved', 'encoding', 'encoding_confidence', 'lossy_decoding',
+                       'line_ending', 'mixed_line_endings', 'large_file_mode', 'file_offset', 'pending_file',
+                       'pending_jump', 'disk_stat', 'size_tracker', 'find_index')
+
+
+def document_memory(document):
+    if document is None:
+        return 0
+    return document.characterCount() * CHAR_BYTES + document.blockCount() * BLOCK_BYTES
+
+
+class DocumentTab:
+    # 当前标签页的文档状态在窗口的属性上，state 只在标签页位于后台时有效；document 始终是这个标签页的文档，
+    # 被释放后为 None
+    def __init__(self, state):
+        self.state = state
+        self.document = None
+        self.reduced_features = set()
+        self.grammar = None
+        self.bookmarks = []
+        self.cursor = None
+        self.scroll = 0
+        self.large_view = None  # 大文件模式的视图，只在标签页位于后台时保存在这里
+        self.evicted = False
+        self.last_shown = time.monotonic()
+
+    def touch(self):
+        self.last_shown = time.monotonic()
+
+    def path(self):
+        return self.state.get('pending_file') or self.state.get('file_path')
+
+    def memory(self):
+        return document_memory(self.document)
+
+    def evictable(self):
+        # 只释放能从磁盘原样读回的文档
+        state = self.state
+        return (self.document is not None and state.get('file_path') and not state.get('pending_file')
+                and not state.get('large_file_mode') and state.get('temp_file') is None
+                and not self.document.isModified())
+
+
+def choose_evictions(tabs, current, limit=EVICT_MEMORY_LIMIT, idle_time=EVICT_IDLE_TIME, now=None):
+    # 总占用超过上限时，从最久没有显示的文档开始释放，直到不超过上限；当前标签页不释放
+    now = time.monotonic() if now is None else now
+    total = sum(tab.memory() for tab in tabs)
+    chosen = []
+    candidates = [tab for tab in tabs if tab is not current and tab.evictable() and now - tab.last_shown >= idle_time]
+    for tab in sorted(candidates, key=lambda tab: tab.last_shown):
+        if total <= limit:
+            break
+        chosen.append(tab)
+        total -= tab.memory()
+    return chosen
+
+
+class DocumentTabBar(QTabBar):
+    # 鼠标停留时才生成提示文字，显示的内存占用是当时的值
+    def __init__(self, tooltip_provider, parent=None):
+        super(DocumentTabBar, self).__init__(parent)
+        self.tooltip_provider = tooltip_provider
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            index = self.tabAt(event.pos())
+            if index >= 0:
+                QToolTip.showText(event.globalPos(), self.tooltip_provider(index), self)
+            else:
+                QToolTip.hideText()
+            return True
+        return super(DocumentTabBar, self).event(event)
@@ -0,0 +1,50 @@
+# zoom
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import QWidget
+
+# Ctrl+滚轮缩放停止多久之后才真正修改字体并重新排版（毫秒）
+ZOOM_SETTLE_DELAY = 150
+# 字号范围
+MIN_FONT_SIZE = 6
+MAX_FONT_SIZE = 60
+
+
+class ZoomPreview(QWidget):
+    # 缩放过程中覆盖在视口上，把缩放开始时的视口截图按比例绘制，不触发文档重新排版；
+    # 以 anchor_y（视口坐标）所在的行为中心缩放，与缩放完成后光标所在行的位置一致
+    def __init__(self, viewport):
+        super(ZoomPreview, self).__init__(viewport)
+        self.pixmap = None
+        self.scale = 1.0
+        self.anchor_y = 0
+        self.hide()
+
+    def start(self, anchor_y):
+        viewport = self.parentWidget()
+        self.pixmap = viewport.grab()
+        self.anchor_y = anchor_y
+        self.scale = 1.0
+        self.setGeometry(viewport.rect())
+        self.show()
+        self.raise_()
+
+    def set_scale(self, scale):
+        self.scale = scale
+        self.update()
+
+    def stop(self):
+        self.hide()
+        self.pixmap = None
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        if self.pixmap is None:
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        width = self.pixmap.width() / self.pixmap.devicePixelRatio()
+        height = self.pixmap.height() / self.pixmap.devicePixelRatio()
+        top = self.anchor_y - self.anchor_y * self.scale
+        painter.drawPixmap(QRectF(0, top, width * self.scale, height * self.scale), self.pixmap,
+                           QRectF(self.pixmap.rect()))